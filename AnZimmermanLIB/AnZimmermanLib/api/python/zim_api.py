@@ -16,20 +16,35 @@ OpenAPI JSON: http://localhost:8000/openapi.json
 
 import os
 import sys
+import json
+import asyncio
+import zlib
+import struct
 import base64
+import functools
+import inspect
+import logging
 import tempfile
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from datetime import datetime
 from enum import Enum
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Path, Body
-from fastapi.responses import HTMLResponse, Response, JSONResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Path, Body, Request
+from fastapi.responses import HTMLResponse, Response, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
 from pydantic import BaseModel, Field
 
 # Add parent directory for zimlib import
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
-from zimlib import ZIMReader, ZIMWriter, DirectoryEntry, RedirectEntry, Namespace
+from zimlib import (ZIMReader, ZIMWriter, DirectoryEntry, RedirectEntry, Namespace, DirectorySnapshot, AccessPattern,
+                    Histogram, ReaderStats, CLUSTER_READ_ERRORS, current_trace, trace_phase, tracing)
+from zimsearch import TrigramIndex, open_trigram_index
+from zimfulltext import FullTextIndex, open_fulltext_index
+from zimrelated import RelatedIndex, open_related_index
+from zimlibrary import CatalogEntry, ZIMLibrary
 
 # =============================================================================
 # Pydantic Models for API Request/Response
@@ -105,6 +120,7 @@ class RedirectEntryResponse(BaseModel):
     url: str = Field(..., description="Redirect source URL")
     title: str = Field(..., description="Redirect title")
     redirect_index: int = Field(..., description="Target entry index")
+    resolved_index: Optional[int] = Field(None, description="Final article index after following the redirect chain (null if dangling or cyclic)")
     entry_type: str = Field(default="redirect", description="Entry type")
 
 
@@ -173,6 +189,21 @@ class CreateZIMRequest(BaseModel):
         }
 
 
+class BatchArticlesRequest(BaseModel):
+    """Request for many articles in one round trip."""
+    paths: List[str] = Field(..., min_length=1, max_length=1000,
+                             description="Full paths including namespace (e.g. A/Main_Page)")
+    follow_redirects: bool = Field(default=True, description="Return redirect targets instead of 404")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "paths": ["A/Main_Page", "S/style.css", "I/logo.png"],
+                "follow_redirects": True
+            }
+        }
+
+
 class SearchRequest(BaseModel):
     """Search request parameters."""
     query: str = Field(..., description="Search query")
@@ -195,6 +226,50 @@ class SearchResultResponse(BaseModel):
     results: List[ArticleEntryResponse] = Field(..., description="Matching articles")
 
 
+class FullTextResultResponse(BaseModel):
+    """Full-text search hit."""
+    index: int = Field(..., description="Entry index in directory")
+    namespace: str = Field(..., description="Namespace character")
+    url: str = Field(..., description="Article URL")
+    title: str = Field(..., description="Article title")
+    score: float = Field(..., description="BM25 relevance score")
+    snippet: str = Field(..., description="Text excerpt around the first match")
+
+
+class FullTextSearchResponse(BaseModel):
+    """Full-text search result."""
+    total: int = Field(..., description="Number of results returned")
+    results: List[FullTextResultResponse] = Field(..., description="Ranked articles")
+
+
+class RelatedArticleResponse(BaseModel):
+    """Related article."""
+    index: int = Field(..., description="Entry index in directory")
+    namespace: str = Field(..., description="Namespace character")
+    url: str = Field(..., description="Article URL")
+    title: str = Field(..., description="Article title")
+    score: float = Field(..., description="Cosine similarity")
+
+
+class RelatedArticlesResponse(BaseModel):
+    """Related articles result."""
+    total: int = Field(..., description="Number of results returned")
+    results: List[RelatedArticleResponse] = Field(..., description="Nearest articles")
+
+
+class CatalogEntryResponse(BaseModel):
+    """Library catalog entry for one ZIM file."""
+    path: str = Field(..., description="Path of the ZIM file on the server")
+    size: int = Field(..., description="File size in bytes")
+    title: str = Field(..., description="Title from M/Title, or the file name")
+    language: Optional[str] = Field(None, description="Language from M/Language")
+    description: Optional[str] = Field(None, description="Description from M/Description")
+    article_count: int = Field(..., description="Number of articles")
+    entry_count: int = Field(..., description="Total number of entries")
+    metadata: Dict[str, str] = Field(..., description="All textual M/ metadata entries")
+    error: Optional[str] = Field(None, description="Why the file could not be read")
+
+
 class ZIMInfoResponse(BaseModel):
     """Complete ZIM file information."""
     filename: str
@@ -266,9 +341,48 @@ Use the **Try it out** button on each endpoint to test the API interactively.
         {"name": "write", "description": "Create and modify ZIM files"},
         {"name": "search", "description": "Search ZIM file contents"},
         {"name": "export", "description": "Export ZIM content"},
+        {"name": "metrics", "description": "Prometheus metrics"},
     ]
 )
 
+
+class TracedRoute(APIRoute):
+    """Route that records its handler's start and duration on the request trace.
+    
+    Time before the handler starts is the 'params' phase (routing, body
+    parsing and validation); time after it returns is 'serialize'.
+    """
+    
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def traced(*args, **kw):
+                trace = current_trace()
+                if trace is None:
+                    return await endpoint(*args, **kw)
+                start = time.perf_counter()
+                trace.add("params", start - trace.started)
+                try:
+                    return await endpoint(*args, **kw)
+                finally:
+                    trace.add("handler", time.perf_counter() - start)
+        else:
+            @functools.wraps(endpoint)
+            def traced(*args, **kw):
+                trace = current_trace()
+                if trace is None:
+                    return endpoint(*args, **kw)
+                start = time.perf_counter()
+                trace.add("params", start - trace.started)
+                try:
+                    return endpoint(*args, **kw)
+                finally:
+                    trace.add("handler", time.perf_counter() - start)
+        super().__init__(path, traced, **kwargs)
+
+
+app.router.route_class = TracedRoute
+
 # CORS middleware for browser access
 app.add_middleware(
     CORSMiddleware,
@@ -281,10 +395,142 @@ app.add_middleware(
 # Global state for loaded ZIM file
 class ZIMState:
     reader: Optional[ZIMReader] = None
+    search_index: Optional[TrigramIndex] = None
+    fulltext_index: Optional[FullTextIndex] = None
+    related_index: Optional[RelatedIndex] = None
+    # Created on first use; see _scan_library()
+    library: Optional[ZIMLibrary] = None
+    snapshot_dir: Optional[str] = os.environ.get("ZIM_SNAPSHOT_DIR")
     filename: Optional[str] = None
     temp_dir: str = tempfile.gettempdir()
+    cluster_cache: int = int(os.environ.get("ZIM_CLUSTER_CACHE", "16"))
+    # Reader counters by archive name, kept across reloads
+    archive_stats: Dict[str, ReaderStats] = {}
+    # Requests slower than this are logged with their phases
+    slow_request_ms: float = float(os.environ.get("ZIM_SLOW_REQUEST_MS", "500"))
 
 state = ZIMState()
+_library_lock = threading.Lock()
+
+
+def _scan_library(directory: str, recursive: bool) -> List[CatalogEntry]:
+    """Scan a directory with the shared catalog, creating it on first use.
+    
+    Runs in a worker thread; scans are serialized because the catalog
+    is not thread-safe.
+    """
+    with _library_lock:
+        if state.library is None:
+            state.library = ZIMLibrary()
+        return state.library.scan([directory], recursive=recursive)
+
+
+# =============================================================================
+# Metrics
+# =============================================================================
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Reader counters attributed to endpoints, as deltas over each request:
+# metric name and help text, in the order of _reader_counters()
+_ENDPOINT_COUNTERS = (
+    ("zim_endpoint_read_calls_total", "Reader read calls during requests"),
+    ("zim_endpoint_read_bytes_total", "Bytes read by the reader during requests"),
+    ("zim_endpoint_clusters_decompressed_total", "Clusters decompressed during requests"),
+    ("zim_endpoint_lookups_total", "Entry lookups during requests"),
+)
+
+
+class RequestMetrics:
+    """Request counts, latencies and reader work per archive and endpoint."""
+    
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.reader_work: Dict[Tuple[str, str], List[int]] = {}
+    
+    def record(self, archive: str, endpoint: str, method: str, status: int, seconds: float,
+               work: List[int]) -> None:
+        """Record one finished request."""
+        key = (archive, endpoint, method, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get((archive, endpoint))
+        if histogram is None:
+            histogram = self.latency[archive, endpoint] = Histogram(REQUEST_BUCKETS)
+        histogram.observe(seconds)
+        totals = self.reader_work.setdefault((archive, endpoint), [0] * len(_ENDPOINT_COUNTERS))
+        for i, value in enumerate(work):
+            totals[i] += value
+
+
+metrics = RequestMetrics()
+
+
+def _archive_stats(name: str) -> ReaderStats:
+    """Shared counters for an archive name, so totals survive reloads."""
+    return state.archive_stats.setdefault(name, ReaderStats())
+
+
+def _reader_counters(stats: Optional[ReaderStats]) -> List[int]:
+    """Current values of the counters attributed to endpoints."""
+    if stats is None:
+        return [0] * len(_ENDPOINT_COUNTERS)
+    return [stats.read_calls, stats.bytes_read, sum(stats.clusters_decompressed.values()), stats.lookups]
+
+
+# Server-Timing phases in timeline order; reader phases fall within 'handler'
+TIMING_PHASES = ("params", "lookup", "read", "decompress", "decode", "handler", "serialize")
+
+logger = logging.getLogger("zim_api")
+slow_log = logging.getLogger("zim_api.slow")
+
+
+def _server_timing(phases: Dict[str, float], total: float) -> str:
+    """Server-Timing header value with durations in milliseconds."""
+    parts = [f"{name};dur={phases[name] * 1000:.3f}" for name in TIMING_PHASES if name in phases]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    """Count, time and trace requests per archive and endpoint.
+    
+    Reader work is the change in the archive's counters over the request,
+    so it is approximate while requests overlap. Streamed bodies are
+    produced after the handler returns and are not included, and neither
+    is the work of requests that load another archive. Phase durations
+    come from the request's own trace and are exact; they are sent as a
+    Server-Timing header and logged when the request is slow.
+    """
+    stats = state.reader.stats if state.reader else None
+    before = _reader_counters(stats)
+    with tracing() as trace:
+        response = await call_next(request)
+        seconds = trace.elapsed()
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", "unmatched")
+    work = [after - prior for after, prior in zip(_reader_counters(stats), before)]
+    metrics.record(state.filename or "", endpoint, request.method, response.status_code, seconds, work)
+    
+    phases = trace.phases
+    if "handler" in phases:
+        phases["serialize"] = max(0.0, seconds - phases.get("params", 0.0) - phases["handler"])
+    response.headers["Server-Timing"] = _server_timing(phases, seconds)
+    response.headers["Timing-Allow-Origin"] = "*"
+    if seconds * 1000 >= state.slow_request_ms:
+        slow_log.warning(json.dumps({
+            "event": "slow_request",
+            "method": request.method,
+            "path": request.url.path,
+            "endpoint": endpoint,
+            "archive": state.filename,
+            "status": response.status_code,
+            "total_ms": round(seconds * 1000, 3),
+            "phases_ms": {name: round(value * 1000, 3) for name, value in phases.items()},
+            "calls": trace.counts,
+        }))
+    return response
 
 
 # =============================================================================
@@ -364,6 +610,44 @@ async def get_status():
     )
 
 
+@app.get(
+    "/zim/library",
+    response_model=List[CatalogEntryResponse],
+    tags=["status"],
+    summary="List ZIM Library",
+    description="Catalog the ZIM files in a server directory from their headers and metadata"
+)
+async def list_library(
+    directory: str = Query(..., description="Directory on the server to scan"),
+    recursive: bool = Query(True, description="Include subdirectories")
+):
+    """
+    List every ZIM file in a directory with its title, language and counts.
+    
+    Only headers and M/ metadata are read, and results are cached by path,
+    size and mtime, so repeated listings of unchanged files are cheap.
+    """
+    if not os.path.isdir(directory):
+        raise HTTPException(status_code=404, detail=f"Directory not found: {directory}")
+    
+    # A cold scan reads every archive; keep it off the event loop
+    catalog = await asyncio.to_thread(_scan_library, directory, recursive)
+    return [
+        CatalogEntryResponse(
+            path=item.path,
+            size=item.size,
+            title=item.title,
+            language=item.language,
+            description=item.description,
+            article_count=item.article_count,
+            entry_count=item.entry_count,
+            metadata=item.metadata,
+            error=item.error
+        )
+        for item in catalog
+    ]
+
+
 # =============================================================================
 # API Endpoints - Read Operations
 # =============================================================================
@@ -394,11 +678,20 @@ async def upload_zim(file: UploadFile = File(..., description="ZIM file to uploa
     # Close existing reader
     if state.reader:
         state.reader.close()
+    if state.fulltext_index:
+        state.fulltext_index.close()
+    if state.related_index:
+        state.related_index.close()
     
     # Open new ZIM file
     try:
-        state.reader = ZIMReader(temp_path)
+        state.reader = ZIMReader(temp_path, cluster_cache=state.cluster_cache,
+                                 stats=_archive_stats(file.filename))
         state.reader.open()
+        state.reader.advise(AccessPattern.RANDOM)
+        state.search_index = open_trigram_index(state.reader)
+        state.fulltext_index = open_fulltext_index(state.reader)
+        state.related_index = open_related_index(state.reader)
         state.filename = file.filename
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid ZIM file: {str(e)}")
@@ -406,6 +699,25 @@ async def upload_zim(file: UploadFile = File(..., description="ZIM file to uploa
     return await get_zim_info()
 
 
+def _open_with_snapshot(path: str) -> ZIMReader:
+    """Open a server-side archive, writing a directory snapshot on first load.
+    
+    Later loads (e.g. after a restart) map the snapshot instead of parsing
+    the directory again.
+    """
+    reader = ZIMReader(path, snapshot_dir=state.snapshot_dir, cluster_cache=state.cluster_cache,
+                       stats=_archive_stats(os.path.basename(path)))
+    reader.open()
+    # Scattered lookups: read-ahead would only evict the hot set
+    reader.advise(AccessPattern.RANDOM)
+    if not isinstance(reader.directory_entries, DirectorySnapshot):
+        try:
+            reader.save_snapshot()
+        except OSError:
+            pass  # Read-only location; keep serving from the parsed directory
+    return reader
+
+
 @app.post(
     "/zim/load",
     response_model=ZIMInfoResponse,
@@ -423,10 +735,16 @@ async def load_zim(
     # Close existing reader
     if state.reader:
         state.reader.close()
+    if state.fulltext_index:
+        state.fulltext_index.close()
+    if state.related_index:
+        state.related_index.close()
     
     try:
-        state.reader = ZIMReader(path)
-        state.reader.open()
+        state.reader = _open_with_snapshot(path)
+        state.search_index = open_trigram_index(state.reader)
+        state.fulltext_index = open_fulltext_index(state.reader)
+        state.related_index = open_related_index(state.reader)
         state.filename = os.path.basename(path)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid ZIM file: {str(e)}")
@@ -599,6 +917,7 @@ async def list_redirects(
                 url=entry.url,
                 title=entry.title,
                 redirect_index=entry.redirect_index,
+                resolved_index=state.reader.resolve_index(i),
                 entry_type="redirect"
             ))
             count += 1
@@ -635,15 +954,11 @@ async def get_article(
         raise HTTPException(status_code=404, detail=f"Article not found: {full_path}")
     
     if isinstance(entry, RedirectEntry):
-        # Follow redirect
-        if entry.redirect_index < len(state.reader.directory_entries):
-            entry = state.reader.directory_entries[entry.redirect_index]
-        else:
+        # Follow the whole redirect chain via the precomputed table
+        entry = state.reader.resolve(entry)
+        if entry is None:
             raise HTTPException(status_code=404, detail="Redirect target not found")
     
-    if not isinstance(entry, DirectoryEntry):
-        raise HTTPException(status_code=400, detail="Entry is not an article")
-    
     try:
         content = state.reader.get_article_content(entry)
     except Exception as e:
@@ -659,16 +974,17 @@ async def get_article(
         return Response(content=content, media_type=mime_type)
     
     # Try to decode as text, fall back to base64
-    try:
-        if 'text' in mime_type or 'json' in mime_type or 'xml' in mime_type:
-            content_str = content.decode('utf-8')
-            encoding = "utf-8"
-        else:
+    with trace_phase("decode"):
+        try:
+            if 'text' in mime_type or 'json' in mime_type or 'xml' in mime_type:
+                content_str = content.decode('utf-8')
+                encoding = "utf-8"
+            else:
+                content_str = base64.b64encode(content).decode('ascii')
+                encoding = "base64"
+        except UnicodeDecodeError:
             content_str = base64.b64encode(content).decode('ascii')
             encoding = "base64"
-    except UnicodeDecodeError:
-        content_str = base64.b64encode(content).decode('ascii')
-        encoding = "base64"
     
     return ArticleContentResponse(
         url=entry.url,
@@ -681,6 +997,92 @@ async def get_article(
     )
 
 
+@app.post(
+    "/zim/articles/batch",
+    tags=["read"],
+    summary="Get Many Articles",
+    description="Fetch many articles at once, decompressing each cluster only once",
+    response_class=Response,
+    responses={200: {"content": {"application/x-zim-batch": {}}}}
+)
+async def get_articles_batch(request: BatchArticlesRequest):
+    """
+    Get the content of many entries in a single response.
+    
+    Paths are resolved through the directory index and fetched with
+    `ZIMReader.get_many`, so each cluster is read and decompressed once. The response is a sequence of
+    length-prefixed records, one per requested path and in request order:
+    
+    - 4 bytes: metadata length (little-endian uint32)
+    - 4 bytes: content length (little-endian uint32)
+    - metadata: UTF-8 JSON with `path`, `status` and, when found,
+      `url`, `title`, `namespace` and `content_type`
+    - content: raw entry bytes
+    
+    Entries in a cluster that cannot be read get status 500.
+    """
+    if not state.reader:
+        raise HTTPException(status_code=400, detail="No ZIM file loaded")
+    
+    reader = state.reader
+    entries = reader.directory_entries
+    
+    # Resolve each distinct path once
+    found: Dict[str, Optional[DirectoryEntry]] = {}
+    for path in request.paths:
+        if path in found:
+            continue
+        index = reader.get_entry_index_by_path(path) if path else None
+        entry = entries[index] if index is not None else None
+        if isinstance(entry, RedirectEntry):
+            entry = reader.resolve(entry) if request.follow_redirects else None
+        found[path] = entry
+    resolved = [found[path] for path in request.paths]
+    
+    # Read each needed cluster once, in file order
+    by_cluster: Dict[int, Dict[int, DirectoryEntry]] = {}
+    for entry in resolved:
+        if entry is not None:
+            by_cluster.setdefault(entry.cluster_number, {})[entry.blob_number] = entry
+    
+    contents: Dict[Tuple[int, int], bytes] = {}
+    for cluster_number in sorted(by_cluster, key=lambda c: reader.cluster_offsets[c]):
+        try:
+            for entry, content in reader.get_many(by_cluster[cluster_number].values()):
+                contents[entry.cluster_number, entry.blob_number] = content
+        except CLUSTER_READ_ERRORS as e:
+            logger.warning("Batch read of cluster %d in %s failed: %s", cluster_number, state.filename, e)
+    
+    parts = []
+    for pos, path in enumerate(request.paths):
+        entry = resolved[pos]
+        content = contents.get((entry.cluster_number, entry.blob_number)) if entry is not None else None
+        if entry is None:
+            meta = {"path": path, "status": 404}
+            content = b""
+        elif content is None:
+            meta = {"path": path, "status": 500}
+            content = b""
+        else:
+            mime_type = "application/octet-stream"
+            if entry.mimetype_index < len(reader.mime_types):
+                mime_type = reader.mime_types[entry.mimetype_index]
+            meta = {
+                "path": path,
+                "status": 200,
+                "namespace": chr(entry.namespace),
+                "url": entry.url,
+                "title": entry.title,
+                "content_type": mime_type
+            }
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        parts.append(struct.pack('<II', len(meta_bytes), len(content)))
+        parts.append(meta_bytes)
+        parts.append(content)
+    
+    return Response(content=b''.join(parts), media_type="application/x-zim-batch")
+
+
 @app.get(
     "/zim/main-page",
     response_model=ArticleContentResponse,
@@ -697,6 +1099,7 @@ async def get_main_page():
     if not main_page:
         raise HTTPException(status_code=404, detail="No main page defined")
     
+    main_page = state.reader.resolve(main_page)
     if isinstance(main_page, DirectoryEntry):
         content = state.reader.get_article_content(main_page)
         
@@ -704,12 +1107,13 @@ async def get_main_page():
         if main_page.mimetype_index < len(state.reader.mime_types):
             mime_type = state.reader.mime_types[main_page.mimetype_index]
         
-        try:
-            content_str = content.decode('utf-8')
-            encoding = "utf-8"
-        except UnicodeDecodeError:
-            content_str = base64.b64encode(content).decode('ascii')
-            encoding = "base64"
+        with trace_phase("decode"):
+            try:
+                content_str = content.decode('utf-8')
+                encoding = "utf-8"
+            except UnicodeDecodeError:
+                content_str = base64.b64encode(content).decode('ascii')
+                encoding = "base64"
         
         return ArticleContentResponse(
             url=main_page.url,
@@ -721,7 +1125,7 @@ async def get_main_page():
             encoding=encoding
         )
     
-    raise HTTPException(status_code=404, detail="Main page is a redirect")
+    raise HTTPException(status_code=404, detail="Main page redirect target not found")
 
 
 # =============================================================================
@@ -743,37 +1147,28 @@ async def search_articles(
     """
     Search for articles matching the query.
     
-    Searches in article titles and URLs (case-insensitive).
+    Searches in article titles and URLs (case-insensitive). Every
+    whitespace-separated term must occur in the title or URL.
     """
     if not state.reader:
         raise HTTPException(status_code=400, detail="No ZIM file loaded")
     
-    query_lower = q.lower()
-    results = []
+    ns_filter = ord(namespace.value) if namespace else None
+    hits = state.search_index.search(q, namespace=ns_filter, limit=limit)
     
-    for i, entry in enumerate(state.reader.directory_entries):
-        if isinstance(entry, DirectoryEntry):
-            ns = chr(entry.namespace)
-            
-            if namespace and ns != namespace.value:
-                continue
-            
-            if (query_lower in entry.url.lower() or 
-                query_lower in entry.title.lower()):
-                
-                results.append(ArticleEntryResponse(
-                    index=i,
-                    namespace=ns,
-                    url=entry.url,
-                    title=entry.title,
-                    mimetype_index=entry.mimetype_index,
-                    cluster_number=entry.cluster_number,
-                    blob_number=entry.blob_number,
-                    entry_type="article"
-                ))
-                
-                if len(results) >= limit:
-                    break
+    results = [
+        ArticleEntryResponse(
+            index=i,
+            namespace=chr(entry.namespace),
+            url=entry.url,
+            title=entry.title,
+            mimetype_index=entry.mimetype_index,
+            cluster_number=entry.cluster_number,
+            blob_number=entry.blob_number,
+            entry_type="article"
+        )
+        for i, entry in hits
+    ]
     
     return SearchResultResponse(total=len(results), results=results)
 
@@ -794,6 +1189,97 @@ async def advanced_search(request: SearchRequest):
     )
 
 
+@app.get(
+    "/zim/search/fulltext",
+    response_model=FullTextSearchResponse,
+    tags=["search"],
+    summary="Full-Text Search",
+    description="Search article body text using the BM25 full-text index"
+)
+async def search_fulltext(
+    q: str = Query(..., min_length=1, description="Search query"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum results"),
+    snippets: bool = Query(True, description="Include text snippets")
+):
+    """
+    Ranked full-text search over HTML articles.
+    
+    Requires a sidecar index next to the ZIM file, built offline with
+    `python zimfulltext.py <file.zim>`.
+    """
+    if not state.reader:
+        raise HTTPException(status_code=400, detail="No ZIM file loaded")
+    
+    if not state.fulltext_index:
+        raise HTTPException(status_code=404, detail="No full-text index for the loaded ZIM file")
+    
+    hits = state.fulltext_index.search(q, limit=limit, snippets=snippets)
+    
+    results = [
+        FullTextResultResponse(
+            index=hit.index,
+            namespace=chr(hit.entry.namespace),
+            url=hit.entry.url,
+            title=hit.entry.title,
+            score=hit.score,
+            snippet=hit.snippet
+        )
+        for hit in hits
+    ]
+    
+    return FullTextSearchResponse(total=len(results), results=results)
+
+
+@app.get(
+    "/zim/related/{namespace}/{path:path}",
+    response_model=RelatedArticlesResponse,
+    tags=["search"],
+    summary="Related Articles",
+    description="Find articles with similar content using the offline vector index"
+)
+async def related_articles(
+    namespace: NamespaceEnum = Path(..., description="Article namespace"),
+    path: str = Path(..., description="Article URL path"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum results")
+):
+    """
+    Nearest neighbours of an article by content similarity.
+    
+    Requires a sidecar index next to the ZIM file, built offline with
+    `python zimrelated.py <file.zim>`.
+    """
+    if not state.reader:
+        raise HTTPException(status_code=400, detail="No ZIM file loaded")
+    
+    if not state.related_index:
+        raise HTTPException(status_code=404, detail="No related-articles index for the loaded ZIM file")
+    
+    full_path = f"{namespace.value}/{path}"
+    index = state.reader.get_entry_index_by_path(full_path)
+    
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Article not found: {full_path}")
+    
+    index = state.reader.resolve_index(index)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Redirect target not found")
+    
+    hits = state.related_index.related(index, limit=limit)
+    
+    results = [
+        RelatedArticleResponse(
+            index=hit.index,
+            namespace=chr(hit.entry.namespace),
+            url=hit.entry.url,
+            title=hit.entry.title,
+            score=hit.score
+        )
+        for hit in hits
+    ]
+    
+    return RelatedArticlesResponse(total=len(results), results=results)
+
+
 # =============================================================================
 # API Endpoints - Write Operations
 # =============================================================================
@@ -901,9 +1387,14 @@ async def export_article_html(
     full_path = f"{namespace.value}/{path}"
     entry = state.reader.get_entry_by_path(full_path)
     
-    if not entry or not isinstance(entry, DirectoryEntry):
+    if not entry:
         raise HTTPException(status_code=404, detail="Article not found")
     
+    # Redirects export their final article, resolved via the precomputed table
+    entry = state.reader.resolve(entry)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Redirect target not found")
+    
     content = state.reader.get_article_content(entry)
     
     return Response(
@@ -913,26 +1404,95 @@ async def export_article_html(
     )
 
 
+class ExportFormat(str, Enum):
+    """Export output formats."""
+    JSON = "json"
+    NDJSON = "ndjson"
+
+
+def _export_records(reader: ZIMReader, namespaces: Optional[set],
+                    redirects: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield one export record per article, straight from the directory.
+    
+    With `redirects`, redirect entries are included with the index of
+    the article their chain finally resolves to.
+    """
+    for i, entry in enumerate(reader.directory_entries):
+        is_article = isinstance(entry, DirectoryEntry)
+        if not is_article and not redirects:
+            continue
+        ns = chr(entry.namespace)
+        if namespaces and ns not in namespaces:
+            continue
+        record = {
+            "index": i,
+            "namespace": ns,
+            "url": entry.url,
+            "title": entry.title
+        }
+        if not is_article:
+            record["redirect_to"] = reader.resolve_index(i)
+        yield record
+
+
+def _ndjson_stream(records: Iterator[Dict[str, Any]], compress: bool,
+                   chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode records as newline-delimited JSON in bounded-size chunks."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    buffered = 0
+    
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= chunk_size:
+            data = b''.join(buffer)
+            buffer, buffered = [], 0
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+    
+    data = b''.join(buffer)
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
 @app.get(
     "/zim/export/json",
     tags=["export"],
     summary="Export Metadata as JSON",
-    description="Export ZIM file metadata and article list as JSON"
+    description="Export ZIM file metadata and article list as JSON, or stream articles as NDJSON"
 )
-async def export_json():
-    """Export ZIM file metadata and index as JSON."""
+async def export_json(
+    format: ExportFormat = Query(ExportFormat.JSON, description="json (single document) or ndjson (streamed)"),
+    namespace: Optional[List[NamespaceEnum]] = Query(None, description="Only export these namespaces"),
+    gzip: bool = Query(False, description="Gzip-compress the NDJSON stream"),
+    redirects: bool = Query(False, description="Include redirects with their resolved target index")
+):
+    """
+    Export ZIM file metadata and index as JSON.
+    
+    With `format=ndjson` the article list is streamed as one JSON object per
+    line in constant memory; use `/zim/info` for the file metadata.
+    """
     if not state.reader:
         raise HTTPException(status_code=400, detail="No ZIM file loaded")
     
-    articles = []
-    for i, entry in enumerate(state.reader.directory_entries):
-        if isinstance(entry, DirectoryEntry):
-            articles.append({
-                "index": i,
-                "namespace": chr(entry.namespace),
-                "url": entry.url,
-                "title": entry.title
-            })
+    namespaces = {ns.value for ns in namespace} if namespace else None
+    
+    if format == ExportFormat.NDJSON:
+        headers = {"Content-Disposition": "attachment; filename=zim_export.ndjson"}
+        if gzip:
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(
+            _ndjson_stream(_export_records(state.reader, namespaces, redirects), gzip),
+            media_type="application/x-ndjson",
+            headers=headers
+        )
     
     export_data = {
         "filename": state.filename,
@@ -942,7 +1502,7 @@ async def export_json():
             "article_count": state.reader.header.article_count
         },
         "mime_types": state.reader.mime_types,
-        "articles": articles
+        "articles": list(_export_records(state.reader, namespaces, redirects))
     }
     
     return JSONResponse(
@@ -951,6 +1511,105 @@ async def export_json():
     )
 
 
+# =============================================================================
+# API Endpoints - Metrics
+# =============================================================================
+
+def _label_value(value: Any) -> str:
+    """Escape a Prometheus label value."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name: str, labels: Dict[str, Any], value: float) -> str:
+    """One line of the Prometheus text format."""
+    label_text = ','.join(f'{key}="{_label_value(v)}"' for key, v in labels.items())
+    return f"{name}{{{label_text}}} {value}"
+
+
+def _histogram_lines(name: str, labels: Dict[str, Any], histogram: Histogram) -> Iterator[str]:
+    """Bucket, sum and count lines of a histogram."""
+    for bound, count in histogram.cumulative():
+        yield _sample(f"{name}_bucket", {**labels, "le": "+Inf" if bound == float('inf') else bound}, count)
+    yield _sample(f"{name}_sum", labels, histogram.total)
+    yield _sample(f"{name}_count", labels, histogram.count)
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+    
+    archives = sorted(state.archive_stats.items())
+    counters = (
+        ("zim_reader_read_calls_total", "read_calls", "File read calls"),
+        ("zim_reader_read_bytes_total", "bytes_read", "Bytes read from the archive file"),
+        ("zim_reader_cluster_cache_hits_total", "cache_hits", "Decompressed-cluster cache hits"),
+        ("zim_reader_cluster_cache_misses_total", "cache_misses", "Decompressed-cluster cache misses"),
+        ("zim_reader_snapshot_hits_total", "snapshot_hits", "Opens that mapped a directory snapshot"),
+        ("zim_reader_snapshot_misses_total", "snapshot_misses", "Opens that had to parse the directory"),
+        ("zim_reader_lookups_total", "lookups", "Entry lookups by path"),
+    )
+    for name, attribute, help_text in counters:
+        family(name, "counter", help_text)
+        lines.extend(_sample(name, {"archive": archive}, getattr(stats, attribute)) for archive, stats in archives)
+    
+    family("zim_reader_clusters_decompressed_total", "counter", "Clusters decompressed, by codec")
+    for archive, stats in archives:
+        lines.extend(_sample("zim_reader_clusters_decompressed_total", {"archive": archive, "codec": codec}, count)
+                     for codec, count in sorted(stats.clusters_decompressed.items()))
+    family("zim_reader_decompress_seconds", "histogram", "Sampled cluster decompression time, by codec")
+    for archive, stats in archives:
+        for codec, histogram in sorted(stats.decompress_seconds.items()):
+            lines.extend(_histogram_lines("zim_reader_decompress_seconds",
+                                          {"archive": archive, "codec": codec}, histogram))
+    family("zim_reader_lookup_seconds", "histogram", "Sampled entry lookup time")
+    for archive, stats in archives:
+        lines.extend(_histogram_lines("zim_reader_lookup_seconds", {"archive": archive}, stats.lookup_seconds))
+    
+    if state.reader:
+        family("zim_reader_cluster_cache_clusters", "gauge", "Clusters held by the loaded archive's cache")
+        lines.append(_sample("zim_reader_cluster_cache_clusters", {"archive": state.filename or ""},
+                             len(state.reader._cluster_cache)))
+    
+    family("zim_http_requests_total", "counter", "HTTP requests, by archive, endpoint, method and status")
+    for (archive, endpoint, method, status), count in sorted(metrics.requests.items()):
+        lines.append(_sample("zim_http_requests_total", {"archive": archive, "endpoint": endpoint,
+                                                         "method": method, "status": status}, count))
+    family("zim_http_request_seconds", "histogram", "HTTP request latency, by archive and endpoint")
+    for (archive, endpoint), histogram in sorted(metrics.latency.items()):
+        lines.extend(_histogram_lines("zim_http_request_seconds",
+                                      {"archive": archive, "endpoint": endpoint}, histogram))
+    for i, (name, help_text) in enumerate(_ENDPOINT_COUNTERS):
+        family(name, "counter", f"{help_text}, by archive and endpoint")
+        lines.extend(_sample(name, {"archive": archive, "endpoint": endpoint}, work[i])
+                     for (archive, endpoint), work in sorted(metrics.reader_work.items()))
+    return "\n".join(lines) + "\n"
+
+
+@app.get(
+    "/metrics",
+    tags=["metrics"],
+    summary="Prometheus Metrics",
+    description="Reader and request metrics in the Prometheus text format",
+    response_class=Response,
+    responses={200: {"content": {"text/plain": {}}}}
+)
+async def get_metrics():
+    """
+    Expose counters and histograms for scraping.
+    
+    Reader metrics are per archive: read calls and bytes, clusters
+    decompressed and sampled decompression time per codec, cluster cache
+    and directory snapshot hits and misses, and entry lookups with
+    sampled lookup latency. Request metrics are per archive and endpoint.
+    Set ZIM_CLUSTER_CACHE to size the decompressed-cluster cache.
+    """
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # =============================================================================
 # Cleanup on shutdown
 # =============================================================================
@@ -960,6 +1619,10 @@ async def shutdown_event():
     """Clean up resources on shutdown."""
     if state.reader:
         state.reader.close()
+    if state.fulltext_index:
+        state.fulltext_index.close()
+    if state.related_index:
+        state.related_index.close()
 
 
 # =============================================================================
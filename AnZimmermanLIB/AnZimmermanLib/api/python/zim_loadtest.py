@@ -0,0 +1,329 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Concurrent load test for the ZIM REST API.
+
+Many simulated clients send a weighted mix of article fetches, searches,
+listings and batch requests, each waiting for its previous response (a
+closed loop). Latency is measured from send to the end of the body.
+The report gives throughput and p50/p95/p99/max latency per endpoint.
+
+By default the app runs in-process through its ASGI interface, on the
+same event loop as the clients. Handlers that block the loop therefore
+show up as queueing in every client's latency. --uvicorn starts a local
+server in a subprocess instead, and --url targets one that is already
+running.
+
+Results use the zimbench JSON format, so a CI job can gate on them with
+--baseline (or zimbench.py compare), or with --max-p99-ms and
+--max-error-rate.
+
+Command line:
+    python zim_loadtest.py corpus.zim --clients 32 --duration 30
+    python zim_loadtest.py corpus.zim --mix article=70,search=20,batch=10 --uvicorn
+    python zim_loadtest.py corpus.zim --requests 5000 --output load.json --baseline baseline.json
+"""
+
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+# Add parent directory for zimlib import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from zimlib import ZIMReader, DirectoryEntry, Namespace
+from zimbench import RESULTS_VERSION, compare_results, load_results, print_comparisons
+
+
+DEFAULT_MIX = {"article": 60, "search": 20, "list": 10, "batch": 10}
+DEFAULT_CLIENTS = 16
+DEFAULT_DURATION = 10.0
+PATH_SAMPLE = 5000
+BATCH_SIZE = 20
+LIST_LIMIT = 100
+WARMUP_REQUESTS = 50
+SERVER_START_TIMEOUT = 30.0
+
+
+@dataclass
+class EndpointStats:
+    """Latencies and failures of one endpoint."""
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, q: float) -> float:
+        """Latency at quantile q (0-1), by nearest rank."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+@dataclass
+class Workload:
+    """What the clients ask for: paths, search terms and the request mix."""
+    paths: List[str]
+    terms: List[str]
+    mix: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    batch_size: int = BATCH_SIZE
+    entry_count: int = 0
+
+    @classmethod
+    def from_archive(cls, path: str, mix: Optional[Dict[str, int]] = None, seed: int = 0,
+                     sample: int = PATH_SAMPLE) -> 'Workload':
+        """Sample paths (redirects included) and title words from an archive."""
+        rng = random.Random(seed)
+        with ZIMReader(path) as reader:
+            entries = reader.directory_entries
+            picks = [entries[i] for i in rng.sample(range(len(entries)), min(sample, len(entries)))]
+        picks = [e for e in picks if e.namespace != Namespace.METADATA]
+        paths = [f"{chr(e.namespace)}/{e.url}" for e in picks]
+        terms = sorted({word.lower() for e in picks if isinstance(e, DirectoryEntry)
+                        for word in e.title.split()[:1] if len(word) >= 3})
+        return cls(paths, terms or ["the"], dict(mix or DEFAULT_MIX), entry_count=len(entries))
+
+    def request(self, kind: str, rng: random.Random) -> Tuple[str, str, Optional[dict], Optional[dict]]:
+        """(method, URL path, query parameters, JSON body) of one request of a kind."""
+        if kind == "article":
+            namespace, url = rng.choice(self.paths).split("/", 1)
+            return "GET", f"/zim/article/{namespace}/{url}", None, None
+        if kind == "search":
+            return "GET", "/zim/search", {"q": rng.choice(self.terms)}, None
+        if kind == "list":
+            offset = rng.randrange(max(1, self.entry_count - LIST_LIMIT))
+            return "GET", "/zim/articles", {"offset": offset, "limit": LIST_LIMIT}, None
+        if kind == "batch":
+            paths = rng.sample(self.paths, min(self.batch_size, len(self.paths)))
+            return "POST", "/zim/articles/batch", None, {"paths": paths}
+        raise ValueError(f"Unknown request kind: {kind}")
+
+
+@dataclass
+class LoadResult:
+    """Outcome of a load test."""
+    clients: int
+    seconds: float
+    endpoints: Dict[str, EndpointStats]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-endpoint and overall figures; latencies in seconds."""
+        combined = EndpointStats([t for s in self.endpoints.values() for t in s.latencies],
+                                 sum(s.errors for s in self.endpoints.values()))
+        summary = {}
+        for name, stats in sorted(self.endpoints.items()) + [("all", combined)]:
+            summary[name] = {
+                "requests_per_s": len(stats.latencies) / self.seconds if self.seconds else 0.0,
+                "p50_s": stats.percentile(0.50),
+                "p95_s": stats.percentile(0.95),
+                "p99_s": stats.percentile(0.99),
+                "max_s": max(stats.latencies, default=0.0),
+            }
+        return summary
+
+    def error_rate(self) -> float:
+        """Failed requests as a fraction of all requests."""
+        total = sum(len(s.latencies) for s in self.endpoints.values())
+        return sum(s.errors for s in self.endpoints.values()) / total if total else 0.0
+
+
+async def _client(http: httpx.AsyncClient, workload: Workload, rng: random.Random,
+                  endpoints: Dict[str, EndpointStats], budget: List[int], deadline: float) -> None:
+    """One closed-loop client: send a request, wait for the answer, repeat."""
+    kinds = list(workload.mix)
+    weights = [workload.mix[kind] for kind in kinds]
+    clock = time.perf_counter
+    while clock() < deadline and budget[0] != 0:
+        budget[0] -= 1
+        kind = rng.choices(kinds, weights)[0]
+        method, url, params, body = workload.request(kind, rng)
+        start = clock()
+        try:
+            response = await http.request(method, url, params=params, json=body)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        stats = endpoints.setdefault(kind, EndpointStats())
+        stats.latencies.append(clock() - start)
+        stats.errors += failed
+
+
+async def run_load(http: httpx.AsyncClient, workload: Workload, clients: int = DEFAULT_CLIENTS,
+                   duration: float = DEFAULT_DURATION, requests: Optional[int] = None,
+                   seed: int = 0, warmup: int = WARMUP_REQUESTS) -> LoadResult:
+    """Drive an API with concurrent clients until duration passes or requests are sent.
+
+    The first warmup requests are sent by a single client and not counted.
+    """
+    if warmup:
+        await _client(http, workload, random.Random(f"warmup-{seed}"), {}, [warmup], float("inf"))
+    endpoints: Dict[str, EndpointStats] = {}
+    budget = [requests if requests is not None else -1]
+    deadline = time.perf_counter() + duration if requests is None else float("inf")
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(http, workload, random.Random(seed * 1000 + i), endpoints, budget, deadline)
+                           for i in range(clients)))
+    return LoadResult(clients, time.perf_counter() - start, endpoints)
+
+
+async def run_in_process(archive: str, workload: Workload, **options) -> LoadResult:
+    """Load the archive into the ASGI app in this process and drive it."""
+    import zim_api
+
+    transport = httpx.ASGITransport(app=zim_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://zim-api", timeout=None) as http:
+        response = await http.post("/zim/load", json={"path": os.path.abspath(archive)})
+        response.raise_for_status()
+        # Measure the indexed search, not the scan used while it builds
+        await asyncio.to_thread(zim_api.state.search_index.ready.wait, 60)
+        # Under load most requests would be logged as slow
+        slow_request_ms, zim_api.state.slow_request_ms = zim_api.state.slow_request_ms, float("inf")
+        try:
+            return await run_load(http, workload, **options)
+        finally:
+            zim_api.state.slow_request_ms = slow_request_ms
+
+
+async def run_remote(url: str, archive: Optional[str], workload: Workload, clients: int = DEFAULT_CLIENTS,
+                     **options) -> LoadResult:
+    """Drive a running server, first loading archive into it if given."""
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as http:
+        if archive:
+            response = await http.post("/zim/load", json={"path": os.path.abspath(archive)})
+            response.raise_for_status()
+        return await run_load(http, workload, clients=clients, **options)
+
+
+def _free_port() -> int:
+    """An unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(port: Optional[int] = None) -> Tuple[subprocess.Popen, str]:
+    """Start zim_api under uvicorn in a subprocess; return it and its URL once it answers."""
+    port = port or _free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "zim_api:app", "--port", str(port),
+                                "--log-level", "warning"], cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/status", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """Parse "article=60,search=20,..." into weights."""
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        if kind.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown request kind: {kind.strip()}")
+        mix[kind.strip()] = int(weight)
+    return mix
+
+
+def results_document(result: LoadResult, target: str) -> Dict[str, object]:
+    """Results in the zimbench JSON format, one group per endpoint."""
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "mode": "load",
+        "target": target,
+        "clients": result.clients,
+        "seconds": result.seconds,
+        "requests": {name: len(s.latencies) for name, s in result.endpoints.items()},
+        "errors": {name: s.errors for name, s in result.endpoints.items()},
+        "results": result.summary(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for load tests."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load-test the ZIM REST API with concurrent clients")
+    parser.add_argument("archive", help="ZIM file to serve and to sample request paths from")
+    parser.add_argument("-c", "--clients", type=int, default=DEFAULT_CLIENTS, help="Concurrent clients")
+    parser.add_argument("-d", "--duration", type=float, default=DEFAULT_DURATION, help="Seconds to run")
+    parser.add_argument("-n", "--requests", type=int, help="Stop after this many requests instead")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="Request weights, e.g. article=60,search=20,list=10,batch=10")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Paths per batch request")
+    parser.add_argument("--warmup", type=int, default=WARMUP_REQUESTS, help="Uncounted requests first")
+    parser.add_argument("--seed", type=int, default=0)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Running server to test (it loads the archive by path)")
+    target.add_argument("--uvicorn", action="store_true", help="Start a local uvicorn server to test")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change flagged as a regression")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if any endpoint's p99 exceeds this")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="Fail above this error fraction")
+    args = parser.parse_args(argv)
+
+    workload = Workload.from_archive(args.archive, parse_mix(args.mix), args.seed)
+    workload.batch_size = args.batch_size
+    options = dict(clients=args.clients, duration=args.duration, requests=args.requests,
+                   seed=args.seed, warmup=args.warmup)
+    server = None
+    try:
+        if args.uvicorn:
+            server, args.url = start_uvicorn()
+        if args.url:
+            result = asyncio.run(run_remote(args.url, args.archive, workload, **options))
+        else:
+            result = asyncio.run(run_in_process(args.archive, workload, **options))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    document = results_document(result, args.url or "asgi")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+            f.write("\n")
+
+    print(f"{result.clients} clients, {result.seconds:.1f} s")
+    print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for name, row in document["results"].items():
+        requests = sum(document["requests"].values()) if name == "all" else document["requests"][name]
+        errors = sum(document["errors"].values()) if name == "all" else document["errors"][name]
+        print(f"{name:<10} {requests:>9} {errors:>7} {row['requests_per_s']:>9.1f} "
+              + " ".join(f"{row[key] * 1000:>9.2f}" for key in ("p50_s", "p95_s", "p99_s", "max_s")))
+
+    failed = result.error_rate() > args.max_error_rate
+    if args.max_p99_ms is not None:
+        failed |= any(row["p99_s"] * 1000 > args.max_p99_ms for row in document["results"].values())
+    if args.baseline:
+        failed |= bool(print_comparisons(compare_results(load_results(args.baseline), document, args.threshold)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
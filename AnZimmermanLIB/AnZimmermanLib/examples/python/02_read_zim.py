@@ -215,13 +215,14 @@ def analyze_namespaces(zim_path: str):
         for entry in zim.directory_entries:
             ns = chr(entry.namespace)
             namespace_counts[ns] = namespace_counts.get(ns, 0) + 1
-            
-            if isinstance(entry, DirectoryEntry):
-                try:
-                    content = zim.get_article_content(entry)
-                    namespace_sizes[ns] = namespace_sizes.get(ns, 0) + len(content)
-                except:
-                    pass
+        
+        # Fetch all content in one sweep, decompressing each cluster once
+        try:
+            for entry, content in zim.get_many(zim.list_articles()):
+                ns = chr(entry.namespace)
+                namespace_sizes[ns] = namespace_sizes.get(ns, 0) + len(content)
+        except Exception:
+            pass
         
         print("\n  Namespace Distribution:")
         print("-" * 40)
@@ -266,7 +267,8 @@ def extract_all_articles(zim_path: str, output_dir: str):
         extracted = 0
         errors = 0
         
-        for article in articles:
+        # get_many visits clusters in disk order and decompresses each once
+        for article, content in zim.get_many(articles):
             try:
                 # Create namespace directory
                 ns = chr(article.namespace)
@@ -278,9 +280,6 @@ def extract_all_articles(zim_path: str, output_dir: str):
                 if not filename:
                     filename = f"unnamed_{extracted}"
                 
-                # Get content
-                content = zim.get_article_content(article)
-                
                 # Determine extension based on MIME type
                 mime_index = article.mimetype_index
                 if mime_index < len(zim.mime_types):
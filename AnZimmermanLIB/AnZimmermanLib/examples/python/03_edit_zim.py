@@ -29,6 +29,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from zimlib import ZIMReader, ZIMWriter, DirectoryEntry, RedirectEntry, Namespace
+from zimtransform import TransformPipeline
 
 
 class ZIMEditor:
@@ -48,6 +49,7 @@ class ZIMEditor:
         self.new_articles = []   # list of (namespace, url, title, content, mime)
         self.new_redirects = []  # list of (namespace, url, title, target_url)
         self.excluded_paths = set()  # paths to exclude from output
+        self.edits = {}  # path -> list of queued (kind, find, replace) text edits
         
     def modify_article(self, path: str, new_content: bytes):
         """
@@ -102,20 +104,16 @@ class ZIMEditor:
         """
         Find and replace text in an article.
         
+        The edit is queued and applied while saving, when the article's
+        cluster is decoded anyway.
+        
         Args:
             path: Article path
             find: Text to find
             replace: Replacement text
         """
-        with ZIMReader(self.source_path) as zim:
-            entry = zim.get_entry_by_path(path)
-            if entry and isinstance(entry, DirectoryEntry):
-                content = zim.get_article_content(entry)
-                text = content.decode('utf-8', errors='replace')
-                new_text = text.replace(find, replace)
-                self.modifications[path] = new_text.encode('utf-8')
-                count = text.count(find)
-                print(f"  🔄 Find/Replace in {path}: {count} occurrences")
+        self.edits.setdefault(path, []).append(('replace', find, replace))
+        print(f"  🔄 Queued find/replace: {path}")
                 
     def regex_replace(self, path: str, pattern: str, replacement: str):
         """
@@ -126,19 +124,29 @@ class ZIMEditor:
             pattern: Regex pattern
             replacement: Replacement string (can use \\1, \\2 for groups)
         """
-        with ZIMReader(self.source_path) as zim:
-            entry = zim.get_entry_by_path(path)
-            if entry and isinstance(entry, DirectoryEntry):
-                content = zim.get_article_content(entry)
-                text = content.decode('utf-8', errors='replace')
-                new_text = re.sub(pattern, replacement, text)
-                self.modifications[path] = new_text.encode('utf-8')
+        self.edits.setdefault(path, []).append(('regex', pattern, replacement))
+        print(f"  🔄 Queued regex replace: {path}")
+    
+    def _apply_edits(self, path: str, content: bytes) -> bytes:
+        """Apply queued text edits for a path to its content."""
+        text = content.decode('utf-8', errors='replace')
+        for kind, find, replace in self.edits[path]:
+            if kind == 'replace':
+                count = text.count(find)
+                text = text.replace(find, replace)
+                print(f"  🔄 Find/Replace in {path}: {count} occurrences")
+            else:
+                text = re.sub(find, replace, text)
                 print(f"  🔄 Regex replace in {path}")
+        return text.encode('utf-8')
     
     def save(self, output_path: str, update_metadata: bool = True):
         """
         Apply all modifications and save to a new ZIM file.
         
+        Clusters without modified or deleted blobs are copied verbatim;
+        only the touched clusters are decompressed and re-encoded.
+        
         Args:
             output_path: Path for the output ZIM file
             update_metadata: Whether to update modification date metadata
@@ -150,46 +158,62 @@ class ZIMEditor:
             with ZIMWriter(output_path) as writer:
                 # Track URL to index mapping for redirects
                 url_to_index = {}
-                current_index = 0
                 
-                # Copy existing entries with modifications
+                # A cluster is "touched" if any of its blobs is modified or
+                # deleted; only those need decoding and re-encoding
+                survivors = []
+                touched = set()
                 for entry in reader.directory_entries:
-                    ns = chr(entry.namespace)
-                    path = f"{ns}/{entry.url}"
+                    if not isinstance(entry, DirectoryEntry):
+                        continue  # Redirects are added later (need target indices)
+                    path = f"{chr(entry.namespace)}/{entry.url}"
                     
-                    # Skip excluded entries
                     if path in self.excluded_paths:
                         print(f"  ⏭️  Skipped (deleted): {path}")
+                        touched.add(entry.cluster_number)
                         continue
+                    if path in self.modifications or path in self.edits:
+                        print(f"  ✏️  Modified: {path}")
+                        touched.add(entry.cluster_number)
+                    survivors.append((entry, path))
+                
+                # Untouched clusters are copied byte for byte, in disk order
+                kept = {entry.cluster_number for entry, _ in survivors} - touched
+                cluster_map = writer.copy_clusters(reader, kept)
+                
+                # Touched clusters are rebuilt from their surviving blobs
+                blob_map = {}
+                members = {}
+                for entry, path in survivors:
+                    if entry.cluster_number in touched:
+                        members.setdefault(entry.cluster_number, []).append((entry, path))
+                for cluster_number in sorted(members, key=lambda c: reader.cluster_offsets[c]):
+                    blobs = reader.read_cluster(cluster_number)
+                    new_blobs = []
+                    for entry, path in members[cluster_number]:
+                        content = self.modifications.get(path, blobs[entry.blob_number])
+                        if path in self.edits:
+                            content = self._apply_edits(path, content)
+                        blob_map[id(entry)] = len(new_blobs)
+                        new_blobs.append(content)
+                    compression = reader.cluster_compression(cluster_number)
+                    cluster_map[cluster_number] = writer.add_cluster(new_blobs, compression)
+                
+                # Directory entries keep their order, pointing at new clusters
+                for entry, path in survivors:
+                    mime_type = "application/octet-stream"
+                    if entry.mimetype_index < len(reader.mime_types):
+                        mime_type = reader.mime_types[entry.mimetype_index]
                     
-                    if isinstance(entry, DirectoryEntry):
-                        # Get content (modified or original)
-                        if path in self.modifications:
-                            content = self.modifications[path]
-                            print(f"  ✏️  Modified: {path}")
-                        else:
-                            content = reader.get_article_content(entry)
-                        
-                        # Get MIME type
-                        mime_type = "application/octet-stream"
-                        if entry.mimetype_index < len(reader.mime_types):
-                            mime_type = reader.mime_types[entry.mimetype_index]
-                        
-                        # Add to writer
-                        writer.add_article(
-                            namespace=entry.namespace,
-                            url=entry.url,
-                            title=entry.title,
-                            content=content,
-                            mime_type=mime_type
-                        )
-                        
-                        url_to_index[path] = current_index
-                        current_index += 1
-                        
-                    elif isinstance(entry, RedirectEntry):
-                        # Store redirect for later (need target indices)
-                        pass
+                    writer.add_entry(
+                        namespace=entry.namespace,
+                        url=entry.url,
+                        title=entry.title,
+                        cluster_number=cluster_map[entry.cluster_number],
+                        blob_number=blob_map.get(id(entry), entry.blob_number),
+                        mime_type=mime_type
+                    )
+                    url_to_index[path] = len(writer.directory_entries) - 1
                 
                 # Add new articles
                 for namespace, url, title, content, mime_type in self.new_articles:
@@ -201,8 +225,7 @@ class ZIMEditor:
                         content=content,
                         mime_type=mime_type
                     )
-                    url_to_index[path] = current_index
-                    current_index += 1
+                    url_to_index[path] = len(writer.directory_entries) - 1
                     print(f"  ➕ Added new: {path}")
                 
                 # Add redirects (existing and new)
@@ -214,9 +237,11 @@ class ZIMEditor:
                         if path in self.excluded_paths:
                             continue
                         
-                        # Find target index
-                        if entry.redirect_index < len(reader.directory_entries):
-                            target = reader.directory_entries[entry.redirect_index]
+                        # Follow chains to the final article, so a redirect
+                        # to a redirect is kept rather than dropped
+                        target_index = reader.resolve_index(entry.redirect_index)
+                        if target_index is not None:
+                            target = reader.directory_entries[target_index]
                             target_path = f"{chr(target.namespace)}/{target.url}"
                             
                             if target_path in url_to_index:
@@ -230,6 +255,14 @@ class ZIMEditor:
                 # Add new redirects
                 for namespace, url, title, target_url in self.new_redirects:
                     target_path = f"{chr(namespace)}/{target_url}"
+                    if target_path not in url_to_index:
+                        # The target may itself be an existing redirect
+                        target_index = reader.get_entry_index_by_path(target_path)
+                        if target_index is not None:
+                            target_index = reader.resolve_index(target_index)
+                        if target_index is not None:
+                            target = reader.directory_entries[target_index]
+                            target_path = f"{chr(target.namespace)}/{target.url}"
                     if target_path in url_to_index:
                         writer.add_redirect(
                             namespace=namespace,
@@ -239,12 +272,13 @@ class ZIMEditor:
                         )
                         print(f"  ↪️  Added redirect: {chr(namespace)}/{url}")
                 
-                # Set main page
-                if reader.header:
-                    writer.main_page_index = min(
-                        reader.header.main_page_index, 
-                        len(writer.directory_entries) - 1
-                    )
+                # Set main page (entries were reordered, so map by path)
+                main_page = reader.get_main_page()
+                if main_page:
+                    main_page = reader.resolve(main_page)
+                if main_page:
+                    main_path = f"{chr(main_page.namespace)}/{main_page.url}"
+                    writer.main_page_index = url_to_index.get(main_path, 0)
         
         print("-" * 50)
         print(f"✅ Saved successfully: {output_path}")
@@ -380,31 +414,17 @@ def example_batch_modifications():
     print("Example: Batch Modifications")
     print("=" * 60)
     
-    editor = ZIMEditor(source)
+    # Add footer to all HTML articles in one pass over the archive
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    footer = f'\n<div class="batch-footer">Batch processed: {timestamp}</div>\n'
     
-    # Add footer to all HTML articles
-    with ZIMReader(source) as reader:
-        for entry in reader.directory_entries:
-            if isinstance(entry, DirectoryEntry):
-                path = f"{chr(entry.namespace)}/{entry.url}"
-                
-                # Only modify HTML articles
-                mime_idx = entry.mimetype_index
-                if mime_idx < len(reader.mime_types):
-                    mime = reader.mime_types[mime_idx]
-                    if 'html' in mime:
-                        content = reader.get_article_content(entry)
-                        text = content.decode('utf-8', errors='replace')
-                        
-                        # Add modification timestamp before </body>
-                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        footer = f'\n<div class="batch-footer">Batch processed: {timestamp}</div>\n'
-                        
-                        if '</body>' in text:
-                            text = text.replace('</body>', footer + '</body>')
-                            editor.modify_article(path, text.encode('utf-8'))
+    pipeline = TransformPipeline()
+    pipeline.add_regex(r'</body>', footer + '</body>', mime_types='text/html')
     
-    editor.save(output)
+    print(f"\n💾 Saving to: {output}")
+    result = pipeline.run(source, output)
+    print(f"  ✏️  Modified {result.blobs_changed} articles "
+          f"({result.clusters_copied} clusters copied unchanged)")
     return output
 
 
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for api/python/zim_api.py
+
+Run with: pytest tests/test_zimapi_python.py -v
+"""
+
+import pytest
+import asyncio
+import gzip
+import json
+import logging
+import os
+import struct
+import sys
+import zlib
+
+# Add parent and API directories to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api', 'python'))
+
+pytest.importorskip('fastapi')
+pytest.importorskip('httpx')
+
+from fastapi.testclient import TestClient
+
+import zim_api
+from zimlib import ZIMWriter, Namespace
+from zimlibrary import ZIMLibrary
+
+
+@pytest.fixture
+def sample_zim(tmp_path):
+    """Create a ZIM file with articles, an image and a redirect."""
+    path = str(tmp_path / 'api.zim')
+    with ZIMWriter(path) as writer:
+        for i in range(30):
+            writer.add_article(Namespace.MAIN_ARTICLE, f'Article_{i}', f'Article {i}',
+                               f'<html><body><p>Article number {i}</p></body></html>'.encode())
+        writer.add_article(Namespace.IMAGE, 'logo.png', '', b'\x89PNG\r\n\x1a\n', 'image/png')
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'Alias', 'Alias', 3)
+    return path
+
+
+@pytest.fixture
+def fresh_metrics(monkeypatch):
+    """Empty request metrics and reader counters for one test."""
+    monkeypatch.setattr(zim_api, 'metrics', zim_api.RequestMetrics())
+    monkeypatch.setattr(zim_api.state, 'archive_stats', {})
+
+
+def _metric_samples(text: str):
+    """Parse Prometheus text into {name{labels}: value}."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            key, value = line.rsplit(' ', 1)
+            samples[key] = float(value)
+    return samples
+
+
+@pytest.fixture
+def client(sample_zim):
+    """A test client with the sample archive loaded."""
+    with TestClient(zim_api.app) as client:
+        response = client.post('/zim/load', json={'path': sample_zim})
+        assert response.status_code == 200
+        yield client
+    if zim_api.state.reader:
+        zim_api.state.reader.close()
+        zim_api.state.reader = None
+    zim_api.state.filename = None
+
+
+def _batch_records(data: bytes):
+    """Split a batch response into (metadata, content) records."""
+    records = []
+    pos = 0
+    while pos < len(data):
+        meta_len, content_len = struct.unpack_from('<II', data, pos)
+        pos += 8
+        meta = json.loads(data[pos:pos + meta_len])
+        pos += meta_len
+        records.append((meta, data[pos:pos + content_len]))
+        pos += content_len
+    return records
+
+
+class TestMetrics:
+    """Tests for request instrumentation and GET /metrics."""
+
+    ARTICLE = '/zim/article/{namespace}/{path:path}'
+
+    def test_per_archive_and_endpoint_samples(self, fresh_metrics, client):
+        """Requests are counted and timed per archive, endpoint and status."""
+        for _ in range(3):
+            assert client.get('/zim/article/A/Article_5').status_code == 200
+        assert client.get('/zim/article/A/Missing').status_code == 404
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/plain')
+        samples = _metric_samples(response.text)
+
+        archive = 'archive="api.zim"'
+        article = f'{archive},endpoint="{self.ARTICLE}"'
+        assert samples[f'zim_http_requests_total{{{article},method="GET",status="200"}}'] == 3
+        assert samples[f'zim_http_requests_total{{{article},method="GET",status="404"}}'] == 1
+        assert samples[f'zim_http_requests_total{{{archive},endpoint="/zim/load",method="POST",status="200"}}'] == 1
+
+        buckets = [(key, value) for key, value in samples.items()
+                   if key.startswith(f'zim_http_request_seconds_bucket{{{article},')]
+        assert len(buckets) == len(zim_api.REQUEST_BUCKETS) + 1
+        assert buckets[-1][0].endswith('le="+Inf"}') and buckets[-1][1] == 4
+        assert [value for _, value in buckets] == sorted(value for _, value in buckets)
+        assert samples[f'zim_http_request_seconds_count{{{article}}}'] == 4
+        assert samples[f'zim_http_request_seconds_sum{{{article}}}'] > 0
+
+        assert samples[f'zim_endpoint_lookups_total{{{article}}}'] == 4
+        assert samples[f'zim_endpoint_read_calls_total{{{article}}}'] > 0
+        assert samples[f'zim_reader_lookups_total{{{archive}}}'] >= 4
+        assert samples[f'zim_reader_read_bytes_total{{{archive}}}'] > 0
+        assert samples[f'zim_reader_cluster_cache_clusters{{{archive}}}'] >= 0
+
+
+class TestTracing:
+    """Tests for the Server-Timing header and the slow-request log."""
+
+    def _timing(self, response):
+        """Server-Timing phases and durations, in header order."""
+        phases = []
+        for part in response.headers['server-timing'].split(', '):
+            name, duration = part.split(';dur=')
+            phases.append((name, float(duration)))
+        return phases
+
+    def test_server_timing_phases(self, client):
+        """Article fetches report their phases in timeline order, then the total."""
+        response = client.get('/zim/article/A/Article_5')
+        phases = self._timing(response)
+        names = [name for name, _ in phases]
+        assert names == ['params', 'lookup', 'read', 'decode', 'handler', 'serialize', 'total']
+        assert all(duration >= 0 for _, duration in phases)
+        durations = dict(phases)
+        assert durations['handler'] >= durations['lookup'] + durations['read']
+        assert durations['total'] >= durations['handler']
+        assert response.headers['timing-allow-origin'] == '*'
+
+        missing = client.get('/zim/article/A/Missing')
+        assert missing.status_code == 404
+        assert [name for name, _ in self._timing(missing)][-1] == 'total'
+
+    def test_slow_request_log(self, client, caplog, monkeypatch):
+        """Requests over slow_request_ms are logged once as a JSON record with their phases."""
+        caplog.set_level(logging.WARNING, logger='zim_api.slow')
+        monkeypatch.setattr(zim_api.state, 'slow_request_ms', 60000.0)
+        client.get('/zim/article/A/Article_5')
+        assert not caplog.records
+
+        monkeypatch.setattr(zim_api.state, 'slow_request_ms', 0.0)
+        client.get('/zim/article/A/Article_5')
+        assert len(caplog.records) == 1
+        record = json.loads(caplog.records[0].getMessage())
+        assert record['event'] == 'slow_request'
+        assert record['method'] == 'GET' and record['status'] == 200
+        assert record['path'] == '/zim/article/A/Article_5'
+        assert record['endpoint'] == '/zim/article/{namespace}/{path:path}'
+        assert record['archive'] == 'api.zim'
+        assert record['total_ms'] >= 0
+        assert {'params', 'lookup', 'read', 'decode', 'handler', 'serialize'} <= set(record['phases_ms'])
+        assert record['calls']['lookup'] >= 1
+
+
+class TestBatch:
+    """Tests for POST /zim/articles/batch."""
+
+    def test_records_in_request_order(self, client, monkeypatch):
+        """Each path gets one length-prefixed record, in request order, without a directory scan."""
+        directory = type(zim_api.state.reader.directory_entries)
+        monkeypatch.setattr(directory, '__iter__', lambda self: pytest.fail('directory scanned'))
+        paths = ['A/Article_7', 'A/Missing', 'I/logo.png', 'A/Article_7', 'A/Alias']
+        response = client.post('/zim/articles/batch', json={'paths': paths})
+        assert response.headers['content-type'] == 'application/x-zim-batch'
+        records = _batch_records(response.content)
+        assert [meta['path'] for meta, _ in records] == paths
+        assert [meta['status'] for meta, _ in records] == [200, 404, 200, 200, 200]
+        assert records[0][1] == b'<html><body><p>Article number 7</p></body></html>'
+        assert records[0] == records[3]
+        assert records[1][1] == b''
+        assert records[2][0]['content_type'] == 'image/png'
+        assert records[4][0]['url'] == 'Article_3' and b'number 3' in records[4][1]
+
+    def test_redirects_not_followed(self, client):
+        """Without follow_redirects a redirect path is not found."""
+        response = client.post('/zim/articles/batch', json={'paths': ['A/Alias'], 'follow_redirects': False})
+        assert _batch_records(response.content)[0][0]['status'] == 404
+
+    def test_unreadable_cluster(self, client, monkeypatch):
+        """Entries of a cluster that fails to decompress get status 500; others are served."""
+        reader = zim_api.state.reader
+        bad = reader.directory_entries[reader.get_entry_index_by_path('I/logo.png')].cluster_number
+        read_blobs = reader._read_blobs
+
+        def failing(cluster_number, blob_numbers):
+            if cluster_number == bad:
+                raise zlib.error('corrupt')
+            return read_blobs(cluster_number, blob_numbers)
+
+        monkeypatch.setattr(reader, '_read_blobs', failing)
+        response = client.post('/zim/articles/batch', json={'paths': ['I/logo.png', 'A/Article_1']})
+        assert [meta['status'] for meta, _ in _batch_records(response.content)] == [500, 200]
+
+
+class TestLibrary:
+    """Tests for GET /zim/library."""
+
+    def test_catalog_created_lazily(self, sample_zim, monkeypatch):
+        """Importing the API reads no catalog; scans run in a worker thread."""
+        assert zim_api.ZIMState.library is None
+        library = ZIMLibrary(None)
+        loops = []
+        scan = library.scan
+        monkeypatch.setattr(library, 'scan', lambda *a, **k: loops.append(asyncio._get_running_loop()) or scan(*a, **k))
+        monkeypatch.setattr(zim_api.state, 'library', library)
+        with TestClient(zim_api.app) as client:
+            response = client.get('/zim/library', params={'directory': os.path.dirname(sample_zim)})
+        assert response.status_code == 200
+        assert [item['path'] for item in response.json()] == [os.path.abspath(sample_zim)]
+        assert loops == [None]
+
+
+class TestExport:
+    """Tests for the JSON and NDJSON exports."""
+
+    def _lines(self, data: bytes):
+        return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+    def test_ndjson_one_record_per_line(self, client):
+        """Every article is one JSON object on its own line."""
+        response = client.get('/zim/export/json', params={'format': 'ndjson'})
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        records = self._lines(response.content)
+        assert len(records) == 31
+        assert records[0].keys() == {'index', 'namespace', 'url', 'title'}
+        assert [r['index'] for r in records] == sorted(r['index'] for r in records)
+
+    def test_ndjson_namespace_filter_and_redirects(self, client):
+        """Namespaces filter records, and redirects carry their resolved target."""
+        response = client.get('/zim/export/json', params={'format': 'ndjson', 'namespace': 'I'})
+        assert [r['url'] for r in self._lines(response.content)] == ['logo.png']
+
+        response = client.get('/zim/export/json', params={'format': 'ndjson', 'namespace': 'A',
+                                                          'redirects': True})
+        records = self._lines(response.content)
+        assert len(records) == 31
+        alias = next(r for r in records if r['url'] == 'Alias')
+        assert records[[r['index'] for r in records].index(alias['redirect_to'])]['url'] == 'Article_3'
+
+    def test_ndjson_gzip(self, client):
+        """The gzip stream decodes to the same lines as the plain one."""
+        plain = client.get('/zim/export/json', params={'format': 'ndjson'}).content
+        with client.stream('GET', '/zim/export/json', params={'format': 'ndjson', 'gzip': True}) as response:
+            assert response.headers['content-encoding'] == 'gzip'
+            raw = b''.join(response.iter_raw())
+        assert raw[:2] == b'\x1f\x8b'
+        assert gzip.decompress(raw) == plain
+
+    def test_article_export_follows_redirects(self, client):
+        """Exporting a redirect returns its target article."""
+        response = client.get('/zim/export/article/A/Alias')
+        assert response.status_code == 200
+        assert response.content == b'<html><body><p>Article number 3</p></body></html>'
+        assert client.get('/zim/export/article/A/Missing').status_code == 404
+
+    def test_json_document(self, client):
+        """The default format is a single document with the article list."""
+        data = client.get('/zim/export/json').json()
+        assert data['filename'] == 'api.zim'
+        assert len(data['articles']) == 31
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
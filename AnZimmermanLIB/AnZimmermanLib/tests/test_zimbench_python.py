@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimbench.py
+
+Run with: pytest tests/test_zimbench_python.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zimlib import ZIMReader, CompressionType, DirectoryEntry, Namespace
+from zimbench import compare_results, generate_corpus, main, run_suite
+
+
+class TestCorpus:
+    """Tests for the synthetic corpus generator."""
+
+    def test_deterministic(self, tmp_path):
+        """The same count and seed give byte-identical archives; another seed does not."""
+        paths = [str(tmp_path / f'{name}.zim') for name in ('a', 'b', 'c')]
+        for path, seed in zip(paths, (1, 1, 2)):
+            generate_corpus(path, 300, seed, content_scale=0.1, compression=CompressionType.ZLIB)
+        with open(paths[0], 'rb') as a, open(paths[1], 'rb') as b, open(paths[2], 'rb') as c:
+            first = a.read()
+            assert first == b.read()
+            assert first != c.read()
+
+    def test_mix(self, tmp_path):
+        """Articles, images, redirects and metadata are present and readable."""
+        path = str(tmp_path / 'corpus.zim')
+        result = generate_corpus(path, 500, content_scale=0.1, compression=CompressionType.ZLIB)
+        assert result.entries == 500 and 50 < result.redirects < 200
+        assert result.write_seconds > 0 and result.finalize_seconds > 0
+        with ZIMReader(path) as reader:
+            assert reader.is_sorted
+            namespaces = {e.namespace for e in reader.directory_entries}
+            assert {Namespace.MAIN_ARTICLE, Namespace.IMAGE, Namespace.METADATA} <= namespaces
+            redirects = [e for e in reader.directory_entries if not isinstance(e, DirectoryEntry)]
+            assert len(redirects) == result.redirects
+            assert all(reader.resolve(e) is not None for e in redirects)
+            main_page = reader.get_main_page()
+            assert reader.get_article_content(main_page).startswith(b'<html><head><title>')
+            assert 'image/jpeg' in reader.mime_types
+
+
+class TestSuite:
+    """Tests for running and comparing benchmarks."""
+
+    def test_run_suite(self, tmp_path):
+        """Every metric is reported for each size and corpora are removed."""
+        results = run_suite(['200'], content_scale=0.05, work_dir=str(tmp_path), sample_size=50)
+        metrics = results['results']['200']
+        assert {'write_entries_per_s', 'finalize_s', 'open_s', 'open_snapshot_s', 'lookup_s',
+                'fetch_cold_s', 'fetch_warm_s', 'list_s', 'search_index_s', 'search_s'} <= set(metrics)
+        assert all(value > 0 for value in metrics.values())
+        assert os.listdir(tmp_path) == []
+
+    def test_memory_mode(self, tmp_path):
+        """Memory mode reports build, open, serving and per-structure figures."""
+        results = run_suite(['300'], content_scale=0.05, work_dir=str(tmp_path), sample_size=50, memory=True)
+        assert results['mode'] == 'memory'
+        metrics = results['results']['300']
+        assert metrics['write_peak_bytes'] > metrics['write_steady_bytes']
+        assert metrics['open_steady_bytes'] > metrics['open_snapshot_steady_bytes'] > 0
+        assert metrics['serve_steady_bytes'] > 0
+        assert metrics['report_total_bytes'] == sum(metrics[f'report_{name}_bytes'] for name in
+                                                    ('directory', 'strings', 'caches', 'indexes', 'other'))
+        assert os.listdir(tmp_path) == []
+
+    def test_compare_flags_regressions(self):
+        """Slower durations and lower throughput beyond the threshold are regressions."""
+        baseline = {'version': 1, 'results': {'10k': {'lookup_s': 1.0, 'open_s': 1.0,
+                                                      'write_entries_per_s': 100.0, 'gone_s': 1.0}}}
+        current = {'version': 1, 'results': {'10k': {'lookup_s': 1.5, 'open_s': 0.5,
+                                                     'write_entries_per_s': 50.0, 'new_s': 1.0},
+                                             '1m': {'lookup_s': 2.0}}}
+        comparisons = {c.metric: c for c in compare_results(baseline, current, threshold=0.2)}
+        assert set(comparisons) == {'lookup_s', 'open_s', 'write_entries_per_s'}
+        assert comparisons['lookup_s'].regression and comparisons['lookup_s'].change == pytest.approx(0.5)
+        assert not comparisons['open_s'].regression
+        assert comparisons['write_entries_per_s'].regression
+
+    def test_compare_command(self, tmp_path, capsys):
+        """compare exits non-zero only when something regressed."""
+        base, fast, slow = (tmp_path / name for name in ('base.json', 'fast.json', 'slow.json'))
+        base.write_text('{"version": 1, "results": {"10k": {"lookup_s": 1.0}}}')
+        fast.write_text('{"version": 1, "results": {"10k": {"lookup_s": 0.9}}}')
+        slow.write_text('{"version": 1, "results": {"10k": {"lookup_s": 1.3}}}')
+        assert main(['compare', str(base), str(fast)]) == 0
+        assert main(['compare', str(base), str(slow)]) == 1
+        assert 'REGRESSION' in capsys.readouterr().out
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimdiff.py
+
+Run with: pytest tests/test_zimdiff_python.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zimlib import ZIMReader, ZIMWriter, CompressionType, Namespace
+from zimdiff import apply_patch, diff_archives, main
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def archives(tmp_path):
+    """Create an old archive and a new one sharing most of its clusters."""
+    old = str(tmp_path / 'old.zim')
+    new = str(tmp_path / 'new.zim')
+    with ZIMWriter(old) as writer:
+        for i in range(20):
+            writer.add_cluster([(b'article %d ' % i) * 200], CompressionType.ZLIB)
+            writer.add_entry(Namespace.MAIN_ARTICLE, f'a{i}', f'A {i}', i, 0)
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'alias', 'Alias', 5)
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'alias2', 'Alias 2', 20)
+        writer.main_page_index = 1
+
+    # New version: a7 edited, a12 deleted, an image added
+    with ZIMReader(old) as reader, ZIMWriter(new) as writer:
+        kept = [c for c in range(20) if c not in (7, 12)]
+        mapping = writer.copy_clusters(reader, kept)
+        edited = writer.add_cluster([b'article 7 revised'], CompressionType.ZLIB)
+        for i in range(20):
+            if i == 12:
+                continue
+            cluster = edited if i == 7 else mapping[i]
+            writer.add_entry(Namespace.MAIN_ARTICLE, f'a{i}', f'A {i}', cluster, 0)
+        writer.add_article(Namespace.IMAGE, 'logo.png', 'logo', b'\x89PNG', 'image/png')
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'alias', 'Alias', 5)
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'alias2', 'Alias 2', 20)
+        writer.main_page_index = 1
+    return old, new
+
+
+class TestZimDiff:
+    """Tests for patch creation and application."""
+
+    def test_round_trip_is_byte_identical(self, archives, tmp_path):
+        """Applying the patch to the old archive reproduces the new one exactly."""
+        old, new = archives
+        patch = str(tmp_path / 'update.zimpatch')
+        rebuilt = str(tmp_path / 'rebuilt.zim')
+        stats = diff_archives(old, new, patch)
+        apply_patch(old, patch, rebuilt)
+        assert _read(rebuilt) == _read(new)
+        assert stats.clusters_copied == 18 and stats.clusters_added == 2
+
+    def test_patch_is_compact(self, archives, tmp_path):
+        """Reused clusters and directory runs are referenced, not shipped."""
+        old, new = archives
+        patch = str(tmp_path / 'update.zimpatch')
+        stats = diff_archives(old, new, patch)
+        assert stats.patch_bytes == os.path.getsize(patch)
+        assert stats.patch_bytes < os.path.getsize(new) // 2
+        # Only a7 (new cluster) and the logo are inlined; the redirect
+        # chain alias2 -> alias -> a5 is copied with renumbered targets
+        assert stats.entries_inserted == 2
+        assert stats.entries_copied == 20
+
+    def test_unrelated_archives(self, archives, tmp_path):
+        """A patch between unrelated archives still round-trips."""
+        old, _ = archives
+        other = str(tmp_path / 'other.zim')
+        with ZIMWriter(other) as writer:
+            writer.add_article(Namespace.MAIN_ARTICLE, 'x', 'X', b'fresh')
+        patch = str(tmp_path / 'other.zimpatch')
+        rebuilt = str(tmp_path / 'rebuilt.zim')
+        diff_archives(old, other, patch)
+        apply_patch(old, patch, rebuilt)
+        assert _read(rebuilt) == _read(other)
+
+    def test_sorted_archive_round_trip(self, archives, tmp_path):
+        """A sorted new archive is rebuilt sorted and byte-identical."""
+        old, _ = archives
+        new = str(tmp_path / 'sorted.zim')
+        with ZIMReader(old) as reader, ZIMWriter(new, sort_entries=True) as writer:
+            mapping = writer.copy_clusters(reader, range(20))
+            for i in reversed(range(20)):
+                writer.add_entry(Namespace.MAIN_ARTICLE, f'a{i}', f'A {i}', mapping[i], 0)
+            writer.add_redirect_to_path(Namespace.MAIN_ARTICLE, 'alias', 'Alias', 'A/a5')
+            writer.main_page_path = 'A/a1'
+        patch = str(tmp_path / 'sorted.zimpatch')
+        rebuilt = str(tmp_path / 'rebuilt.zim')
+        diff_archives(old, new, patch)
+        apply_patch(old, patch, rebuilt)
+        assert _read(rebuilt) == _read(new)
+        with ZIMReader(rebuilt) as reader:
+            assert reader.is_sorted
+
+    def test_wrong_base_rejected(self, archives, tmp_path):
+        """Patches refuse to apply to a different base archive."""
+        old, new = archives
+        patch = str(tmp_path / 'update.zimpatch')
+        diff_archives(old, new, patch)
+        with pytest.raises(ValueError):
+            apply_patch(new, patch, str(tmp_path / 'bad.zim'))
+
+    def test_cli(self, archives, tmp_path):
+        """The CLI diffs and applies."""
+        old, new = archives
+        patch = str(tmp_path / 'cli.zimpatch')
+        rebuilt = str(tmp_path / 'cli.zim')
+        assert main(['diff', old, new, patch]) == 0
+        assert main(['apply', old, patch, rebuilt]) == 0
+        assert _read(rebuilt) == _read(new)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimextract.py
+
+Run with: pytest tests/test_zimextract_python.py -v
+"""
+
+import pytest
+import os
+import sys
+import zlib
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zimlib import ZIMReader, ZIMWriter, Namespace
+from zimextract import _redirect_stub, extract_archive, main
+
+
+def _tree(root):
+    """Return {relative path: bytes} for every file under root."""
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            full = os.path.join(dirpath, name)
+            with open(full, 'rb') as f:
+                files[os.path.relpath(full, root).replace(os.sep, '/')] = f.read()
+    return files
+
+
+@pytest.fixture
+def sample_zim(tmp_path):
+    """Create a ZIM file with nested paths, a redirect and an unsafe URL."""
+    path = str(tmp_path / 'extract.zim')
+    with ZIMWriter(path) as writer:
+        for i in range(12):
+            writer.add_article(Namespace.MAIN_ARTICLE, f'wiki/Page_{i}', f'Page {i}',
+                               f'<html><body>page {i}</body></html>'.encode())
+        writer.add_article(Namespace.IMAGE, 'img/logo.png', 'logo', b'\x89PNG', 'image/png')
+        writer.add_article(Namespace.MAIN_ARTICLE, '../escape', 'Escape', b'nope')
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'wiki/Alias', 'Alias', 3)
+    return path
+
+
+class TestExtractArchive:
+    """Tests for directory extraction."""
+
+    def test_extracts_contents(self, sample_zim, tmp_path):
+        """Articles land at <namespace>/<url> with their exact bytes."""
+        out = str(tmp_path / 'out')
+        result = extract_archive(sample_zim, out)
+        files = _tree(out)
+        assert files['A/wiki/Page_5'] == b'<html><body>page 5</body></html>'
+        assert files['I/img/logo.png'] == b'\x89PNG'
+        assert result.files == 13
+        assert result.bytes == sum(len(v) for k, v in files.items() if k != 'A/wiki/Alias')
+
+    def test_redirect_stub_and_unsafe_path(self, sample_zim, tmp_path):
+        """Redirects forward relatively; escaping URLs are reported, not written."""
+        out = str(tmp_path / 'out')
+        result = extract_archive(sample_zim, out)
+        assert result.redirects == 1
+        assert b'url=Page_3' in _tree(out)['A/wiki/Alias']
+        assert not os.path.exists(tmp_path / 'escape')
+        assert any('unsafe path' in e for e in result.errors)
+
+    def test_redirect_stub_escapes_url(self):
+        """Target URLs are percent-encoded in links and escaped as HTML."""
+        stub = _redirect_stub('A/wiki/Alias', 'A/wiki/"Q&A"<b>?#50%').decode('utf-8')
+        assert 'url=%22Q%26A%22%3Cb%3E%3F%2350%25"' in stub
+        assert 'href="%22Q%26A%22%3Cb%3E%3F%2350%25"' in stub
+        assert '>&quot;Q&amp;A&quot;&lt;b&gt;?#50%</a>' in stub
+        assert '<b>' not in stub
+
+    def test_unreadable_cluster_skipped(self, sample_zim, tmp_path, monkeypatch):
+        """A cluster that fails to decompress is reported; the others are still written."""
+        with ZIMReader(sample_zim) as reader:
+            bad = reader.directory_entries[reader.get_entry_index_by_path('I/img/logo.png')].cluster_number
+        read_blobs = ZIMReader._read_blobs
+
+        def failing(self, cluster_number, blob_numbers):
+            if cluster_number == bad:
+                raise zlib.error('corrupt')
+            return read_blobs(self, cluster_number, blob_numbers)
+
+        monkeypatch.setattr(ZIMReader, '_read_blobs', failing)
+        out = str(tmp_path / 'out')
+        result = extract_archive(sample_zim, out)
+        files = _tree(out)
+        assert 'I/img/logo.png' not in files
+        assert files['A/wiki/Page_11'] == b'<html><body>page 11</body></html>'
+        assert any(f'cluster {bad} read failed' in e for e in result.errors)
+
+    def test_parallel_matches_serial(self, sample_zim, tmp_path):
+        """Worker processes produce the same tree as a serial run."""
+        serial = str(tmp_path / 'serial')
+        parallel = str(tmp_path / 'parallel')
+        extract_archive(sample_zim, serial, workers=1)
+        extract_archive(sample_zim, parallel, workers=3)
+        assert _tree(serial) == _tree(parallel)
+
+    def test_cli(self, sample_zim, tmp_path, capsys):
+        """The CLI extracts and reports errors through its exit status."""
+        out = str(tmp_path / 'cli')
+        assert main([sample_zim, out, '-j', '1', '--no-redirects']) == 1
+        assert 'A/wiki/Page_0' in _tree(out)
+        assert 'A/wiki/Alias' not in _tree(out)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimfulltext.py
+
+Run with: pytest tests/test_zimfulltext_python.py -v
+"""
+
+import pytest
+import os
+import struct
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zimlib import ZIMReader, ZIMWriter, Namespace, AccessPattern
+from zimfulltext import (
+    FullTextIndex,
+    batch_reader,
+    build_fulltext_index,
+    extract_text,
+    open_fulltext_index,
+)
+
+
+ARTICLES = [
+    ('Python', 'Python', '<html><head><style>.x{}</style></head><body><p>Python is a programming '
+                         'language. Python emphasises readability.</p></body></html>'),
+    ('Snake', 'Snake', '<html><body><p>A python is a large snake found in Africa and Asia.</p>'
+                       '<script>var python = 1;</script></body></html>'),
+    ('Rust', 'Rust', '<html><body><p>Rust is a systems programming language &amp; toolchain.</p></body></html>'),
+    ('Filler', 'Filler', '<html><body><p>Nothing relevant here at all.</p></body></html>'),
+]
+
+
+@pytest.fixture
+def sample_zim(tmp_path):
+    """Create a ZIM file with a few HTML articles and a stylesheet."""
+    path = str(tmp_path / 'fulltext.zim')
+    with ZIMWriter(path) as writer:
+        for url, title, html in ARTICLES:
+            writer.add_article(Namespace.MAIN_ARTICLE, url, title, html.encode('utf-8'))
+        writer.add_article(Namespace.STYLE, 'python.css', 'python', b'python { }', 'text/css')
+    return path
+
+
+class TestExtractText:
+    """Tests for HTML text extraction."""
+
+    def test_strips_markup_scripts_and_entities(self):
+        """Scripts and styles are dropped and entities decoded."""
+        text = extract_text(ARTICLES[1][2].encode() + ARTICLES[2][2].encode())
+        assert 'var python' not in text
+        assert 'large snake' in text
+        assert '&amp;' not in text and '& toolchain' in text
+
+
+class TestFullTextIndex:
+    """Tests for building and querying the BM25 index."""
+
+    def test_build_and_search(self, sample_zim):
+        """Documents are ranked by BM25 and non-HTML entries are skipped."""
+        with ZIMReader(sample_zim) as reader:
+            build_fulltext_index(reader)
+            with FullTextIndex(reader) as index:
+                assert index.doc_count == 4
+                hits = index.search('python')
+                assert [h.entry.url for h in hits] == ['Python', 'Snake']
+                assert hits[0].score > hits[1].score
+
+    def test_multi_term_and_snippet(self, sample_zim):
+        """Multi-term queries sum scores; snippets show matching text."""
+        with ZIMReader(sample_zim) as reader:
+            build_fulltext_index(reader)
+            with FullTextIndex(reader) as index:
+                hits = index.search('programming language', limit=1)
+                assert hits[0].entry.url in ('Python', 'Rust')
+                assert 'programming' in hits[0].snippet.lower()
+
+    def test_unknown_term(self, sample_zim):
+        """Queries with no indexed terms return nothing."""
+        with ZIMReader(sample_zim) as reader:
+            build_fulltext_index(reader)
+            with FullTextIndex(reader) as index:
+                assert index.search('zebra') == []
+
+    def test_parallel_build_matches_serial(self, sample_zim, tmp_path):
+        """Building with worker processes writes an identical sidecar."""
+        serial = str(tmp_path / 'serial.idx')
+        parallel = str(tmp_path / 'parallel.idx')
+        with ZIMReader(sample_zim) as reader:
+            build_fulltext_index(reader, serial, workers=1)
+            build_fulltext_index(reader, parallel, workers=2)
+        with open(serial, 'rb') as a, open(parallel, 'rb') as b:
+            assert a.read() == b.read()
+
+    def test_serial_build_reuses_reader(self, sample_zim, monkeypatch):
+        """A one-worker build parses no directory and restores the access pattern."""
+        with ZIMReader(sample_zim) as reader:
+            reader.advise(AccessPattern.RANDOM)
+            monkeypatch.setattr(ZIMReader, '_read_directory', lambda self: pytest.fail('directory parsed'))
+            build_fulltext_index(reader, workers=1)
+            assert reader.access_pattern == AccessPattern.RANDOM
+        with batch_reader(sample_zim) as reader:
+            assert len(reader.directory_entries) == 0
+            assert reader.read_cluster(0)
+
+    def test_missing_or_stale_sidecar(self, sample_zim):
+        """No index is opened without a matching sidecar."""
+        with ZIMReader(sample_zim) as reader:
+            assert open_fulltext_index(reader) is None
+            build_fulltext_index(reader)
+        with open(sample_zim, 'ab') as f:
+            f.write(b'\x00')
+        with ZIMReader(sample_zim) as reader:
+            assert open_fulltext_index(reader) is None
+
+
+    def test_corrupt_sidecar_is_a_miss(self, sample_zim):
+        """Truncated or damaged sidecars are rejected on open, not on search."""
+        with ZIMReader(sample_zim) as reader:
+            path = build_fulltext_index(reader)
+        data = open(path, 'rb').read()
+        term_pos = struct.unpack_from('<Q', data, 48)[0]
+        damaged = bytearray(data)
+        struct.pack_into('<Q', damaged, term_pos, 1 << 40)  # first term's string offset
+        for variant in (data[:-1], data[:len(data) // 2], data[:72], bytes(damaged)):
+            with open(path, 'wb') as f:
+                f.write(variant)
+            with ZIMReader(sample_zim) as reader:
+                assert open_fulltext_index(reader) is None
+        with open(path, 'wb') as f:
+            f.write(data)
+        with ZIMReader(sample_zim) as reader:
+            assert open_fulltext_index(reader) is not None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
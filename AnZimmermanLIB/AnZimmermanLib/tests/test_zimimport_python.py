@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimimport.py
+
+Run with: pytest tests/test_zimimport_python.py -v
+"""
+
+import pytest
+import gzip
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zimlib import ZIMReader, CodecPolicy, CompressionType, Namespace
+from zimextract import extract_archive
+from zimimport import guess_mime_type, import_directory, import_warc, read_files
+
+
+@pytest.fixture
+def site(tmp_path):
+    """Create a small static site with pages, assets and a redirects file."""
+    root = tmp_path / 'site'
+    (root / 'docs' / 'img').mkdir(parents=True)
+    (root / 'index.html').write_bytes(b'<html><head><title>Home &amp; more</title></head><body>hi</body></html>')
+    (root / 'docs' / 'guide.html').write_bytes(b'<html><body>no title</body></html>')
+    (root / 'docs' / 'img' / 'logo.png').write_bytes(b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 8)
+    (root / 'style.css').write_bytes(b'body { color: red }' * 100)
+    (root / 'README').write_bytes(b'plain text readme')
+    redirects = tmp_path / 'redirects.tsv'
+    redirects.write_text('home\tHome\tindex.html\nold/guide\tOld guide\tdocs/guide.html\n'
+                         'chain\tChain\thome\nbroken\tBroken\tmissing.html\n', encoding='utf-8')
+    return str(root), str(redirects)
+
+
+def _contents(path):
+    """Return {path: (mime type, content)} for every article of an archive."""
+    with ZIMReader(path) as reader:
+        return {f'{chr(e.namespace)}/{e.url}': (reader.mime_types[e.mimetype_index], c)
+                for e, c in reader.get_many(reader.list_articles())}
+
+
+class TestImportDirectory:
+    """Tests for directory-tree imports."""
+
+    def test_files_titles_and_mime_types(self, site, tmp_path):
+        """Every file is imported under A/ with a detected MIME type and title."""
+        root, _ = site
+        output = str(tmp_path / 'site.zim')
+        result = import_directory(root, output, metadata={'Language': 'eng'}, workers=3, cluster_size=1000)
+        assert result.errors == []
+        assert result.clusters > 2
+
+        contents = _contents(output)
+        assert contents['A/docs/img/logo.png'][0] == 'image/png'
+        assert contents['A/README'] == ('text/plain', b'plain text readme')
+        assert contents['A/style.css'][1] == b'body { color: red }' * 100
+        assert contents['M/Language'][1] == b'eng'
+        assert contents['M/Title'][1] == b'site'
+        with ZIMReader(output) as reader:
+            assert reader.get_main_page().title == 'Home & more'
+            assert reader.get_entry_by_path('A/docs/guide.html').title == 'docs/guide.html'
+            png = reader.get_entry_by_path('A/docs/img/logo.png')
+            css = reader.get_entry_by_path('A/style.css')
+            assert reader.cluster_compression(png.cluster_number) == CompressionType.NONE
+            assert reader.cluster_compression(css.cluster_number) == CompressionType.LZMA
+
+    def test_redirects(self, site, tmp_path):
+        """Redirects resolve, including chains; missing targets are reported."""
+        root, redirects = site
+        output = str(tmp_path / 'site.zim')
+        result = import_directory(root, output, redirects=redirects, compression=CompressionType.ZLIB)
+        assert result.redirects == 4
+        assert len(result.errors) == 1 and 'missing.html' in result.errors[0]
+        with ZIMReader(output) as reader:
+            assert reader.resolve(reader.get_entry_by_path('A/chain')).url == 'index.html'
+            assert reader.resolve(reader.get_entry_by_path('A/old/guide')).url == 'docs/guide.html'
+            assert reader.resolve(reader.get_entry_by_path('A/broken')) is None
+
+    def test_extracted_tree_round_trip(self, site, tmp_path):
+        """A zimextract output tree is re-imported with its namespaces."""
+        root, _ = site
+        first, second = str(tmp_path / 'first.zim'), str(tmp_path / 'second.zim')
+        import_directory(root, first, metadata={'Title': 'Original'})
+        extract_archive(first, str(tmp_path / 'out'), redirects=False)
+        import_directory(str(tmp_path / 'out'), second, main_page='A/index.html')
+        assert _contents(second) == _contents(first)
+        with ZIMReader(second) as reader:
+            assert reader.get_main_page().url == 'index.html'
+
+    def test_codec_policy(self, site, tmp_path):
+        """A policy's namespace and MIME overrides pick each cluster's codec."""
+        root, _ = site
+        output = str(tmp_path / 'site.zim')
+        policy = CodecPolicy(CompressionType.ZLIB, namespaces={Namespace.METADATA: (CompressionType.NONE, None)},
+                             mime_types={'text/css': (CompressionType.LZMA, 0)})
+        import_directory(root, output, policy=policy)
+        with ZIMReader(output) as reader:
+            codecs = {path: reader.cluster_compression(reader.get_entry_by_path(path).cluster_number)
+                      for path in ('A/index.html', 'A/style.css', 'A/docs/img/logo.png', 'M/Title')}
+        assert codecs == {'A/index.html': CompressionType.ZLIB, 'A/style.css': CompressionType.LZMA,
+                          'A/docs/img/logo.png': CompressionType.NONE, 'M/Title': CompressionType.NONE}
+        assert _contents(output)['A/style.css'][1] == b'body { color: red }' * 100
+
+    def test_zstd_dictionary(self, tmp_path):
+        """Held-back ZSTD clusters are trained on and primed with a stored dictionary."""
+        pytest.importorskip('zstandard')
+        root = tmp_path / 'pages'
+        root.mkdir()
+        nav = ''.join(f'<li><a href="/p{i}.html">Link {i}</a></li>' for i in range(40))
+        for i in range(200):
+            (root / f'p{i}.html').write_text(f'<html><title>P{i}</title><ul>{nav}</ul><p>{i * 7919}</p></html>')
+        output = str(tmp_path / 'pages.zim')
+        import_directory(str(root), output, cluster_size=4096, compression=CompressionType.ZSTD,
+                         dictionary_size=8192)
+        with ZIMReader(output) as reader:
+            assert reader.read_zstd_dictionary() is not None
+            page = reader.get_entry_by_path('A/p150.html')
+            assert reader.cluster_compression(page.cluster_number) == CompressionType.ZSTD
+            assert reader.get_article_content(page).endswith(b'<p>1187850</p></html>')
+            assert reader._zstd_primed
+
+    def test_read_ahead_is_bounded(self, tmp_path):
+        """read_files keeps order and never runs more than max_files ahead."""
+        for i in range(20):
+            (tmp_path / f'f{i:02d}').write_bytes(b'%d' % i)
+        files = ((f'f{i:02d}', 1) for i in range(20))
+        seen = []
+
+        def tracked():
+            for item in files:
+                seen.append(item[0])
+                yield item
+
+        for n, (name, content) in enumerate(read_files(str(tmp_path), tracked(), workers=2, max_files=3)):
+            assert content == b'%d' % n
+            assert len(seen) <= n + 4
+
+
+def _warc_record(kind, uri, payload, content_type='application/http; msgtype=response'):
+    """Serialize one WARC record."""
+    head = (f'WARC/1.0\r\nWARC-Type: {kind}\r\nWARC-Target-URI: {uri}\r\n'
+            f'Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n\r\n').encode()
+    return head + payload + b'\r\n\r\n'
+
+
+class TestImportWarc:
+    """Tests for WARC imports."""
+
+    def test_responses_redirects_and_resources(self, tmp_path):
+        """200s become entries, 3xx become redirects, first capture wins."""
+        page = b'<html><title>Start</title>welcome</html>'
+        chunked = b'%x\r\n%s\r\n0\r\n\r\n' % (len(gzip.compress(page)), gzip.compress(page))
+        records = [
+            _warc_record('warcinfo', '', b'software: test', 'application/warc-fields'),
+            _warc_record('request', 'http://ex.org/', b'GET / HTTP/1.1\r\n\r\n'),
+            _warc_record('response', 'http://ex.org/', b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                         b'Transfer-Encoding: chunked\r\nContent-Encoding: gzip\r\n\r\n' + chunked),
+            _warc_record('response', 'http://ex.org/', b'HTTP/1.1 200 OK\r\n\r\nsecond capture'),
+            _warc_record('response', 'http://ex.org/home', b'HTTP/1.1 301 Moved\r\nLocation: /\r\n\r\n'),
+            _warc_record('response', 'http://ex.org/gone', b'HTTP/1.1 404 Not Found\r\n\r\nnope'),
+            _warc_record('resource', 'http://ex.org/data.json', b'{"a": 1}', 'application/json'),
+        ]
+        path = str(tmp_path / 'crawl.warc.gz')
+        with gzip.open(path, 'wb') as f:
+            f.write(b''.join(records))
+
+        output = str(tmp_path / 'crawl.zim')
+        result = import_warc(path, output, metadata={'Title': 'Crawl'})
+        assert (result.articles, result.redirects, result.errors) == (4, 1, [])
+        contents = _contents(output)
+        assert contents['A/ex.org/index.html'] == ('text/html', page)
+        assert contents['A/ex.org/data.json'] == ('application/json', b'{"a": 1}')
+        assert 'A/ex.org/gone' not in contents
+        with ZIMReader(output) as reader:
+            assert reader.get_main_page().title == 'Start'
+            assert reader.resolve(reader.get_entry_by_path('A/ex.org/home')).url == 'ex.org/index.html'
+
+
+def test_guess_mime_type():
+    """Extensions win; otherwise content is sniffed."""
+    assert guess_mime_type('a/b.svg') == 'image/svg+xml'
+    assert guess_mime_type('page', b'  <!DOCTYPE html><html>') == 'text/html'
+    assert guess_mime_type('blob', b'\x89PNG\r\n') == 'image/png'
+    assert guess_mime_type('blob', b'\xff\xfe\x00bin') == 'application/octet-stream'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
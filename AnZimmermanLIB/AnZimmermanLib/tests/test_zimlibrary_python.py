@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimlibrary.py
+
+Run with: pytest tests/test_zimlibrary_python.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zimlibrary
+from zimlib import ZIMReader, ZIMWriter, Namespace
+from zimlibrary import ZIMLibrary, metadata_entries, read_catalog_entry
+
+
+def _write_archive(path, title, language, articles=5, sort_entries=False):
+    """Write an archive with metadata entries scattered among articles."""
+    with ZIMWriter(path, sort_entries=sort_entries) as writer:
+        for i in range(articles):
+            writer.add_article(Namespace.MAIN_ARTICLE, f'p{i}', f'P {i}', b'<p>x</p>')
+        writer.add_article(Namespace.METADATA, 'Title', 'Title', title.encode(), 'text/plain')
+        writer.add_article(Namespace.IMAGE, 'logo.png', 'logo', b'\x89PNG', 'image/png')
+        writer.add_article(Namespace.METADATA, 'Language', 'Language', language.encode(), 'text/plain')
+        writer.add_article(Namespace.METADATA, 'Illustration_48x48@1', 'icon', b'\x00' * 5000, 'image/png')
+        writer.add_redirect(Namespace.METADATA, 'Alias', 'Alias', 0)
+
+
+@pytest.fixture
+def library_dir(tmp_path):
+    """Create a directory with two archives and an unrelated file."""
+    root = tmp_path / 'library'
+    (root / 'sub').mkdir(parents=True)
+    _write_archive(str(root / 'wiki.zim'), 'Wikipedia', 'eng')
+    _write_archive(str(root / 'sub' / 'books.zim'), 'Büchersammlung', 'deu', articles=3)
+    (root / 'notes.txt').write_text('not an archive')
+    return root
+
+
+class TestCatalogEntry:
+    """Tests for reading a single archive's catalog entry."""
+
+    def test_reads_metadata_without_directory(self, library_dir, monkeypatch):
+        """Header counts and M/ text values are read without parsing the directory."""
+        monkeypatch.setattr(ZIMReader, '_read_directory', lambda self: pytest.fail('directory parsed'))
+        item = read_catalog_entry(str(library_dir / 'sub' / 'books.zim'))
+        assert item.error is None
+        assert item.title == 'Büchersammlung'
+        assert item.language == 'deu'
+        assert item.article_count == 7 and item.redirect_count == 1
+        assert 'Illustration_48x48@1' not in item.metadata
+        assert 'text/plain' in item.mime_types
+
+    def test_metadata_entries(self, library_dir):
+        """Only M/ content entries are returned."""
+        with ZIMReader(str(library_dir / 'wiki.zim')) as reader:
+            urls = sorted(e.url for e in metadata_entries(reader))
+        assert urls == ['Illustration_48x48@1', 'Language', 'Title']
+
+    def test_metadata_entries_sorted(self, tmp_path):
+        """Sorted archives are searched for their contiguous M/ range."""
+        path = str(tmp_path / 'sorted.zim')
+        _write_archive(path, 'Sorted', 'fra', sort_entries=True)
+        with ZIMReader(path) as reader:
+            assert reader.is_sorted
+            assert [e.url for e in metadata_entries(reader)] == ['Illustration_48x48@1', 'Language', 'Title']
+        assert read_catalog_entry(path).metadata == {'Title': 'Sorted', 'Language': 'fra'}
+
+    def test_broken_file(self, tmp_path):
+        """Unreadable archives are reported, not raised."""
+        path = tmp_path / 'broken.zim'
+        path.write_bytes(b'not a zim file at all' * 10)
+        assert read_catalog_entry(str(path)).error
+
+
+class TestZIMLibrary:
+    """Tests for scanning and caching."""
+
+    def test_scan_and_cache(self, library_dir, tmp_path, monkeypatch):
+        """A rescan of unchanged files is served from the persistent cache."""
+        cache = str(tmp_path / 'catalog.json')
+        items = ZIMLibrary(cache, workers=2).scan([str(library_dir)])
+        assert sorted(i.title for i in items) == ['Büchersammlung', 'Wikipedia']
+
+        monkeypatch.setattr(zimlibrary, 'read_catalog_entry', lambda p: pytest.fail(f'reread {p}'))
+        again = ZIMLibrary(cache).scan([str(library_dir)])
+        assert [i.title for i in again] == [i.title for i in items]
+
+    def test_changed_and_removed_files(self, library_dir, tmp_path):
+        """Modified archives are reread; deleted ones drop out of the cache."""
+        cache = str(tmp_path / 'catalog.json')
+        library = ZIMLibrary(cache)
+        library.scan([str(library_dir)])
+
+        _write_archive(str(library_dir / 'wiki.zim'), 'Wikipedia 2', 'eng', articles=9)
+        os.utime(library_dir / 'wiki.zim', (1, 1))
+        os.remove(library_dir / 'sub' / 'books.zim')
+
+        items = ZIMLibrary(cache).scan([str(library_dir)])
+        assert [(i.title, i.article_count) for i in items] == [('Wikipedia 2', 13)]
+        assert len(ZIMLibrary(cache).entries) == 1
+
+    def test_non_recursive(self, library_dir):
+        """recursive=False ignores subdirectories."""
+        items = ZIMLibrary(None).scan([str(library_dir)], recursive=False)
+        assert [os.path.basename(i.path) for i in items] == ['wiki.zim']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
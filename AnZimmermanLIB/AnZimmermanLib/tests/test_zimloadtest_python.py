@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for api/python/zim_loadtest.py
+
+Run with: pytest tests/test_zimloadtest_python.py -v
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import sys
+
+# Add parent and API directories to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api', 'python'))
+
+pytest.importorskip('fastapi')
+pytest.importorskip('httpx')
+
+from zimbench import generate_corpus
+from zimlib import CompressionType
+from zim_loadtest import EndpointStats, Workload, main, parse_mix, run_in_process
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    """A small synthetic archive."""
+    path = str(tmp_path_factory.mktemp('load') / 'corpus.zim')
+    generate_corpus(path, 400, content_scale=0.05, compression=CompressionType.ZLIB)
+    return path
+
+
+def test_percentiles():
+    """Percentiles use the nearest rank."""
+    stats = EndpointStats([float(i) for i in range(100, 0, -1)])
+    assert (stats.percentile(0.5), stats.percentile(0.95), stats.percentile(0.99)) == (50.0, 95.0, 99.0)
+    assert stats.percentile(1.0) == 100.0 and EndpointStats().percentile(0.5) == 0.0
+
+
+def test_parse_mix():
+    """Mixes are kind=weight lists of known kinds."""
+    assert parse_mix('article=3,batch=1') == {'article': 3, 'batch': 1}
+    with pytest.raises(ValueError):
+        parse_mix('upload=1')
+
+
+def test_in_process_run(corpus):
+    """Every kind in the mix is exercised and summarized without errors."""
+    workload = Workload.from_archive(corpus, {'article': 4, 'search': 2, 'list': 1, 'batch': 1})
+    assert all('/' in path for path in workload.paths)
+    result = asyncio.run(run_in_process(corpus, workload, clients=4, requests=120, warmup=5))
+    assert sum(len(s.latencies) for s in result.endpoints.values()) == 120
+    assert set(result.endpoints) == {'article', 'search', 'list', 'batch'}
+    assert result.error_rate() == 0
+    summary = result.summary()
+    for row in summary.values():
+        assert 0 < row['p50_s'] <= row['p95_s'] <= row['p99_s'] <= row['max_s']
+    assert summary['all']['requests_per_s'] > 0
+
+
+def test_command_gates(corpus, tmp_path, capsys):
+    """The command writes zimbench-format results and fails an impossible p99 limit."""
+    output = tmp_path / 'load.json'
+    assert main([corpus, '-c', '2', '-n', '30', '--warmup', '0', '--output', str(output)]) == 0
+    document = json.loads(output.read_text())
+    assert document['version'] == 1 and document['mode'] == 'load'
+    assert sum(document['requests'].values()) == 30
+    assert main([corpus, '-c', '2', '-n', '30', '--warmup', '0', '--max-p99-ms', '0']) == 1
+    assert 'p99 ms' in capsys.readouterr().out
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
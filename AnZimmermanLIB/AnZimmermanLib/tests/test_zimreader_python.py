@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for ZIMReader bulk and cluster access in zimlib.py
+
+Run with: pytest tests/test_zimreader_python.py -v
+"""
+
+import pytest
+import os
+import struct
+import sys
+import tracemalloc
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zimlib
+from zimlib import (
+    AccessPattern,
+    ZIMReader,
+    ZIMWriter,
+    DirectoryEntry,
+    DirectorySnapshot,
+    ParsedDirectory,
+    ReaderStats,
+    RedirectEntry,
+    current_trace,
+    parse_directory,
+    trace_phase,
+    tracing,
+    CompressionType,
+    Namespace,
+)
+
+
+def _add_cluster(writer, blobs, compression, prefix):
+    """Append a multi-blob cluster and one entry per blob."""
+    cluster_number = writer.add_cluster(blobs, compression)
+    mimetype_index = writer.add_mime_type('text/html')
+    for blob_number in range(len(blobs)):
+        writer.directory_entries.append(DirectoryEntry(
+            mimetype_index, Namespace.MAIN_ARTICLE, 0, cluster_number, blob_number,
+            f'{prefix}{blob_number}', f'{prefix} {blob_number}'))
+
+
+@pytest.fixture
+def sample_zim(tmp_path):
+    """Create a ZIM file with uncompressed, zlib and LZMA multi-blob clusters."""
+    path = str(tmp_path / 'reader.zim')
+    with ZIMWriter(path) as writer:
+        _add_cluster(writer, [b'lzma-%d' % i * 20 for i in range(4)], CompressionType.LZMA, 'x')
+        _add_cluster(writer, [b'raw-%d' % i for i in range(5)], CompressionType.NONE, 'r')
+        _add_cluster(writer, [b'zlib-%d' % i * 50 for i in range(3)], CompressionType.ZLIB, 'z')
+        writer.add_article(Namespace.MAIN_ARTICLE, 'single', 'Single', b'one blob')
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'alias', 'Alias', 0)
+    return path
+
+
+class TestReadCluster:
+    """Tests for whole-cluster reads."""
+
+    def test_read_cluster_matches_entries(self, sample_zim):
+        """Every blob of a cluster matches per-entry retrieval."""
+        with ZIMReader(sample_zim) as reader:
+            for entry in reader.list_articles():
+                blobs = reader.read_cluster(entry.cluster_number)
+                assert blobs[entry.blob_number] == reader.get_article_content(entry)
+
+    def test_invalid_blob_number(self, sample_zim):
+        """Out-of-range blob numbers raise ValueError."""
+        with ZIMReader(sample_zim) as reader:
+            bad = DirectoryEntry(0, Namespace.MAIN_ARTICLE, 0, 1, 99, 'bad', 'bad')
+            with pytest.raises(ValueError):
+                reader.get_article_content(bad)
+            with pytest.raises(ValueError):
+                list(reader.get_many([bad]))
+
+
+class TestGetMany:
+    """Tests for disk-order bulk retrieval."""
+
+    def test_contents_match(self, sample_zim):
+        """get_many returns the same bytes as get_article_content."""
+        with ZIMReader(sample_zim) as reader:
+            articles = reader.list_articles()
+            expected = {id(e): reader.get_article_content(e) for e in articles}
+            results = list(reader.get_many(reversed(articles)))
+            assert len(results) == len(articles)
+            for entry, content in results:
+                assert content == expected[id(entry)]
+
+    def test_disk_order(self, sample_zim):
+        """Entries come back grouped by cluster in file-offset order."""
+        with ZIMReader(sample_zim) as reader:
+            clusters = [e.cluster_number for e, _ in reader.get_many(reversed(reader.list_articles()))]
+            offsets = [reader.cluster_offsets[c] for c in clusters]
+            assert offsets == sorted(offsets)
+
+    def test_reads_each_cluster_once(self, sample_zim, monkeypatch):
+        """Each cluster is decompressed once however many blobs are wanted."""
+        with ZIMReader(sample_zim) as reader:
+            calls = []
+            original = reader._decompress
+            monkeypatch.setattr(reader, '_decompress', lambda c, d: calls.append(c) or original(c, d))
+            list(reader.get_many(reader.list_articles()))
+            assert sorted(calls) == [CompressionType.ZLIB, CompressionType.LZMA]
+
+    def test_duplicates_and_subset(self, sample_zim):
+        """Duplicate requests are all answered; unrequested blobs are skipped."""
+        with ZIMReader(sample_zim) as reader:
+            r1 = reader.get_entry_by_path('A/r1')
+            r3 = reader.get_entry_by_path('A/r3')
+            results = list(reader.get_many([r3, r1, r3]))
+            assert [c for _, c in results] == [b'raw-3', b'raw-1', b'raw-3']
+
+
+class TestIterContents:
+    """Tests for the windowed, optionally parallel content iterator."""
+
+    def test_directory_order(self, sample_zim):
+        """Ordered iteration follows the given order, duplicates included."""
+        with ZIMReader(sample_zim) as reader:
+            articles = reader.list_articles()
+            wanted = list(reversed(articles)) + articles[:2]
+            results = list(reader.iter_contents(wanted))
+            assert [e for e, _ in results] == wanted
+            assert all(c == reader.get_article_content(e) for e, c in results)
+
+    def test_cluster_order_matches_get_many(self, sample_zim):
+        """Unordered iteration yields the same sequence as get_many."""
+        with ZIMReader(sample_zim) as reader:
+            articles = reader.list_articles()
+            assert [(e.url, c) for e, c in reader.iter_contents(ordered=False)] == \
+                [(e.url, c) for e, c in reader.get_many(articles)]
+
+    def test_small_budget_and_workers(self, sample_zim):
+        """A tiny budget yields one cluster per window; workers give identical output."""
+        with ZIMReader(sample_zim) as reader:
+            expected = [(e.url, c) for e, c in reader.iter_contents()]
+            windows = [w for w, _ in reader._content_windows(reader.list_articles(), 1)]
+            assert all(len({e.cluster_number for e in w}) == 1 for w in windows)
+            assert [(e.url, c) for e, c in reader.iter_contents(workers=2, max_bytes=1)] == expected
+
+    @pytest.mark.parametrize('compression', [CompressionType.LZMA, CompressionType.ZSTD])
+    def test_budget_counts_decompressed_bytes(self, tmp_path, monkeypatch, compression):
+        """Highly compressible clusters are budgeted by decompressed size, not on-disk size."""
+        if compression == CompressionType.ZSTD and zimlib.zstandard is None:
+            pytest.skip("zstandard not installed")
+        path = str(tmp_path / 'ratio.zim')
+        with ZIMWriter(path) as writer:
+            for i in range(8):
+                _add_cluster(writer, [b'%d' % i * 50000], compression, f'c{i}-')
+        held = []
+        gather = zimlib._gather_batches
+        monkeypatch.setattr(zimlib, '_gather_batches', lambda batches: held.append(
+            sum(map(len, gather(batches).values()))) or gather(batches))
+        with ZIMReader(path) as reader:
+            assert len(list(reader.iter_contents(max_bytes=2 * 60000))) == 8
+        assert len(held) == 8 and max(held) <= 60000
+
+
+class TestResolve:
+    """Tests for the flattened redirect table."""
+
+    @pytest.fixture
+    def redirect_zim(self, tmp_path):
+        """Create a ZIM file with a redirect chain, a loop and a dangling redirect."""
+        path = str(tmp_path / 'redirects.zim')
+        with ZIMWriter(path) as writer:
+            writer.add_article(Namespace.MAIN_ARTICLE, 'target', 'Target', b'final')  # 0
+            writer.add_redirect(Namespace.MAIN_ARTICLE, 'hop1', 'Hop 1', 2)           # 1
+            writer.add_redirect(Namespace.MAIN_ARTICLE, 'hop2', 'Hop 2', 3)           # 2
+            writer.add_redirect(Namespace.MAIN_ARTICLE, 'hop3', 'Hop 3', 0)           # 3
+            writer.add_redirect(Namespace.MAIN_ARTICLE, 'loop1', 'Loop 1', 5)         # 4
+            writer.add_redirect(Namespace.MAIN_ARTICLE, 'loop2', 'Loop 2', 4)         # 5
+            writer.add_redirect(Namespace.MAIN_ARTICLE, 'self', 'Self', 6)            # 6
+            writer.add_redirect(Namespace.MAIN_ARTICLE, 'into_loop', 'Into loop', 4)  # 7
+            writer.add_redirect(Namespace.MAIN_ARTICLE, 'dangling', 'Dangling', 99)   # 8
+        return path
+
+    def test_chains_are_flattened(self, redirect_zim):
+        """Every redirect in a chain maps straight to the final article."""
+        with ZIMReader(redirect_zim) as reader:
+            assert [reader.resolve_index(i) for i in range(4)] == [0, 0, 0, 0]
+            assert reader.resolve(reader.get_entry_by_path('A/hop1')).url == 'target'
+
+    def test_cycles_and_dangling(self, redirect_zim):
+        """Loops, self-redirects and out-of-range targets resolve to None."""
+        with ZIMReader(redirect_zim) as reader:
+            assert [reader.resolve_index(i) for i in range(4, 9)] == [None] * 5
+            assert reader.resolve(reader.get_entry_by_path('A/into_loop')) is None
+            assert reader.resolve_index(99) is None
+
+
+class TestDirectorySnapshot:
+    """Tests for the memory-mapped directory snapshot."""
+
+    def test_snapshot_matches_parsed_directory(self, sample_zim):
+        """A reopened reader serves identical entries from the snapshot."""
+        with ZIMReader(sample_zim) as reader:
+            parsed = list(reader.directory_entries)
+            reader.save_snapshot()
+        with ZIMReader(sample_zim) as reader:
+            assert isinstance(reader.directory_entries, DirectorySnapshot)
+            assert list(reader.directory_entries) == parsed
+            assert reader.directory_entries[-1] == parsed[-1]
+            assert reader.directory_entries[2:4] == parsed[2:4]
+            assert reader.get_article_content(reader.get_entry_by_path('A/z2')) == b'zlib-2' * 50
+            assert reader.get_entry_index_by_path('A/single') == parsed.index(reader.get_entry_by_path('A/single'))
+            assert reader.get_entry_by_path('A/missing') is None
+            assert reader.resolve(reader.get_entry_by_path('A/alias')) == parsed[0]
+
+    def test_stale_snapshot_ignored(self, sample_zim):
+        """A snapshot of an older archive version is not used."""
+        with ZIMReader(sample_zim) as reader:
+            reader.save_snapshot()
+        with ZIMWriter(sample_zim) as writer:
+            writer.add_article(Namespace.MAIN_ARTICLE, 'other', 'Other', b'x')
+        os.utime(sample_zim, (1, 1))
+        with ZIMReader(sample_zim) as reader:
+            assert isinstance(reader.directory_entries, ParsedDirectory)
+            assert [e.url for e in reader.directory_entries] == ['other']
+
+    def test_snapshot_dir_and_opt_out(self, sample_zim, tmp_path):
+        """Snapshots can live in a cache directory and be bypassed."""
+        cache = str(tmp_path / 'cache')
+        with ZIMReader(sample_zim, snapshot_dir=cache) as reader:
+            path = reader.save_snapshot()
+        assert os.path.dirname(path) == cache
+        assert not os.path.exists(sample_zim + '.dir.snap')
+        reader = ZIMReader(sample_zim, snapshot_dir=cache)
+        reader.open(snapshot=False)
+        assert isinstance(reader.directory_entries, ParsedDirectory)
+        reader.close()
+
+    def test_truncated_snapshot_is_a_miss(self, sample_zim):
+        """A truncated or empty snapshot falls back to parsing the directory."""
+        with ZIMReader(sample_zim) as reader:
+            path = reader.save_snapshot()
+            expected = list(reader.directory_entries)
+        data = open(path, 'rb').read()
+        for length in (len(data) - 1, len(data) // 2, 57, 10, 0):
+            with open(path, 'wb') as f:
+                f.write(data[:length])
+            reader = ZIMReader(sample_zim)
+            reader.open()
+            assert isinstance(reader.directory_entries, ParsedDirectory)
+            assert list(reader.directory_entries) == expected
+            assert reader.stats.snapshot_misses == 1
+            reader.close()
+
+
+class TestParseDirectory:
+    """Tests for the bulk directory parsers."""
+
+    ENTRIES = [
+        DirectoryEntry(0, Namespace.MAIN_ARTICLE, 0, 0, 0, 'plain', 'Plain'),
+        DirectoryEntry(1, Namespace.MAIN_ARTICLE, 7, 3, 2, 'ünïcode/päge', 'Ünïcode'),
+        DirectoryEntry(0, Namespace.METADATA, 0, 1, 0, '', ''),
+        DirectoryEntry(2, Namespace.IMAGE, 0, 0x01020304, 0xFFFFFFFE, 'a', 'T' * 3000),
+        RedirectEntry(0xFFFF, Namespace.MAIN_ARTICLE, 0, 1, '', 'Empty'),
+        RedirectEntry(0xFFFF, Namespace.MAIN_ARTICLE, 0, 3, 'r', ''),
+    ]
+
+    @pytest.fixture(params=['numpy', 'stdlib'])
+    def parser(self, request, monkeypatch):
+        """Run a test against each parser implementation."""
+        if request.param == 'numpy' and zimlib.np is None:
+            pytest.skip("numpy not installed")
+        if request.param == 'stdlib':
+            monkeypatch.setattr(zimlib, 'np', None)
+        return request.param
+
+    def test_matches_from_bytes(self, parser):
+        """Fields, empty strings, long titles and a trailing redirect all decode."""
+        base = 1000
+        data, pointers = b'junk', []
+        for entry in self.ENTRIES:
+            pointers.append(base + len(data))
+            data += entry.to_bytes()
+        pointers.reverse()
+        parsed = parse_directory(data, pointers, base)
+        assert list(parsed) == self.ENTRIES[::-1]
+        assert parsed[-1] is parsed[-1]
+        assert parsed.find(Namespace.MAIN_ARTICLE, 'ünïcode/päge') == 4
+        assert parsed.find(Namespace.MAIN_ARTICLE, '') == 1
+        assert parsed.find(Namespace.MAIN_ARTICLE, 'missing') is None
+
+    def test_reader_open(self, parser, sample_zim):
+        """Readers parse the same directory with either implementation."""
+        with ZIMReader(sample_zim) as reader:
+            assert isinstance(reader.directory_entries, ParsedDirectory)
+            raw = []
+            for ptr in reader.read_entry_pointers():
+                reader.file.seek(ptr)
+                head = reader.file.read(1005)
+                cls = RedirectEntry if struct.unpack('<I', head[:4])[0] == 0xFFFF else DirectoryEntry
+                raw.append(cls.from_bytes(head))
+            assert list(reader.directory_entries) == raw
+            assert reader.get_entry_index_by_path('A/single') == raw.index(reader.get_entry_by_path('A/single'))
+
+    def test_entry_cache_bounded(self, parser, monkeypatch):
+        """Full passes cache nothing; index access keeps at most ENTRY_CACHE_SIZE entries."""
+        data, pointers = b'', []
+        for entry in self.ENTRIES:
+            pointers.append(len(data))
+            data += entry.to_bytes()
+        parsed = parse_directory(data, pointers)
+        assert list(parsed) == parsed[:] == self.ENTRIES
+        assert len(parsed._entries) == 0
+        monkeypatch.setattr(ParsedDirectory, 'ENTRY_CACHE_SIZE', 2)
+        first = parsed[0]
+        parsed[1]
+        assert parsed[0] is first
+        parsed[2]
+        assert sorted(parsed._entries) == [0, 2]
+        assert next(iter(parsed)) is first
+
+
+
+class TestAccessPattern:
+    """Tests for fadvise hints and sequential prefetch."""
+
+    def test_sequential_prefetch_and_drop_behind(self, sample_zim, monkeypatch):
+        """A sweep prefetches the next clusters once and drops pages behind it."""
+        advised, submitted = [], []
+        monkeypatch.setattr(zimlib, '_fadvise', lambda fd, offset, length, advice: advised.append(
+            (offset, length, advice)))
+        original_submit = zimlib._Prefetcher.submit
+        monkeypatch.setattr(zimlib._Prefetcher, 'submit', lambda self, offset, length: (
+            submitted.append((offset, length)), original_submit(self, offset, length)))
+
+        with ZIMReader(sample_zim) as plain:
+            expected = {e.url: c for e, c in plain.get_many(plain.list_articles())}
+        with ZIMReader(sample_zim) as reader:
+            reader.advise(AccessPattern.SEQUENTIAL, prefetch_clusters=1, drop_behind=True)
+            assert reader._prefetcher is not None
+            assert {e.url: c for e, c in reader.get_many(reader.list_articles())} == expected
+
+            offsets = reader.cluster_offsets
+            assert submitted == [(offsets[i], offsets[i + 1] - offsets[i]) for i in range(1, 3)] + \
+                [(offsets[3], reader._clusters_end - offsets[3])]
+            dropped = [(o, n) for o, n, advice in advised if advice == getattr(zimlib.os, 'POSIX_FADV_DONTNEED', -1)]
+            if hasattr(zimlib.os, 'posix_fadvise'):
+                bounds = [0] + offsets[:3]
+                assert dropped == [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(3)]
+            thread = reader._prefetcher.thread
+        assert not thread.is_alive()
+
+    def test_random_stops_prefetch(self, sample_zim):
+        """Switching to RANDOM shuts the prefetch thread down."""
+        with ZIMReader(sample_zim) as reader:
+            reader.advise(AccessPattern.SEQUENTIAL)
+            thread = reader._prefetcher.thread
+            reader.advise(AccessPattern.RANDOM)
+            assert reader._prefetcher is None and not thread.is_alive()
+            assert reader.get_article_content(reader.get_entry_by_path('A/z1')) == b'zlib-1' * 50
+            reader.release_clusters(range(len(reader.cluster_offsets)))
+
+
+class TestReaderStats:
+    """Tests for hot-path counters and the decompressed-cluster cache."""
+
+    def test_counters_and_sampled_timings(self, sample_zim):
+        """Reads, decompressions per codec and lookups are counted; timings sampled."""
+        stats = ReaderStats(sample_every=2)
+        with ZIMReader(sample_zim, stats=stats) as reader:
+            opened = (stats.read_calls, stats.bytes_read)
+            assert opened[0] > 0 and opened[1] > 80
+            for path in ('A/x0', 'A/x1', 'A/z0', 'A/r2', 'A/missing'):
+                entry = reader.get_entry_by_path(path)
+                if entry:
+                    reader.get_article_content(entry)
+        assert stats.lookups == 5
+        assert stats.lookup_seconds.count == 2
+        assert stats.clusters_decompressed == {'lzma': 2, 'zlib': 1}
+        assert stats.decompress_seconds['lzma'].count == 1 and 'zlib' not in stats.decompress_seconds
+        assert stats.read_calls > opened[0] and stats.bytes_read > opened[1]
+        assert stats.snapshot_misses == 1 and stats.cache_hits == stats.cache_misses == 0
+        buckets = stats.lookup_seconds.cumulative()
+        assert buckets[-1] == (float('inf'), 2)
+
+    def test_cluster_cache(self, sample_zim):
+        """Compressed clusters are cached LRU; stored ones are read directly."""
+        with ZIMReader(sample_zim, cluster_cache=1) as reader:
+            stats = reader.stats
+            contents = [reader.get_article_content(reader.get_entry_by_path(path))
+                        for path in ('A/x0', 'A/x3', 'A/r1', 'A/z2', 'A/x1', 'A/x2')]
+            assert contents == [b'lzma-0' * 20, b'lzma-3' * 20, b'raw-1', b'zlib-2' * 50,
+                                b'lzma-1' * 20, b'lzma-2' * 20]
+            assert (stats.cache_hits, stats.cache_misses) == (2, 3)
+            assert sum(stats.clusters_decompressed.values()) == 3
+            assert list(reader._cluster_cache) == [0]
+
+
+class TestMemoryReport:
+    """Tests for per-structure memory accounting."""
+
+    def test_structures_grow_with_use(self, sample_zim):
+        """Lookups add an index, resolving builds no entries, reads fill the cache."""
+        with ZIMReader(sample_zim, cluster_cache=2) as reader:
+            opened = reader.memory_report()
+            assert opened.directory > 0 and opened.strings > 0 and opened.other > 0
+            assert opened.entries == 0 and opened.mapped == 0
+            assert reader.resolve(reader.directory_entries[-1]).url == 'x0'
+            alias = reader.memory_report()
+            assert alias.entries == 2 and alias.indexes > opened.indexes
+            reader.get_article_content(reader.get_entry_by_path('A/x1'))
+            used = reader.memory_report()
+            assert used.caches - alias.caches >= len(b'lzma-0' * 20 * 4)
+            assert used.total == used.directory + used.strings + used.caches + used.indexes + used.other
+
+    def test_close_to_tracemalloc(self, sample_zim, tmp_path):
+        """The estimate for an opened reader is near the memory tracemalloc sees."""
+        path = str(tmp_path / 'many.zim')
+        with ZIMWriter(path) as writer:
+            for i in range(2000):
+                writer.add_article(Namespace.MAIN_ARTICLE, f'page-{i}', f'Page {i}', b'x')
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            reader = ZIMReader(path)
+            reader.open(snapshot=False)
+            for i in range(0, 2000, 2):
+                reader.get_entry_by_path(f'A/page-{i}')
+            traced = tracemalloc.get_traced_memory()[0] - base
+        finally:
+            tracemalloc.stop()
+        report = reader.memory_report()
+        reader.close()
+        assert report.entries == 1000
+        assert 0.7 < report.total / traced < 1.4
+
+    def test_snapshot_is_mapped(self, sample_zim):
+        """A snapshot directory counts as mapped, not heap."""
+        with ZIMReader(sample_zim) as reader:
+            reader.save_snapshot()
+        with ZIMReader(sample_zim) as reader:
+            report = reader.memory_report()
+        assert report.mapped > 0 and report.directory == report.strings == 0
+
+
+class TestTracing:
+    """Tests for per-request phase tracing."""
+
+    def test_reader_phases(self, sample_zim):
+        """Lookups, reads and decompression are timed only inside a trace."""
+        with ZIMReader(sample_zim) as reader:
+            assert current_trace() is None
+            with tracing() as trace:
+                assert current_trace() is trace
+                for path in ('A/x0', 'A/z1', 'A/r2'):
+                    assert reader.get_article_content(reader.get_entry_by_path(path))
+                with trace_phase('decode'):
+                    pass
+            reader.get_article_content(reader.get_entry_by_path('A/x1'))
+        assert current_trace() is None
+        assert trace.counts['lookup'] == 3 and trace.counts['decompress'] == 2
+        assert trace.counts['decode'] == 1 and trace.counts['read'] >= 3
+        assert all(seconds >= 0 for seconds in trace.phases.values())
+        assert trace.elapsed() >= sum(trace.phases.values())
+
+    def test_nested_traces(self):
+        """An inner trace shadows the outer one until it ends."""
+        with tracing() as outer:
+            with tracing() as inner:
+                with trace_phase('work'):
+                    pass
+            assert current_trace() is outer
+        assert 'work' in inner.phases and 'work' not in outer.phases
+        with trace_phase('untraced'):
+            pass
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimrelated.py
+
+Run with: pytest tests/test_zimrelated_python.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip('numpy')
+
+import zimrelated
+from zimlib import ZIMReader, ZIMWriter, Namespace
+from zimrelated import RelatedIndex, build_related_index, open_related_index
+
+
+TOPICS = {
+    'astro': 'star galaxy planet orbit telescope nebula comet',
+    'cook': 'recipe flour oven butter sugar bake dough',
+    'code': 'compiler function variable python program syntax loop',
+}
+
+
+def _write_corpus(path, per_topic):
+    """Write per_topic articles for each topic plus a non-HTML entry."""
+    with ZIMWriter(path) as writer:
+        for topic, words in TOPICS.items():
+            vocab = words.split()
+            for i in range(per_topic):
+                text = ' '.join(vocab[(i + k) % len(vocab)] for k in range(12))
+                html = f'<html><body><p>{text} item{i}</p></body></html>'
+                writer.add_article(Namespace.MAIN_ARTICLE, f'{topic}_{i}', f'{topic} {i}', html.encode())
+        writer.add_article(Namespace.STYLE, 'main.css', 'css', b'star galaxy', 'text/css')
+
+
+@pytest.fixture
+def sample_zim(tmp_path):
+    """Create a small three-topic corpus."""
+    path = str(tmp_path / 'related.zim')
+    _write_corpus(path, 5)
+    return path
+
+
+class TestRelatedIndex:
+    """Tests for building and querying the vector index."""
+
+    def test_neighbours_share_topic(self, sample_zim):
+        """Nearest neighbours come from the same topic, best first."""
+        with ZIMReader(sample_zim) as reader:
+            build_related_index(reader, dim=64)
+            with RelatedIndex(reader) as index:
+                assert index.rows == 15
+                hits = index.related(reader.get_entry_index_by_path('A/cook_0'), limit=4)
+                assert len(hits) == 4
+                assert all(h.entry.url.startswith('cook_') for h in hits)
+                assert all(h.entry.url != 'cook_0' for h in hits)
+                scores = [h.score for h in hits]
+                assert scores == sorted(scores, reverse=True)
+
+    def test_stored_vectors_are_unit_float16(self, sample_zim):
+        """The sidecar matrix holds normalized float16 rows."""
+        with ZIMReader(sample_zim) as reader:
+            build_related_index(reader, dim=64)
+            with RelatedIndex(reader) as index:
+                assert index.matrix.dtype == np.float16
+                norms = np.linalg.norm(index.matrix.astype(np.float32), axis=1)
+                assert np.allclose(norms, 1.0, atol=1e-2)
+
+    def test_unindexed_entry(self, sample_zim):
+        """Entries without an embedding have no neighbours."""
+        with ZIMReader(sample_zim) as reader:
+            build_related_index(reader, dim=64)
+            with RelatedIndex(reader) as index:
+                assert index.related(reader.get_entry_index_by_path('S/main.css')) == []
+
+    def test_ivf_partitions(self, tmp_path, monkeypatch):
+        """Large indexes are split into IVF partitions that still find neighbours."""
+        monkeypatch.setattr(zimrelated, 'IVF_MIN_ROWS', 16)
+        path = str(tmp_path / 'ivf.zim')
+        _write_corpus(path, 20)
+        with ZIMReader(path) as reader:
+            build_related_index(reader, dim=64, workers=2)
+            with RelatedIndex(reader) as index:
+                assert len(index.centroids) > 1
+                assert int(index.list_offsets[-1]) == index.rows
+                hits = index.related(reader.get_entry_index_by_path('A/astro_3'), limit=3, nprobe=2)
+                assert hits and all(h.entry.url.startswith('astro_') for h in hits)
+
+    def test_serial_build_reuses_reader(self, sample_zim, monkeypatch):
+        """A one-worker build reads clusters through the caller's reader."""
+        with ZIMReader(sample_zim) as reader:
+            monkeypatch.setattr(ZIMReader, '_read_directory', lambda self: pytest.fail('directory parsed'))
+            build_related_index(reader, workers=1)
+            with open_related_index(reader) as index:
+                assert index.rows > 0
+
+    def test_missing_sidecar(self, sample_zim):
+        """No index is opened without a sidecar."""
+        with ZIMReader(sample_zim) as reader:
+            assert open_related_index(reader) is None
+
+    def test_truncated_sidecar_is_a_miss(self, sample_zim):
+        """A sidecar whose sections run past its end is not opened."""
+        with ZIMReader(sample_zim) as reader:
+            build_related_index(reader, workers=1)
+            path = RelatedIndex(reader).path
+            with open(path, 'rb') as f:
+                data = f.read()
+            for cut in (len(data) - 1, len(data) // 2, 80):
+                with open(path, 'wb') as f:
+                    f.write(data[:cut])
+                assert open_related_index(reader) is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
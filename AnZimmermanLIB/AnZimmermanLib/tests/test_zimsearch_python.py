@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimsearch.py
+
+Run with: pytest tests/test_zimsearch_python.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zimlib import ZIMReader, ZIMWriter, Namespace
+from zimsearch import TrigramIndex, open_trigram_index, default_index_path
+
+
+@pytest.fixture
+def sample_zim(tmp_path):
+    """Create a small ZIM file with a mix of titles, URLs and a redirect."""
+    path = str(tmp_path / 'search.zim')
+    with ZIMWriter(path) as writer:
+        writer.add_article(Namespace.MAIN_ARTICLE, 'Main_Page', 'Welcome', b'<p>home</p>')
+        writer.add_article(Namespace.MAIN_ARTICLE, 'Python_(language)', 'Python Programming Language', b'<p>py</p>')
+        writer.add_article(Namespace.MAIN_ARTICLE, 'Monty_Python', 'Monty Python', b'<p>monty</p>')
+        writer.add_article(Namespace.MAIN_ARTICLE, 'JavaScript', 'JavaScript', b'<p>js</p>')
+        writer.add_article(Namespace.STYLE, 'python.css', 'Stylesheet', b'p {}', 'text/css')
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'Py', 'Python redirect', 1)
+    return path
+
+
+class TestTrigramIndex:
+    """Tests for the trigram substring index."""
+
+    def test_substring_search(self, sample_zim):
+        """Substring matches on titles and URLs are found in directory order."""
+        with ZIMReader(sample_zim) as reader:
+            index = TrigramIndex(reader)
+            index.build()
+            hits = index.search('python')
+            assert [i for i, _ in hits] == [1, 2, 4]
+
+    def test_redirects_not_returned(self, sample_zim):
+        """Redirect entries are not part of the index."""
+        with ZIMReader(sample_zim) as reader:
+            index = TrigramIndex(reader)
+            index.build()
+            assert all(e.url != 'Py' for _, e in index.search('python redirect'))
+
+    def test_multi_term_and_namespace(self, sample_zim):
+        """All terms must match; namespace filter is applied."""
+        with ZIMReader(sample_zim) as reader:
+            index = TrigramIndex(reader)
+            index.build()
+            hits = index.search('monty PYTHON')
+            assert [e.url for _, e in hits] == ['Monty_Python']
+            hits = index.search('python', namespace=Namespace.STYLE)
+            assert [e.url for _, e in hits] == ['python.css']
+
+    def test_matches_linear_scan_before_ready(self, sample_zim):
+        """Queries issued before the build completes fall back to a scan."""
+        with ZIMReader(sample_zim) as reader:
+            index = TrigramIndex(reader)
+            scanned = index.search('script', limit=5)
+            index.build()
+            assert index.search('script', limit=5) == scanned
+            assert index.search('py', limit=5) == index.search('py', limit=5)
+
+    def test_limit(self, sample_zim):
+        """Results stop at the limit."""
+        with ZIMReader(sample_zim) as reader:
+            index = TrigramIndex(reader)
+            index.build()
+            assert len(index.search('python', limit=2)) == 2
+
+    def test_sidecar_roundtrip(self, sample_zim):
+        """A saved index loads back with identical postings."""
+        with ZIMReader(sample_zim) as reader:
+            built = open_trigram_index(reader, background=False)
+            assert os.path.exists(default_index_path(sample_zim))
+
+            loaded = TrigramIndex(reader)
+            assert loaded.load()
+            assert loaded.postings == built.postings
+            assert loaded.search('language') == built.search('language')
+
+    def test_stale_sidecar_rejected(self, sample_zim):
+        """A sidecar written for a different archive state is ignored."""
+        with ZIMReader(sample_zim) as reader:
+            open_trigram_index(reader, background=False)
+        with open(sample_zim, 'ab') as f:
+            f.write(b'\x00' * 16)
+        with ZIMReader(sample_zim) as reader:
+            assert not TrigramIndex(reader).load()
+
+
+    def test_truncated_sidecar_rebuilt(self, sample_zim):
+        """A truncated or corrupt sidecar is a miss, and the index is rebuilt."""
+        with ZIMReader(sample_zim) as reader:
+            path = open_trigram_index(reader, background=False).save()
+        data = open(path, 'rb').read()
+        for damaged in (data[:len(data) // 2], data[:40], data[:32] + b'\xff' * (len(data) - 32)):
+            with open(path, 'wb') as f:
+                f.write(damaged)
+            with ZIMReader(sample_zim) as reader:
+                assert not TrigramIndex(reader).load()
+                index = open_trigram_index(reader, background=False)
+                assert index.search('language')
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
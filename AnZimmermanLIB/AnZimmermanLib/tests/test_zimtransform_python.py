@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for zimtransform.py
+
+Run with: pytest tests/test_zimtransform_python.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zimlib import ZIMReader, ZIMWriter, CompressionType, Namespace
+import zimtransform
+from zimtransform import TransformPipeline
+
+
+@pytest.fixture
+def sample_zim(tmp_path):
+    """Create a ZIM file with HTML, CSS and a packed compressed cluster."""
+    path = str(tmp_path / 'source.zim')
+    with ZIMWriter(path) as writer:
+        for i in range(6):
+            writer.add_article(Namespace.MAIN_ARTICLE, f'p{i}', f'P {i}',
+                               f'<html><body><a href="http://old.example/{i}">x</a></body></html>'.encode())
+        writer.add_article(Namespace.STYLE, 'main.css', 'css', b'a { color: red }', 'text/css')
+        packed = writer.add_cluster([b'<p>http://old.example/</p>', b'plain'], CompressionType.ZLIB)
+        writer.add_entry(Namespace.MAIN_ARTICLE, 'packed', 'Packed', packed, 0)
+        writer.add_entry(Namespace.MAIN_ARTICLE, 'plain', 'Plain', packed, 1, 'text/plain')
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'alias', 'Alias', 3)
+        writer.main_page_index = 2
+    return path
+
+
+def _contents(path):
+    """Return {path: content} for every article of an archive."""
+    with ZIMReader(path) as reader:
+        return {f'{chr(e.namespace)}/{e.url}': c for e, c in reader.get_many(reader.list_articles())}
+
+
+class TestTransformPipeline:
+    """Tests for pipeline registration and application."""
+
+    def test_mime_patterns_and_order(self):
+        """Transforms apply in registration order to matching MIME types only."""
+        pipeline = TransformPipeline()
+        pipeline.add(lambda c: c + b'1', 'text/*')
+        pipeline.add_regex(r'1$', '2', mime_types=['text/html'])
+        assert pipeline.apply('text/html', b'x') == b'x2'
+        assert pipeline.apply('text/css', b'x') == b'x1'
+        assert pipeline.apply('image/png', b'x') == b'x'
+
+    def test_run_rewrites_matching_blobs(self, sample_zim, tmp_path):
+        """Only HTML blobs change; directory, redirects and main page survive."""
+        output = str(tmp_path / 'out.zim')
+        pipeline = TransformPipeline().add_regex(r'http://old\.example/', '../A/')
+        result = pipeline.run(sample_zim, output)
+        assert result.blobs_changed == 7
+        assert result.clusters_copied == 1
+
+        before, after = _contents(sample_zim), _contents(output)
+        assert after['A/p4'] == b'<html><body><a href="../A/4">x</a></body></html>'
+        assert after['A/packed'] == b'<p>../A/</p>'
+        assert after['A/plain'] == before['A/plain']
+        assert after['S/main.css'] == before['S/main.css']
+        with ZIMReader(output) as reader:
+            assert reader.get_main_page().url == 'p2'
+            assert reader.directory_entries[-1].redirect_index == 3
+            packed = reader.get_entry_by_path('A/packed')
+            assert reader.cluster_compression(packed.cluster_number) == CompressionType.ZLIB
+
+    def test_unchanged_clusters_are_copied(self, sample_zim, tmp_path):
+        """Matching blobs left unchanged by every transform are not re-encoded."""
+        output = str(tmp_path / 'out.zim')
+        result = TransformPipeline().add_regex('no-such-text', 'x').run(sample_zim, output)
+        assert result.clusters_rewritten == 0
+        assert result.clusters_copied == 8
+        assert _contents(output) == _contents(sample_zim)
+
+    def test_parallel_matches_serial(self, sample_zim, tmp_path):
+        """Worker processes produce a byte-identical archive."""
+        serial = str(tmp_path / 'serial.zim')
+        parallel = str(tmp_path / 'parallel.zim')
+        pipeline = TransformPipeline().add_regex(r'<a [^>]*>', '<a>')
+        pipeline.run(sample_zim, serial, workers=1)
+        pipeline.run(sample_zim, parallel, workers=3, batch_bytes=1)
+        with open(serial, 'rb') as a, open(parallel, 'rb') as b:
+            assert a.read() == b.read()
+
+
+    def test_worker_reader_skips_directory(self, sample_zim, monkeypatch):
+        """Pool workers open the source without parsing its directory."""
+        monkeypatch.setattr(zimtransform, '_worker', None)
+        zimtransform._init_worker(sample_zim, TransformPipeline())
+        reader = zimtransform._worker[0]
+        try:
+            assert len(reader.directory_entries) == 0
+            assert reader.read_cluster(0)
+        finally:
+            reader.close()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
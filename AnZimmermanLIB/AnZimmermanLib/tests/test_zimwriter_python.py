@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Unit Tests for ZIMWriter cluster streaming and passthrough in zimlib.py
+
+Run with: pytest tests/test_zimwriter_python.py -v
+"""
+
+import pytest
+import os
+import sys
+import tracemalloc
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zimlib
+from zimlib import ZIMReader, ZIMWriter, CodecPolicy, CompressionType, Namespace
+
+
+@pytest.fixture
+def source_zim(tmp_path):
+    """Create a ZIM file with a mix of single- and multi-blob clusters."""
+    path = str(tmp_path / 'source.zim')
+    with ZIMWriter(path) as writer:
+        for i in range(4):
+            writer.add_article(Namespace.MAIN_ARTICLE, f'page{i}', f'Page {i}', b'page %d' % i)
+        packed = writer.add_cluster([b'blob-%d' % i * 30 for i in range(3)], CompressionType.ZLIB)
+        for i in range(3):
+            writer.add_entry(Namespace.IMAGE, f'img{i}', f'img {i}', packed, i, 'image/png')
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'alias', 'Alias', 2)
+        writer.main_page_index = 1
+    return path
+
+
+class TestStreamingLayout:
+    """Tests for the clusters-first file layout."""
+
+    def test_round_trip(self, source_zim):
+        """Entries, MIME types and the main page survive a round trip."""
+        with ZIMReader(source_zim) as reader:
+            assert reader.header.url_ptr_pos > 80
+            assert reader.header.entry_count == 8
+            assert reader.get_main_page().url == 'page1'
+            assert reader.mime_types == ['text/html', 'image/png']
+            assert reader.get_article_content(reader.get_entry_by_path('I/img2')) == b'blob-2' * 30
+            assert reader.directory_entries[7].redirect_index == 2
+
+
+class TestCopyClusters:
+    """Tests for raw cluster passthrough."""
+
+    def _copy_all(self, source, target):
+        """Copy every cluster and entry of source into a new archive."""
+        with ZIMReader(source) as reader, ZIMWriter(target) as writer:
+            mapping = writer.copy_clusters(reader, reversed(range(len(reader.cluster_offsets))))
+            for entry in reader.list_articles():
+                writer.add_entry(entry.namespace, entry.url, entry.title,
+                                 mapping[entry.cluster_number], entry.blob_number,
+                                 reader.mime_types[entry.mimetype_index])
+        return mapping
+
+    def test_copied_bytes_are_identical(self, source_zim, tmp_path):
+        """Copied clusters keep their exact encoded bytes and disk order."""
+        target = str(tmp_path / 'copy.zim')
+        mapping = self._copy_all(source_zim, target)
+        assert mapping == {c: c for c in range(5)}
+        with ZIMReader(source_zim) as src, ZIMReader(target) as dst:
+            for c in range(5):
+                src.file.seek(src.cluster_offsets[c])
+                dst.file.seek(dst.cluster_offsets[c])
+                size = src._cluster_end(c) - src.cluster_offsets[c]
+                assert dst._cluster_end(c) - dst.cluster_offsets[c] == size
+                assert src.file.read(size) == dst.file.read(size)
+            for entry in dst.list_articles():
+                original = src.get_entry_by_path(f'{chr(entry.namespace)}/{entry.url}')
+                assert dst.get_article_content(entry) == src.get_article_content(original)
+
+    def test_subset_and_fallback(self, source_zim, tmp_path, monkeypatch):
+        """Non-contiguous subsets copy correctly without copy_file_range."""
+        monkeypatch.delattr(zimlib.os, 'copy_file_range', raising=False)
+        target = str(tmp_path / 'subset.zim')
+        with ZIMReader(source_zim) as reader, ZIMWriter(target) as writer:
+            writer.add_article(Namespace.MAIN_ARTICLE, 'fresh', 'Fresh', b'new')
+            mapping = writer.copy_clusters(reader, [3, 0, 4])
+            assert mapping == {0: 1, 3: 2, 4: 3}
+            writer.add_entry(Namespace.IMAGE, 'img1', 'img 1', mapping[4], 1, 'image/png')
+        with ZIMReader(target) as reader:
+            assert reader.get_article_content(reader.get_entry_by_path('A/fresh')) == b'new'
+            assert reader.read_cluster(2) == [b'page 3']
+            assert reader.get_article_content(reader.get_entry_by_path('I/img1')) == b'blob-1' * 30
+
+
+def _write_unsorted(path, **options):
+    """Write entries, redirects and a main page out of order."""
+    with ZIMWriter(path, **options) as writer:
+        for i in (5, 2, 8, 0, 7, 3, 9, 1, 6, 4):
+            writer.add_article(Namespace.MAIN_ARTICLE, f'p{i}', f'Title {9 - i}', b'page %d' % i)
+        writer.add_article(Namespace.METADATA, 'Title', 'Title', b'Sorted', 'text/plain')
+        writer.add_redirect(Namespace.MAIN_ARTICLE, 'alias', 'Alias', 1)
+        writer.add_redirect_to_path(Namespace.MAIN_ARTICLE, 'later', 'Later', 'A/p4')
+        writer.add_redirect_to_path(Namespace.MAIN_ARTICLE, 'chain', 'Chain', 'A/alias')
+        writer.add_redirect_to_path(Namespace.MAIN_ARTICLE, 'dangling', 'Dangling', 'A/missing')
+        writer.main_page_path = 'A/p7'
+    return writer
+
+
+class TestSortedDirectory:
+    """Tests for sorted finalize with on-disk runs."""
+
+    def test_entries_sorted_and_targets_remapped(self, tmp_path):
+        """Entries are in (namespace, url) order and redirects follow their targets."""
+        path = str(tmp_path / 'sorted.zim')
+        writer = _write_unsorted(path, sort_entries=True, run_size=3)
+        assert writer.unresolved_redirects == [('A/dangling', 'A/missing')]
+        with ZIMReader(path) as reader:
+            assert reader.is_sorted
+            keys = [(e.namespace, e.url) for e in reader.directory_entries]
+            assert keys == sorted(keys)
+            assert reader.get_main_page().url == 'p7'
+            for alias, target in (('alias', 'p2'), ('later', 'p4'), ('chain', 'p2')):
+                assert reader.resolve(reader.get_entry_by_path(f'A/{alias}')).url == target
+            assert reader.resolve(reader.get_entry_by_path('A/dangling')) is None
+            assert reader.get_article_content(reader.get_entry_by_path('A/p6')) == b'page 6'
+
+    def test_title_pointers(self, tmp_path):
+        """The title pointer list orders entries by (namespace, title)."""
+        path = str(tmp_path / 'sorted.zim')
+        _write_unsorted(path, sort_entries=True, run_size=4)
+        with ZIMReader(path) as reader:
+            entries = reader.directory_entries
+            keys = [(entries[i].namespace, entries[i].title) for i in reader.read_title_pointers()]
+            assert len(keys) == len(entries) and keys == sorted(keys)
+
+    def test_spilling_does_not_change_output(self, tmp_path):
+        """Any run size produces the same bytes as an in-memory sort."""
+        outputs = []
+        for run_size in (None, 1, 5, 1000):
+            path = str(tmp_path / f'sorted-{run_size}.zim')
+            _write_unsorted(path, sort_entries=True, run_size=run_size)
+            with open(path, 'rb') as f:
+                outputs.append(f.read())
+        assert outputs.count(outputs[0]) == len(outputs)
+
+    def test_insertion_order_by_default(self, tmp_path):
+        """Without sort_entries the directory keeps insertion order and path redirects resolve."""
+        path = str(tmp_path / 'unsorted.zim')
+        writer = _write_unsorted(path)
+        assert writer.unresolved_redirects == [('A/dangling', 'A/missing')]
+        with ZIMReader(path) as reader:
+            assert not reader.is_sorted
+            assert reader.directory_entries[0].url == 'p5'
+            assert reader.get_main_page().url == 'p7'
+            assert reader.resolve(reader.get_entry_by_path('A/chain')).url == 'p2'
+
+    def test_path_redirects_spill(self, tmp_path):
+        """Buffered state stays flat as path redirects grow; targets resolve after the merge."""
+        growth = []
+        for count in (500, 5000):
+            path = str(tmp_path / f'redirects-{count}.zim')
+            tracemalloc.start()
+            try:
+                with ZIMWriter(path, sort_entries=True, run_size=100) as writer:
+                    writer.add_article(Namespace.MAIN_ARTICLE, 'target', 'Target', b'target')
+                    base = tracemalloc.take_snapshot()
+                    for i in range(count):
+                        writer.add_redirect_to_path(Namespace.MAIN_ARTICLE, f'r{i}', f'R {i}',
+                                                    'A/target' if i % 2 else f'A/missing{i}')
+                    # Only the writer's own allocations; run files are per spill
+                    own = [tracemalloc.Filter(True, zimlib.__file__)]
+                    growth.append(sum(stat.size_diff for stat in tracemalloc.take_snapshot().filter_traces(own)
+                                      .compare_to(base.filter_traces(own), 'filename')))
+                    assert len(writer._path_targets) < 100
+            finally:
+                tracemalloc.stop()
+            assert len(writer.unresolved_redirects) == count // 2
+            with ZIMReader(path) as reader:
+                assert reader.resolve(reader.get_entry_by_path(f'A/r{count - 1}')).url == 'target'
+                assert reader.resolve(reader.get_entry_by_path('A/r0')) is None
+        assert growth[1] < growth[0] + 64 * 1024
+
+    def test_run_size_requires_sorting(self, tmp_path):
+        """Runs only make sense for sorted output."""
+        with pytest.raises(ValueError):
+            ZIMWriter(str(tmp_path / 'x.zim'), run_size=10)
+
+
+class TestCodecPolicy:
+    """Tests for per-MIME and per-namespace codec selection."""
+
+    def test_policy_choices(self):
+        """Media is stored, text compressed; overrides win in order."""
+        policy = CodecPolicy(CompressionType.ZLIB, 9, namespaces={Namespace.METADATA: (CompressionType.NONE, None)},
+                             mime_types={'text/css': (CompressionType.LZMA, 1)})
+        assert policy.codec(Namespace.MAIN_ARTICLE, 'text/html') == (CompressionType.ZLIB, 9)
+        assert policy.codec(Namespace.IMAGE, 'image/jpeg') == (CompressionType.NONE, None)
+        assert policy.codec(Namespace.IMAGE, 'image/svg+xml') == (CompressionType.ZLIB, 9)
+        assert policy.codec(Namespace.STYLE, 'text/css') == (CompressionType.LZMA, 1)
+        assert policy.codec(Namespace.METADATA, 'text/plain') == (CompressionType.NONE, None)
+        assert CodecPolicy(CompressionType.NONE).codec(0, 'text/html') == (CompressionType.NONE, None)
+
+    @pytest.mark.parametrize('compression', [CompressionType.ZLIB, CompressionType.LZMA, CompressionType.ZSTD])
+    def test_add_article_uses_policy(self, tmp_path, compression):
+        """add_article encodes each article with the codec its policy picks."""
+        if compression == CompressionType.ZSTD:
+            pytest.importorskip('zstandard')
+        path = str(tmp_path / 'policy.zim')
+        page = b'<p>hello</p>' * 200
+        with ZIMWriter(path, codec_policy=CodecPolicy(compression, 1)) as writer:
+            writer.add_article(Namespace.MAIN_ARTICLE, 'page', 'Page', page)
+            writer.add_article(Namespace.IMAGE, 'photo.jpg', 'Photo', b'\xff\xd8\xff' * 50, 'image/jpeg')
+        with ZIMReader(path) as reader:
+            html, jpeg = reader.get_entry_by_path('A/page'), reader.get_entry_by_path('I/photo.jpg')
+            assert reader.cluster_compression(html.cluster_number) == compression
+            assert reader.cluster_compression(jpeg.cluster_number) == CompressionType.NONE
+            assert reader.get_article_content(html) == page
+            assert reader.get_article_content(jpeg) == b'\xff\xd8\xff' * 50
+
+
+def _boilerplate_pages(count):
+    """Small HTML pages sharing most of their markup."""
+    nav = ''.join(f'<li><a href="/wiki/Portal_{i}">Portal {i}</a></li>' for i in range(30))
+    return [(f'<html><head><title>Page {i}</title></head><body><nav><ul>{nav}</ul></nav>'
+             f'<h1>Page {i}</h1><p>{" ".join(str(i * j) for j in range(40))}</p>'
+             '<footer>Text is available under the Creative Commons License.</footer></body></html>').encode()
+            for i in range(count)]
+
+
+class TestZstdDictionary:
+    """Tests for trained ZSTD dictionaries."""
+
+    def test_dictionary_primes_clusters(self, tmp_path):
+        """Clusters compressed with the stored dictionary are smaller and read back."""
+        pytest.importorskip('zstandard')
+        pages = _boilerplate_pages(300)
+        sizes = {}
+        for trained in (False, True):
+            path = str(tmp_path / f'dict-{trained}.zim')
+            with ZIMWriter(path, codec_policy=CodecPolicy(CompressionType.ZSTD)) as writer:
+                if trained:
+                    writer.train_zstd_dictionary(pages[:200], 16384)
+                for i, page in enumerate(pages):
+                    writer.add_article(Namespace.MAIN_ARTICLE, f'p{i}', f'P {i}', page)
+            sizes[trained] = os.path.getsize(path)
+            with ZIMReader(path) as reader:
+                assert (reader.read_zstd_dictionary() is not None) == trained
+                assert reader.get_article_content(reader.get_entry_by_path('A/p250')) == pages[250]
+        assert sizes[True] < sizes[False] * 0.6
+
+        # Readers without a directory find the dictionary on first use
+        reader = ZIMReader(path)
+        reader.open(directory=False)
+        try:
+            assert reader.read_cluster(1) == [pages[0]]
+            assert reader._zstd_primed
+        finally:
+            reader.close()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
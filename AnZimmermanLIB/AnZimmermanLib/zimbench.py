@@ -0,0 +1,612 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Benchmark suite and synthetic corpus generator for ZIM archives.
+
+generate_corpus() builds a deterministic archive of any size through
+ZIMImporter. A seed fixes every title, URL, size and byte. The corpus
+mixes HTML articles, JPEG and PNG images, redirects, stylesheets,
+scripts and metadata in roughly the proportions of a Wikipedia dump.
+Sizes are log-normal. Text is drawn from a shared word pool so it
+compresses like prose, and image bytes are random so they do not.
+
+run_suite() times the write path (adding entries and finalize) while
+it generates, then opens the result and times:
+- open, with and without a directory snapshot;
+- path lookups;
+- content fetches, cold (page cache dropped where possible, fresh
+  reader) and warm;
+- listing;
+- trigram index build and search.
+
+With --memory it measures memory instead: tracemalloc peaks and RSS
+samples for the build, for open() with and without a snapshot, and for
+a reader serving lookups and fetches. ZIMReader.memory_report() then
+breaks the serving reader down by structure.
+
+Results are JSON. compare_results() flags metrics that got worse than
+a baseline by more than a threshold.
+
+Command line:
+    python zimbench.py generate corpus.zim --entries 1m
+    python zimbench.py run --sizes 10k 1m --output results.json --baseline baseline.json
+    python zimbench.py run --memory --sizes 10k 1m --scale 0.1 --output memory.json
+    python zimbench.py compare baseline.json results.json --threshold 0.2
+"""
+
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from zimlib import ZIMReader, CodecPolicy, CompressionType, Namespace
+from zimimport import CLUSTER_SIZE, ZIMImporter
+from zimsearch import TrigramIndex
+
+try:
+    import zstandard
+except ImportError:  # Corpora fall back to zlib
+    zstandard = None
+
+
+RESULTS_VERSION = 1
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+SAMPLE_SIZE = 2000
+ROUNDS = 5
+DEFAULT_THRESHOLD = 0.2
+WORD_POOL_SIZE = 8 << 20
+NOISE_POOL_SIZE = 4 << 20
+MAX_BLOB_SIZE = 1 << 20
+MEMORY_CLUSTER_CACHE = 16
+RSS_INTERVAL = 0.005
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+T = TypeVar('T')
+
+# (kind, share of entries, MIME type, median size in bytes, log-normal sigma)
+CORPUS_MIX = (
+    ('article', 0.62, 'text/html', 6000, 1.0),
+    ('redirect', 0.20, None, 0, 0.0),
+    ('image', 0.11, 'image/jpeg', 24000, 1.1),
+    ('image', 0.06, 'image/png', 9000, 1.2),
+    ('asset', 0.005, 'text/css', 4000, 0.8),
+    ('asset', 0.005, 'application/javascript', 8000, 0.8),
+)
+
+# Metrics where a larger value is better; all others are durations
+HIGHER_IS_BETTER = {'write_entries_per_s', 'write_mb_per_s', 'requests_per_s'}
+
+_SYLLABLES = ('an', 'ber', 'cal', 'dor', 'el', 'fin', 'gar', 'hal', 'is', 'jor', 'kel', 'lin', 'mor',
+              'nar', 'o', 'pel', 'quin', 'ra', 'sul', 'tor', 'u', 'vel', 'win', 'xa', 'yor', 'zen')
+_IMAGE_MAGIC = {'image/jpeg': b'\xff\xd8\xff\xe0\x00\x10JFIF\x00', 'image/png': b'\x89PNG\r\n\x1a\n'}
+
+
+@dataclass
+class CorpusResult:
+    """Summary of a generated corpus and the time spent writing it."""
+    path: str
+    entries: int = 0
+    redirects: int = 0
+    bytes: int = 0
+    write_seconds: float = 0.0
+    finalize_seconds: float = 0.0
+
+
+@dataclass
+class Comparison:
+    """One metric of a results file set against a baseline."""
+    size: str
+    metric: str
+    baseline: float
+    current: float
+    change: float
+    regression: bool
+
+
+def _vocabulary(rng: random.Random, count: int = 5000) -> List[str]:
+    """Pseudo-words of 1-4 syllables."""
+    return [''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(count)]
+
+
+def _word_pool(rng: random.Random, vocabulary: List[str]) -> bytes:
+    """Prose-like text with a Zipf-ish word distribution."""
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    words = rng.choices(vocabulary, weights, k=WORD_POOL_SIZE // 6)
+    return ' '.join(words).encode('ascii')[:WORD_POOL_SIZE]
+
+
+def _blob_size(rng: random.Random, median: int, sigma: float) -> int:
+    """Log-normal size, at least 64 bytes and at most MAX_BLOB_SIZE."""
+    return max(64, min(MAX_BLOB_SIZE, int(rng.lognormvariate(math.log(median), sigma))))
+
+
+def _slice(rng: random.Random, pool: bytes, size: int) -> bytes:
+    """size bytes from a random offset of pool, wrapping around."""
+    start = rng.randrange(len(pool))
+    data = pool[start:start + size]
+    while len(data) < size:
+        data += pool[:size - len(data)]
+    return data
+
+
+def _url(vocabulary: List[str], i: int) -> str:
+    """Base URL of entry i: 1-3 capitalized words and the index.
+
+    Derived from i alone, so redirect targets are kept as indices.
+    """
+    h = (i + 1) * 0x9E3779B1 & 0xFFFFFFFF
+    n = len(vocabulary)
+    words = (vocabulary[h % n], vocabulary[(h >> 11) % n], vocabulary[(h >> 21) % n])
+    return '_'.join(word.capitalize() for word in words[:1 + (h >> 29) % 3]) + f'_{i}'
+
+
+def corpus_entries(count: int, seed: int = 0, content_scale: float = 1.0
+                   ) -> Iterator[Tuple[str, int, str, str, object, Optional[str]]]:
+    """Yield count corpus entries as (kind, namespace, url, title, content or target, MIME type).
+
+    Redirect entries carry their target (namespace, url) instead of
+    content. The same count, seed and scale always give the same entries.
+    Besides about 12 MiB of text and noise pools, the generator keeps
+    4 bytes per article.
+    """
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng)
+    words = _word_pool(rng, vocabulary)
+    noise = rng.randbytes(NOISE_POOL_SIZE)
+    kinds = list(CORPUS_MIX)
+    shares = [item[1] for item in CORPUS_MIX]
+    articles = array('I')
+
+    for i in range(count):
+        kind, _, mime_type, median, sigma = rng.choices(kinds, shares)[0]
+        if kind == 'redirect' and not articles:
+            kind, _, mime_type, median, sigma = CORPUS_MIX[0]
+        url = _url(vocabulary, i)
+        title = url.replace('_', ' ')
+        size = _blob_size(rng, max(1, int(median * content_scale)), sigma) if median else 0
+
+        if kind == 'article':
+            articles.append(i)
+            head = f'<html><head><title>{title}</title></head><body><h1>{title}</h1><p>'.encode('ascii')
+            yield kind, Namespace.MAIN_ARTICLE, url, title, head + _slice(rng, words, size) + b'</p></body></html>', mime_type
+        elif kind == 'redirect':
+            target = _url(vocabulary, articles[rng.randrange(len(articles))])
+            yield kind, Namespace.MAIN_ARTICLE, url, title, (Namespace.MAIN_ARTICLE, target), None
+        elif kind == 'image':
+            extension = 'jpg' if mime_type == 'image/jpeg' else 'png'
+            content = _IMAGE_MAGIC[mime_type] + _slice(rng, noise, size)
+            yield kind, Namespace.IMAGE, f'{url}.{extension}', '', content, mime_type
+        else:
+            namespace = Namespace.STYLE if mime_type == 'text/css' else Namespace.SCRIPT
+            extension = 'css' if mime_type == 'text/css' else 'js'
+            yield kind, namespace, f'{url}.{extension}', '', _slice(rng, words, size), mime_type
+
+
+def generate_corpus(path: str, count: int, seed: int = 0, content_scale: float = 1.0,
+                    compression: Optional[CompressionType] = None, cluster_size: int = CLUSTER_SIZE,
+                    workers: Optional[int] = None) -> CorpusResult:
+    """Write a deterministic corpus of count entries to path.
+
+    compression defaults to ZSTD when available and zlib otherwise.
+    Time spent generating content is excluded from write_seconds.
+    """
+    return write_corpus(path, corpus_entries(count, seed, content_scale), compression, cluster_size, workers)
+
+
+def write_corpus(path: str, entries: Iterable[Tuple[str, int, str, str, object, Optional[str]]],
+                 compression: Optional[CompressionType] = None, cluster_size: int = CLUSTER_SIZE,
+                 workers: Optional[int] = None) -> CorpusResult:
+    """Write entries from corpus_entries() to path; see generate_corpus()."""
+    if compression is None:
+        compression = CompressionType.ZSTD if zstandard is not None else CompressionType.ZLIB
+    result = CorpusResult(path)
+    importer = ZIMImporter(path, cluster_size, workers=workers, policy=CodecPolicy(compression))
+    main_page = None
+    clock = time.perf_counter
+    try:
+        for kind, namespace, url, title, content, mime_type in entries:
+            start = clock()
+            if kind == 'redirect':
+                importer.add_redirect(namespace, url, title, content)
+                result.redirects += 1
+            else:
+                importer.add(namespace, url, title, content, mime_type)
+                result.bytes += len(content)
+                if main_page is None and kind == 'article':
+                    main_page = (namespace, url)
+            result.write_seconds += clock() - start
+            result.entries += 1
+        start = clock()
+        for key, value in (('Title', f'Synthetic corpus of {result.entries}'), ('Language', 'eng'),
+                           ('Date', '2000-01-01'), ('Creator', 'zimbench')):
+            importer.add_metadata(key, value)
+        result.write_seconds += clock() - start
+    except BaseException:
+        importer.abort()
+        raise
+    start = clock()
+    importer.finish(main_page)
+    result.finalize_seconds = clock() - start
+    return result
+
+
+def drop_page_cache(path: str) -> None:
+    """Ask the kernel to drop cached pages of a file, where supported."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    with open(path, 'rb') as f:
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _best_of(function: Callable[[], object], rounds: int = ROUNDS) -> float:
+    """Fastest of several runs of function, in seconds."""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _per_op(function: Callable[[object], object], items: Sequence, rounds: int = ROUNDS) -> float:
+    """Best mean seconds per call of function over items."""
+    def run():
+        for item in items:
+            function(item)
+    return _best_of(run, rounds) / max(1, len(items))
+
+
+def benchmark_archive(path: str, seed: int = 0, sample_size: int = SAMPLE_SIZE) -> Dict[str, float]:
+    """Time reads of an existing archive; durations are in seconds."""
+    results: Dict[str, float] = {}
+    rng = random.Random(seed)
+
+    def open_parsed():
+        reader = ZIMReader(path)
+        reader.open(snapshot=False)
+        reader.close()
+
+    results['open_s'] = _best_of(open_parsed)
+
+    with ZIMReader(path) as reader:
+        reader.save_snapshot()
+    try:
+        def open_snapshot():
+            reader = ZIMReader(path)
+            reader.open()
+            reader.close()
+
+        results['open_snapshot_s'] = _best_of(open_snapshot)
+
+        drop_page_cache(path)
+        reader = ZIMReader(path)
+        reader.open(snapshot=False)
+        try:
+            entries = reader.directory_entries
+            picks = [entries[i] for i in rng.sample(range(len(entries)), min(sample_size, len(entries)))]
+            paths = [f'{chr(e.namespace)}/{e.url}' for e in picks]
+            articles = [reader.resolve(e) for e in picks if e.namespace != Namespace.METADATA]
+            articles = [e for e in articles if e is not None]
+
+            results['lookup_s'] = _per_op(reader.get_entry_by_path, paths)
+
+            start = time.perf_counter()
+            for entry in articles:
+                reader.get_article_content(entry)
+            results['fetch_cold_s'] = (time.perf_counter() - start) / max(1, len(articles))
+
+            # Large enough to hold every sampled cluster
+            reader.cluster_cache_size = len({e.cluster_number for e in articles})
+            for entry in articles:
+                reader.get_article_content(entry)
+            results['fetch_warm_s'] = _per_op(reader.get_article_content, articles)
+
+            results['list_s'] = _best_of(reader.list_articles)
+
+            index = TrigramIndex(reader)
+            results['search_index_s'] = _best_of(index.build, 1)
+            queries = [e.title.split()[0].lower() for e in picks[:200] if e.title]
+            results['search_s'] = _per_op(index.search, queries or ['zzz'])
+        finally:
+            reader.close()
+    finally:
+        os.remove(ZIMReader(path).snapshot_path())
+    return results
+
+
+def time_benchmark(path: str, count: int, seed: int = 0, content_scale: float = 1.0,
+                   sample_size: int = SAMPLE_SIZE) -> Dict[str, float]:
+    """Generate a corpus at path, timing the write, then time reading it."""
+    corpus = generate_corpus(path, count, seed, content_scale)
+    metrics = {
+        'write_s': corpus.write_seconds,
+        'write_entries_per_s': corpus.entries / max(corpus.write_seconds, 1e-9),
+        'write_mb_per_s': corpus.bytes / 1e6 / max(corpus.write_seconds, 1e-9),
+        'finalize_s': corpus.finalize_seconds,
+        'archive_bytes': os.path.getsize(path),
+    }
+    metrics.update(benchmark_archive(path, seed, sample_size))
+    return metrics
+
+
+def _rss() -> Optional[int]:
+    """Resident set size of this process in bytes, where /proc is available."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler(threading.Thread):
+    """Samples RSS on a thread to catch peaks between measurements."""
+
+    def __init__(self, interval: float = RSS_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss() or 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, _rss() or 0)
+
+    def stop(self) -> int:
+        """Stop sampling and return the peak seen."""
+        self._stop_event.set()
+        self.join()
+        return max(self.peak, _rss() or 0)
+
+
+@dataclass
+class MemoryUsage:
+    """Memory growth over a measured call, in bytes.
+
+    peak and steady come from tracemalloc and cover Python allocations
+    (numpy and zstandard buffers included). steady is measured after a
+    collection, with the call's result still alive. The RSS figures also
+    count allocator slack and mapped pages, and are None without /proc.
+    """
+    peak: int = 0
+    steady: int = 0
+    rss_peak: Optional[int] = None
+    rss_steady: Optional[int] = None
+
+
+def measure_memory(function: Callable[[], T]) -> Tuple[T, MemoryUsage]:
+    """Call function, tracking allocations with tracemalloc and sampling RSS."""
+    gc.collect()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    rss_base = _rss()
+    sampler = _RssSampler()
+    sampler.start()
+    try:
+        result = function()
+    finally:
+        rss_peak = sampler.stop()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        if started:
+            tracemalloc.stop()
+    usage = MemoryUsage(peak - base, current - base)
+    if rss_base is not None:
+        usage.rss_peak = rss_peak - rss_base
+        usage.rss_steady = (_rss() or 0) - rss_base
+    return result, usage
+
+
+def _open_reader(path: str, snapshot: bool, cluster_cache: int = 0) -> ZIMReader:
+    """Open a reader that the caller closes."""
+    reader = ZIMReader(path, cluster_cache=cluster_cache)
+    reader.open(snapshot=snapshot)
+    return reader
+
+
+def _exercise(reader: ZIMReader, indices: Sequence[int]) -> None:
+    """Look up and fetch the entries at indices, as a server would."""
+    for index in indices:
+        entry = reader.directory_entries[index]
+        entry = reader.resolve(reader.get_entry_by_path(f'{chr(entry.namespace)}/{entry.url}'))
+        if entry is not None:
+            reader.get_article_content(entry)
+
+
+def memory_benchmark(path: str, count: int, seed: int = 0, content_scale: float = 1.0,
+                     sample_size: int = SAMPLE_SIZE) -> Dict[str, float]:
+    """Generate a corpus at path and measure the memory of writing and reading it.
+
+    Reports peak and steady memory of a ZIMWriter build, of open() with a
+    parsed directory and with a snapshot, and of a reader after serving
+    sample_size lookups and fetches with a MEMORY_CLUSTER_CACHE cache.
+    memory_report() then breaks the serving reader down by structure.
+    """
+    metrics: Dict[str, float] = {}
+
+    def record(prefix: str, usage: MemoryUsage) -> None:
+        metrics[f'{prefix}_peak_bytes'] = usage.peak
+        metrics[f'{prefix}_steady_bytes'] = usage.steady
+        if usage.rss_peak is not None:
+            metrics[f'{prefix}_rss_peak_bytes'] = usage.rss_peak
+            metrics[f'{prefix}_rss_steady_bytes'] = usage.rss_steady
+
+    # Build the generator's pools first so they are not counted
+    entries = corpus_entries(count, seed, content_scale)
+    first = next(entries)
+    corpus, usage = measure_memory(lambda: write_corpus(path, itertools.chain([first], entries)))
+    record('write', usage)
+    del entries, first
+
+    reader, usage = measure_memory(lambda: _open_reader(path, False, MEMORY_CLUSTER_CACHE))
+    try:
+        record('open', usage)
+        rng = random.Random(seed)
+        indices = rng.sample(range(len(reader.directory_entries)), min(sample_size, len(reader.directory_entries)))
+        _, usage = measure_memory(lambda: _exercise(reader, indices))
+        record('serve', usage)
+        report = reader.memory_report()
+        for name in ('directory', 'strings', 'caches', 'indexes', 'other'):
+            metrics[f'report_{name}_bytes'] = getattr(report, name)
+        metrics['report_total_bytes'] = report.total
+        reader.save_snapshot()
+    finally:
+        reader.close()
+        del reader
+
+    try:
+        reader, usage = measure_memory(lambda: _open_reader(path, True))
+        reader.close()
+        record('open_snapshot', usage)
+    finally:
+        os.remove(ZIMReader(path).snapshot_path())
+    metrics['bytes_per_entry'] = metrics['open_steady_bytes'] / max(1, corpus.entries)
+    return metrics
+
+
+def run_suite(sizes: Iterable[str] = ('10k',), seed: int = 0, content_scale: float = 1.0,
+              work_dir: Optional[str] = None, sample_size: int = SAMPLE_SIZE,
+              keep: bool = False, memory: bool = False) -> Dict[str, object]:
+    """Generate and benchmark a corpus per size; sizes are SIZES keys or entry counts.
+
+    With memory, measures memory instead of time (see memory_benchmark()).
+    """
+    benchmark = memory_benchmark if memory else time_benchmark
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        count = SIZES[size] if size in SIZES else int(size)
+        directory = work_dir or tempfile.mkdtemp(prefix='zimbench-')
+        path = os.path.join(directory, f'corpus-{size}-{seed}.zim')
+        try:
+            results[size] = benchmark(path, count, seed, content_scale, sample_size)
+        finally:
+            if not keep:
+                if os.path.exists(path):
+                    os.remove(path)
+                if not work_dir:
+                    os.rmdir(directory)
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'mode': 'memory' if memory else 'time',
+        'seed': seed,
+        'content_scale': content_scale,
+        'results': results,
+    }
+
+
+def compare_results(baseline: Dict[str, object], current: Dict[str, object],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Comparison]:
+    """Compare every metric present in both results.
+
+    change is the relative slowdown (or loss of throughput), so positive
+    is worse; it is a regression above threshold. Byte counts are costs
+    like durations, so growth is flagged too.
+    """
+    comparisons = []
+    for size, metrics in current['results'].items():
+        base = baseline['results'].get(size, {})
+        for metric, value in metrics.items():
+            if metric not in base or not base[metric]:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                change = base[metric] / value - 1 if value else float('inf')
+            else:
+                change = value / base[metric] - 1
+            comparisons.append(Comparison(size, metric, base[metric], value, change, change > threshold))
+    return comparisons
+
+
+def load_results(path: str) -> Dict[str, object]:
+    """Read a results file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != RESULTS_VERSION:
+        raise ValueError(f"{path}: unsupported results version {data.get('version')}")
+    return data
+
+
+def print_comparisons(comparisons: List[Comparison]) -> int:
+    """Print a comparison table and return the number of regressions."""
+    for item in comparisons:
+        flag = 'REGRESSION' if item.regression else ''
+        print(f"{item.size:<6} {item.metric:<22} {item.baseline:>14.6g} {item.current:>14.6g} "
+              f"{item.change:>+8.1%}  {flag}")
+    return sum(item.regression for item in comparisons)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for generating corpora and running benchmarks."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark ZIM reading and writing on synthetic corpora")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help="Write a synthetic corpus")
+    generate.add_argument('output')
+    generate.add_argument('--entries', default='10k', help=f"Entry count or one of {', '.join(SIZES)}")
+    generate.add_argument('--seed', type=int, default=0)
+    generate.add_argument('--scale', type=float, default=1.0, help="Multiplier for content sizes")
+
+    run = commands.add_parser('run', help="Generate corpora and time them")
+    run.add_argument('--sizes', nargs='+', default=['10k'], help=f"Entry counts or {', '.join(SIZES)}")
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--scale', type=float, default=1.0, help="Multiplier for content sizes")
+    run.add_argument('--work-dir', help="Where to write corpora (default: a temporary directory)")
+    run.add_argument('--keep', action='store_true', help="Keep generated corpora")
+    run.add_argument('--memory', action='store_true',
+                     help="Measure peak and steady memory instead of time (slower: runs under tracemalloc)")
+    run.add_argument('--output', help="Write results JSON here (default: stdout)")
+    run.add_argument('--baseline', help="Compare against this results file")
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    compare = commands.add_parser('compare', help="Compare results against a baseline")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help="Relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        count = SIZES.get(args.entries) or int(args.entries)
+        corpus = generate_corpus(args.output, count, args.seed, args.scale)
+        print(json.dumps(asdict(corpus), indent=2))
+        return 0
+
+    if args.command == 'compare':
+        regressions = print_comparisons(compare_results(load_results(args.baseline), load_results(args.current),
+                                                         args.threshold))
+        return 1 if regressions else 0
+
+    results = run_suite(args.sizes, args.seed, args.scale, args.work_dir, keep=args.keep, memory=args.memory)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.baseline:
+        return 1 if print_comparisons(compare_results(load_results(args.baseline), results, args.threshold)) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
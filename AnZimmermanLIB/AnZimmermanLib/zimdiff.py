@@ -0,0 +1,328 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Binary delta patches between two ZIM archives.
+
+diff_archives() hashes every encoded cluster of both archives. Each
+cluster of the new archive is either a copy of an old cluster with the
+same hash or is shipped in the patch. The directory is sent as a delta:
+runs of old entries that survive unchanged (after cluster and redirect
+renumbering) are referenced by range, everything else is inlined.
+
+apply_patch() rebuilds the new archive from the old one, copying reused
+clusters straight from the old file and new ones from the patch.
+
+Patch layout (little-endian):
+    header      magic "ZPAT", version, flags (1: sorted directory),
+                base archive size and digest,
+                main/layout page, cluster count, op count, MIME list size
+    MIME list   new archive's MIME types, NUL separated, NUL NUL ended
+    clusters    per new cluster: kind (0 copy, 1 data), old cluster
+                number or data offset, data length
+    directory   ops: COPY(old start, count) or INSERT(count) followed by
+                count length-prefixed serialized entries
+    data        encoded clusters that are not in the base archive
+
+Command line:
+    python zimdiff.py diff old.zim new.zim update.zimpatch
+    python zimdiff.py apply old.zim update.zimpatch new.zim
+"""
+
+import hashlib
+import os
+import struct
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+from zimlib import ZIMReader, ZIMWriter, DirectoryEntry, RedirectEntry
+
+
+PATCH_MAGIC = b'ZPAT'
+PATCH_VERSION = 1
+PATCH_HEADER = struct.Struct('<4sHHQ16sIIIII')
+CLUSTER_OP = struct.Struct('<BQQ')
+DIRECTORY_OP = struct.Struct('<BII')
+
+PATCH_FLAG_SORTED = 1
+
+CLUSTER_COPY, CLUSTER_DATA = 0, 1
+DIR_COPY, DIR_INSERT = 0, 1
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class PatchStats:
+    """Summary of a computed patch."""
+    clusters_copied: int = 0
+    clusters_added: int = 0
+    entries_copied: int = 0
+    entries_inserted: int = 0
+    patch_bytes: int = 0
+
+
+def base_digest(reader: ZIMReader) -> bytes:
+    """Digest identifying an archive as a patch base without reading clusters."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(reader.header.to_bytes())
+    digest.update(struct.pack(f'<{len(reader.cluster_offsets)}Q', *reader.cluster_offsets))
+    return digest.digest()
+
+
+def cluster_digests(reader: ZIMReader) -> List[bytes]:
+    """Hash the encoded bytes of every cluster, reading in disk order."""
+    digests: List[bytes] = [b''] * len(reader.cluster_offsets)
+    for cluster_number in sorted(range(len(reader.cluster_offsets)),
+                                 key=lambda c: reader.cluster_offsets[c]):
+        start = reader.cluster_offsets[cluster_number]
+        remaining = reader._cluster_end(cluster_number) - start
+        digest = hashlib.blake2b(digest_size=16)
+        reader.file.seek(start)
+        while remaining > 0:
+            chunk = reader.file.read(min(remaining, HASH_CHUNK_SIZE))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+        digests[cluster_number] = digest.digest()
+    return digests
+
+
+def _mime_type(reader: ZIMReader, entry: DirectoryEntry) -> str:
+    """MIME type string of an article entry."""
+    if entry.mimetype_index < len(reader.mime_types):
+        return reader.mime_types[entry.mimetype_index]
+    return ''
+
+
+def _entry_key(entry: Union[DirectoryEntry, RedirectEntry]) -> Tuple[int, str]:
+    """Identity of an entry across archives."""
+    return entry.namespace, entry.url
+
+
+def _match_entries(old: ZIMReader, new: ZIMReader, cluster_map: Dict[int, int]) -> Dict[int, int]:
+    """Map old to new entry indices for entries that can be copied unchanged."""
+    old_index = {_entry_key(e): i for i, e in enumerate(old.directory_entries)}
+    candidates: Dict[int, int] = {}
+    for i, entry in enumerate(new.directory_entries):
+        j = old_index.get(_entry_key(entry))
+        if j is None:
+            continue
+        before = old.directory_entries[j]
+        if type(before) is not type(entry) or before.title != entry.title:
+            continue
+        if isinstance(entry, DirectoryEntry):
+            if not (_mime_type(old, before) == _mime_type(new, entry)
+                    and before.blob_number == entry.blob_number
+                    and cluster_map.get(before.cluster_number) == entry.cluster_number):
+                continue
+        candidates[j] = i
+
+    # Redirects survive only if their target survives at the right index;
+    # drop failures until stable (chains can cascade)
+    changed = True
+    while changed:
+        changed = False
+        for j, i in list(candidates.items()):
+            entry = new.directory_entries[i]
+            if isinstance(entry, RedirectEntry):
+                target = old.directory_entries[j].redirect_index
+                if candidates.get(target) != entry.redirect_index:
+                    del candidates[j]
+                    changed = True
+    return candidates
+
+
+def diff_archives(old_path: str, new_path: str, patch_path: str) -> PatchStats:
+    """Write a patch that turns old_path into new_path."""
+    stats = PatchStats()
+
+    with ZIMReader(old_path) as old, ZIMReader(new_path) as new:
+        old_clusters: Dict[bytes, int] = {}
+        for cluster_number, digest in enumerate(cluster_digests(old)):
+            old_clusters.setdefault(digest, cluster_number)
+
+        # Cluster plan, in new cluster order
+        plan: List[Tuple[int, int, int]] = []
+        cluster_map: Dict[int, int] = {}
+        data_chunks: List[Tuple[int, int]] = []
+        data_size = 0
+        for cluster_number, digest in enumerate(cluster_digests(new)):
+            source = old_clusters.get(digest)
+            if source is not None:
+                plan.append((CLUSTER_COPY, source, 0))
+                cluster_map.setdefault(source, cluster_number)
+                stats.clusters_copied += 1
+            else:
+                start = new.cluster_offsets[cluster_number]
+                length = new._cluster_end(cluster_number) - start
+                plan.append((CLUSTER_DATA, data_size, length))
+                data_chunks.append((start, length))
+                data_size += length
+                stats.clusters_added += 1
+
+        # Directory delta: runs of consecutive surviving old entries
+        matches = _match_entries(old, new, cluster_map)
+        new_to_old = {i: j for j, i in matches.items()}
+        ops: List[Tuple[int, int, object]] = []
+        for i, entry in enumerate(new.directory_entries):
+            j = new_to_old.get(i)
+            if j is not None:
+                if ops and ops[-1][0] == DIR_COPY and ops[-1][1] + ops[-1][2] == j:
+                    ops[-1] = (DIR_COPY, ops[-1][1], ops[-1][2] + 1)
+                else:
+                    ops.append((DIR_COPY, j, 1))
+                stats.entries_copied += 1
+            else:
+                if not ops or ops[-1][0] != DIR_INSERT:
+                    ops.append((DIR_INSERT, 0, []))
+                ops[-1][2].append(entry.to_bytes())
+                stats.entries_inserted += 1
+
+        mime_data = b'\x00'.join(mt.encode('utf-8') for mt in new.mime_types) + b'\x00\x00'
+
+        with open(patch_path, 'wb') as f:
+            flags = PATCH_FLAG_SORTED if new.is_sorted else 0
+            f.write(PATCH_HEADER.pack(PATCH_MAGIC, PATCH_VERSION, flags,
+                                      os.path.getsize(old_path), base_digest(old),
+                                      new.header.main_page_index, new.header.layout_page_index,
+                                      len(plan), len(ops), len(mime_data)))
+            f.write(mime_data)
+            for kind, value, length in plan:
+                f.write(CLUSTER_OP.pack(kind, value, length))
+            for kind, a, b in ops:
+                if kind == DIR_COPY:
+                    f.write(DIRECTORY_OP.pack(DIR_COPY, a, b))
+                else:
+                    f.write(DIRECTORY_OP.pack(DIR_INSERT, len(b), 0))
+                    for blob in b:
+                        f.write(struct.pack('<I', len(blob)))
+                        f.write(blob)
+            for start, length in data_chunks:
+                new.file.seek(start)
+                f.write(new.file.read(length))
+            stats.patch_bytes = f.tell()
+
+    return stats
+
+
+def _read_entry(data: bytes) -> Union[DirectoryEntry, RedirectEntry]:
+    """Parse a serialized directory entry."""
+    if struct.unpack_from('<I', data, 0)[0] == 0xFFFF:
+        return RedirectEntry.from_bytes(data)
+    return DirectoryEntry.from_bytes(data)
+
+
+def apply_patch(old_path: str, patch_path: str, output_path: str) -> None:
+    """Rebuild the new archive from old_path and a patch."""
+    with ZIMReader(old_path) as old, open(patch_path, 'rb') as patch:
+        header = patch.read(PATCH_HEADER.size)
+        (magic, version, flags, old_size, digest, main_page, layout_page,
+         cluster_count, op_count, mime_size) = PATCH_HEADER.unpack(header)
+        if magic != PATCH_MAGIC or version != PATCH_VERSION:
+            raise ValueError("Invalid ZIM patch file")
+        if old_size != os.path.getsize(old_path) or digest != base_digest(old):
+            raise ValueError("Patch does not match base archive")
+
+        mime_data = patch.read(mime_size)
+        end = mime_data.find(b'\x00\x00')
+        mime_types = [mt.decode('utf-8') for mt in mime_data[:end].split(b'\x00') if mt]
+
+        plan = [CLUSTER_OP.unpack(patch.read(CLUSTER_OP.size)) for _ in range(cluster_count)]
+
+        ops: List[Tuple[int, int, object]] = []
+        for _ in range(op_count):
+            kind, a, b = DIRECTORY_OP.unpack(patch.read(DIRECTORY_OP.size))
+            if kind == DIR_COPY:
+                ops.append((kind, a, b))
+            else:
+                entries = []
+                for _ in range(a):
+                    length = struct.unpack('<I', patch.read(4))[0]
+                    entries.append(_read_entry(patch.read(length)))
+                ops.append((kind, 0, entries))
+        data_start = patch.tell()
+
+        # Old cluster and entry numbers as they land in the new archive
+        cluster_map: Dict[int, int] = {}
+        for cluster_number, (kind, value, _) in enumerate(plan):
+            if kind == CLUSTER_COPY:
+                cluster_map.setdefault(value, cluster_number)
+        index_map: Dict[int, int] = {}
+        position = 0
+        for kind, a, b in ops:
+            if kind == DIR_COPY:
+                for k in range(b):
+                    index_map[a + k] = position + k
+                position += b
+            else:
+                position += len(b)
+
+        # Entries arrive already sorted, so a sorting writer leaves their
+        # order alone and only adds the title pointer list and version flag
+        with ZIMWriter(output_path, sort_entries=bool(flags & PATCH_FLAG_SORTED)) as writer:
+            run: List[int] = []
+            for cluster_number, (kind, value, length) in enumerate(plan):
+                if kind == CLUSTER_COPY and (not run or old.cluster_offsets[value] > old.cluster_offsets[run[-1]]):
+                    run.append(value)
+                    continue
+                if run:
+                    writer.copy_clusters(old, run)
+                    run = []
+                if kind == CLUSTER_COPY:
+                    run.append(value)
+                else:
+                    writer.copy_raw_cluster(patch, data_start + value, length)
+            if run:
+                writer.copy_clusters(old, run)
+
+            writer.mime_types = mime_types
+            mime_index = {mt: i for i, mt in enumerate(mime_types)}
+            for kind, a, b in ops:
+                if kind == DIR_INSERT:
+                    writer.directory_entries.extend(b)
+                    continue
+                for entry in old.directory_entries[a:a + b]:
+                    if isinstance(entry, RedirectEntry):
+                        entry = RedirectEntry(entry.mimetype_index, entry.namespace, entry.revision,
+                                              index_map[entry.redirect_index], entry.url, entry.title)
+                    else:
+                        entry = DirectoryEntry(mime_index[_mime_type(old, entry)], entry.namespace, entry.revision,
+                                               cluster_map[entry.cluster_number], entry.blob_number,
+                                               entry.url, entry.title)
+                    writer.directory_entries.append(entry)
+            writer.main_page_index = main_page
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for diff and apply."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create or apply ZIM delta patches")
+    commands = parser.add_subparsers(dest='command', required=True)
+    diff = commands.add_parser('diff', help="Create a patch from OLD to NEW")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('patch')
+    apply = commands.add_parser('apply', help="Rebuild NEW from OLD and a patch")
+    apply.add_argument('old')
+    apply.add_argument('patch')
+    apply.add_argument('output')
+    args = parser.parse_args(argv)
+
+    if args.command == 'diff':
+        stats = diff_archives(args.old, args.new, args.patch)
+        print(f"Patch: {stats.patch_bytes:,} bytes; clusters {stats.clusters_copied:,} reused, "
+              f"{stats.clusters_added:,} new; entries {stats.entries_copied:,} reused, "
+              f"{stats.entries_inserted:,} new")
+    else:
+        apply_patch(args.old, args.patch, args.output)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
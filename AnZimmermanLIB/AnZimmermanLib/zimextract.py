@@ -0,0 +1,212 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Parallel extraction of a ZIM archive to a directory tree.
+
+The cluster range is split into contiguous, byte-balanced slices that are
+handed to a process pool. Every worker opens its own reader and walks its
+slice in disk order, decompressing each cluster once. All output
+directories are created up front, so workers only open and write files.
+
+Command line:
+    python zimextract.py wikipedia.zim mirror/ --workers 8
+"""
+
+import html
+import os
+import posixpath
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Tuple
+from urllib.parse import quote
+
+from zimlib import ZIMReader, DirectoryEntry, RedirectEntry, AccessPattern, CLUSTER_READ_ERRORS
+
+
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+@dataclass
+class ExtractResult:
+    """Summary of an extraction run."""
+    files: int = 0
+    bytes: int = 0
+    redirects: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def entry_relpath(entry) -> Optional[str]:
+    """Return the output path of an entry relative to the output root.
+
+    Paths are <namespace>/<url>. URLs that would escape the namespace
+    directory are rejected and None is returned.
+    """
+    url = posixpath.normpath(entry.url) if entry.url else ''
+    if not url or url in ('.', '..') or url.startswith(('/', '../')):
+        return None
+    return posixpath.join(chr(entry.namespace), url)
+
+
+def _extract_slice(file_path: str, out_dir: str,
+                   jobs: List[Tuple[DirectoryEntry, str]]) -> ExtractResult:
+    """Write every entry of one cluster slice; runs inside a worker."""
+    result = ExtractResult()
+    by_cluster: Dict[int, List[Tuple[DirectoryEntry, str]]] = {}
+    for job in jobs:
+        by_cluster.setdefault(job[0].cluster_number, []).append(job)
+
+    # Only clusters are read, so the directory is not parsed
+    reader = ZIMReader(file_path)
+    reader.open(directory=False)
+    try:
+        # A one-off sweep: read ahead and do not keep what was written out
+        reader.advise(AccessPattern.SEQUENTIAL, drop_behind=True)
+        for cluster_number in sorted(by_cluster, key=lambda c: reader.cluster_offsets[c]):
+            cluster_jobs = by_cluster[cluster_number]
+            targets = {id(entry): relpath for entry, relpath in cluster_jobs}
+            try:
+                contents = list(reader.get_many(entry for entry, _ in cluster_jobs))
+            except CLUSTER_READ_ERRORS as e:
+                result.errors.append(f"cluster {cluster_number} read failed: {e}")
+                continue
+            for entry, content in contents:
+                target = os.path.join(out_dir, *targets[id(entry)].split('/'))
+                try:
+                    with open(target, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+                        f.write(content)
+                    result.files += 1
+                    result.bytes += len(content)
+                except OSError as e:
+                    result.errors.append(f"{targets[id(entry)]}: {e}")
+    finally:
+        reader.close()
+
+    return result
+
+
+def _slices(reader: ZIMReader, jobs: List[Tuple[DirectoryEntry, str]],
+            count: int) -> List[List[Tuple[DirectoryEntry, str]]]:
+    """Split jobs into `count` contiguous cluster ranges of similar byte size."""
+    by_cluster: Dict[int, List[Tuple[DirectoryEntry, str]]] = {}
+    for job in jobs:
+        by_cluster.setdefault(job[0].cluster_number, []).append(job)
+
+    clusters = sorted(by_cluster, key=lambda c: reader.cluster_offsets[c])
+    sizes = [reader._cluster_end(c) - reader.cluster_offsets[c] for c in clusters]
+    target = max(1, sum(sizes) // max(1, count))
+
+    slices: List[List[Tuple[DirectoryEntry, str]]] = [[]]
+    filled = 0
+    for cluster_number, size in zip(clusters, sizes):
+        if filled >= target and len(slices) < count:
+            slices.append([])
+            filled = 0
+        slices[-1].extend(by_cluster[cluster_number])
+        filled += size
+    return [s for s in slices if s]
+
+
+def _redirect_stub(source: str, target: str) -> bytes:
+    """Build a small HTML page that forwards to target."""
+    relative = posixpath.relpath(target, posixpath.dirname(source) or '.')
+    # Percent-encode so ?, # and % stay part of the file name, then escape for HTML
+    href = html.escape(quote(relative), quote=True)
+    text = html.escape(relative, quote=True)
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<meta http-equiv="refresh" content="0; url={href}"></head>'
+            f'<body><a href="{href}">{text}</a></body></html>').encode('utf-8')
+
+
+def extract_archive(path: str, out_dir: str, workers: int = 1,
+                    redirects: bool = True) -> ExtractResult:
+    """Extract every entry of a ZIM archive into out_dir.
+
+    Content entries are written to <out_dir>/<namespace>/<url>. With
+    `redirects`, redirect entries become HTML pages that forward to their
+    target. `workers` > 1 spreads the cluster range over processes.
+    """
+    result = ExtractResult()
+
+    with ZIMReader(path) as reader:
+        entries = reader.directory_entries
+        jobs: List[Tuple[DirectoryEntry, str]] = []
+        stubs: List[Tuple[str, str]] = []
+        for entry in entries:
+            relpath = entry_relpath(entry)
+            if relpath is None:
+                result.errors.append(f"{chr(entry.namespace)}/{entry.url}: unsafe path")
+                continue
+            if isinstance(entry, DirectoryEntry):
+                jobs.append((entry, relpath))
+            elif redirects and isinstance(entry, RedirectEntry):
+                final = reader.resolve(entry)
+                target = entry_relpath(final) if final else None
+                if target:
+                    stubs.append((relpath, target))
+
+        # A URL that is also a parent of other URLs cannot be a file
+        directories = {posixpath.dirname(rel) for _, rel in jobs + stubs}
+        for parent in list(directories):
+            while parent:
+                parent = posixpath.dirname(parent)
+                directories.add(parent)
+        directories.discard('')
+        clashes = {rel for _, rel in jobs + stubs if rel in directories}
+        for rel in sorted(clashes):
+            result.errors.append(f"{rel}: path is also a directory")
+        jobs = [job for job in jobs if job[1] not in clashes]
+        stubs = [stub for stub in stubs if stub[0] not in clashes]
+
+        os.makedirs(out_dir, exist_ok=True)
+        for directory in sorted(directories):
+            os.makedirs(os.path.join(out_dir, *directory.split('/')), exist_ok=True)
+
+        slices = _slices(reader, jobs, max(1, workers * 4) if workers > 1 else 1)
+
+    if workers > 1 and len(slices) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_extract_slice, [path] * len(slices),
+                                     [out_dir] * len(slices), slices))
+    else:
+        partials = [_extract_slice(path, out_dir, s) for s in slices]
+
+    for partial in partials:
+        result.files += partial.files
+        result.bytes += partial.bytes
+        result.errors.extend(partial.errors)
+
+    for source, target in stubs:
+        stub = _redirect_stub(source, target)
+        with open(os.path.join(out_dir, *source.split('/')), 'wb') as f:
+            f.write(stub)
+        result.redirects += 1
+
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for archive extraction."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract a ZIM file to a directory tree")
+    parser.add_argument('archive', help="Path to the ZIM file")
+    parser.add_argument('out_dir', help="Output directory")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes")
+    parser.add_argument('--no-redirects', action='store_true',
+                        help="Do not write forwarding pages for redirects")
+    args = parser.parse_args(argv)
+
+    result = extract_archive(args.archive, args.out_dir, workers=args.workers,
+                             redirects=not args.no_redirects)
+    print(f"Extracted {result.files:,} files ({result.bytes:,} bytes), {result.redirects:,} redirects")
+    for error in result.errors:
+        print(f"  error: {error}", file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Offline full-text search over ZIM article content.
+
+Builds a BM25 inverted index over the text of HTML articles in
+Namespace.MAIN_ARTICLE. Text extraction runs in parallel over clusters, and
+the finished index is written to a sidecar file that is memory-mapped at
+query time, so only the postings of the queried terms are ever touched.
+
+Build from the command line:
+    python zimfulltext.py wikipedia.zim --workers 8
+"""
+
+import heapq
+import html
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional, Dict, List, Tuple, Union
+
+from zimlib import ZIMReader, DirectoryEntry, Namespace, AccessPattern
+from zimsearch import archive_stamp
+
+
+FULLTEXT_INDEX_MAGIC = b'ZFTS'
+FULLTEXT_INDEX_VERSION = 1
+FULLTEXT_INDEX_SUFFIX = '.fulltext.idx'
+
+# magic, version, archive size, archive mtime, doc count, term count, avg doc length,
+# doc table pos, term table pos, string pool pos, postings pos
+_HEADER = struct.Struct('<4sIQQIIdQQQQ')
+_DOC = struct.Struct('<II')        # entry index, doc length
+_TERM = struct.Struct('<QIQI')     # string pool offset, length, postings offset, doc freq
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_SKIP_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def extract_text(content: bytes) -> str:
+    """Strip markup from an HTML document and return its visible text."""
+    text = content.decode('utf-8', errors='replace')
+    text = _SKIP_RE.sub(' ', text)
+    text = _TAG_RE.sub(' ', text)
+    return _SPACE_RE.sub(' ', html.unescape(text)).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) <= 64]
+
+
+def is_indexable(reader: ZIMReader, entry) -> bool:
+    """Check whether an entry is an HTML article that belongs in the index."""
+    if not isinstance(entry, DirectoryEntry) or entry.namespace != Namespace.MAIN_ARTICLE:
+        return False
+    if entry.mimetype_index >= len(reader.mime_types):
+        return False
+    return 'html' in reader.mime_types[entry.mimetype_index]
+
+
+def article_batches(reader: ZIMReader,
+                    batch_count: int) -> List[List[Tuple[int, List[Tuple[int, int]]]]]:
+    """Group indexable articles by cluster and split the clusters into batches.
+
+    Each batch is a list of (cluster_number, [(entry_index, blob_number), ...])
+    in cluster order, so a worker decompresses every cluster exactly once.
+    """
+    by_cluster: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for i, entry in enumerate(reader.directory_entries):
+        if is_indexable(reader, entry):
+            by_cluster[entry.cluster_number].append((i, entry.blob_number))
+
+    work = sorted(by_cluster.items())
+    batch_size = max(1, -(-len(work) // batch_count))
+    return [work[i:i + batch_size] for i in range(0, len(work), batch_size)]
+
+
+@contextmanager
+def batch_reader(source: Union[str, ZIMReader]) -> Iterator[ZIMReader]:
+    """Reader for a sequential pass over a batch of clusters.
+
+    source is an opened reader, used as is and restored to its access
+    pattern afterwards, or an archive path, opened without parsing the
+    directory since batches only read clusters.
+    """
+    if isinstance(source, ZIMReader):
+        previous = source.access_pattern
+        source.advise(AccessPattern.SEQUENTIAL)
+        try:
+            yield source
+        finally:
+            source.advise(previous)
+        return
+
+    reader = ZIMReader(source)
+    reader.open(directory=False)
+    try:
+        reader.advise(AccessPattern.SEQUENTIAL)
+        yield reader
+    finally:
+        reader.close()
+
+
+def _index_clusters(source: Union[str, ZIMReader],
+                    work: List[Tuple[int, List[Tuple[int, int]]]]) -> Tuple[Dict[int, int], Dict[str, List[Tuple[int, int]]]]:
+    """Extract and tokenize every document in a batch of clusters.
+
+    `work` is a list of (cluster_number, [(entry_index, blob_number), ...]).
+    Returns doc lengths and a partial inverted index keyed by entry index.
+    """
+    doc_lengths: Dict[int, int] = {}
+    postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    with batch_reader(source) as reader:
+        for cluster_number, docs in work:
+            blobs = reader.read_cluster(cluster_number)
+            for entry_index, blob_number in docs:
+                tokens = tokenize(extract_text(blobs[blob_number]))
+                doc_lengths[entry_index] = len(tokens)
+                for term, tf in Counter(tokens).items():
+                    postings[term].append((entry_index, tf))
+
+    return doc_lengths, postings
+
+
+def build_fulltext_index(reader: ZIMReader, path: Optional[str] = None,
+                         workers: int = 1) -> str:
+    """Index every HTML article of an opened reader and write the sidecar.
+
+    Clusters are split into batches that are processed by `workers`
+    processes, each with its own reader; with one worker the given
+    reader is used. Returns the sidecar path.
+    """
+    path = path or default_fulltext_path(reader.file_path)
+    batches = article_batches(reader, max(1, workers * 4))
+
+    doc_lengths: Dict[int, int] = {}
+    merged: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    def merge(result):
+        lengths, postings = result
+        doc_lengths.update(lengths)
+        for term, plist in postings.items():
+            merged[term].extend(plist)
+
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(_index_clusters, [reader.file_path] * len(batches), batches):
+                merge(result)
+    else:
+        for batch in batches:
+            merge(_index_clusters(reader, batch))
+
+    _write_index(path, reader.file_path, doc_lengths, merged)
+    return path
+
+
+def _write_index(path: str, archive_path: str, doc_lengths: Dict[int, int],
+                 postings: Dict[str, List[Tuple[int, int]]]) -> None:
+    """Serialize the inverted index into the mmap-able sidecar layout."""
+    entry_indices = sorted(doc_lengths)
+    doc_ids = {entry_index: doc_id for doc_id, entry_index in enumerate(entry_indices)}
+    total_length = sum(doc_lengths.values())
+    avg_length = total_length / len(entry_indices) if entry_indices else 0.0
+
+    # Terms are stored sorted by their UTF-8 bytes so lookups can bisect
+    terms = sorted((term.encode('utf-8'), term) for term in postings)
+    size, mtime = archive_stamp(archive_path)
+
+    doc_pos = _HEADER.size
+    term_pos = doc_pos + _DOC.size * len(entry_indices)
+    pool_pos = term_pos + _TERM.size * len(terms)
+    post_pos = pool_pos + sum(len(term_bytes) for term_bytes, _ in terms)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(FULLTEXT_INDEX_MAGIC, FULLTEXT_INDEX_VERSION, size, mtime,
+                             len(entry_indices), len(terms), avg_length,
+                             doc_pos, term_pos, pool_pos, post_pos))
+
+        for entry_index in entry_indices:
+            f.write(_DOC.pack(entry_index, doc_lengths[entry_index]))
+
+        pool_offset = pool_pos
+        postings_offset = post_pos
+        for term_bytes, term in terms:
+            df = len(postings[term])
+            f.write(_TERM.pack(pool_offset, len(term_bytes), postings_offset, df))
+            pool_offset += len(term_bytes)
+            postings_offset += 8 * df
+
+        for term_bytes, _ in terms:
+            f.write(term_bytes)
+
+        for _, term in terms:
+            flat = array('I')
+            for entry_index, tf in sorted(postings[term]):
+                flat.append(doc_ids[entry_index])
+                flat.append(tf)
+            if sys.byteorder == 'big':
+                flat.byteswap()
+            f.write(flat.tobytes())
+
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class FullTextHit:
+    """A scored full-text search result."""
+    index: int
+    entry: DirectoryEntry
+    score: float
+    snippet: str = ""
+
+
+class FullTextIndex:
+    """Memory-mapped BM25 full-text index for a ZIMReader."""
+
+    def __init__(self, reader: ZIMReader, path: Optional[str] = None):
+        """Initialize index for an opened reader and sidecar path."""
+        self.reader = reader
+        self.path = path or default_fulltext_path(reader.file_path)
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self.doc_count = 0
+        self.term_count = 0
+        self.avg_length = 0.0
+
+    def open(self) -> bool:
+        """Map the sidecar if it exists and matches the archive; return success."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < _HEADER.size:
+            return False
+
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, size, mtime, self.doc_count, self.term_count, self.avg_length,
+         self._doc_pos, self._term_pos, self._pool_pos, self._post_pos) = _HEADER.unpack_from(self._mm, 0)
+
+        if (magic != FULLTEXT_INDEX_MAGIC or version != FULLTEXT_INDEX_VERSION
+                or (size, mtime) != archive_stamp(self.reader.file_path) or not self._valid()):
+            self.close()
+            return False
+        return True
+
+    def _valid(self) -> bool:
+        """Check that every section and term record lies inside the sidecar.
+
+        A truncated or damaged sidecar fails here and is rebuilt, rather
+        than failing on the first search.
+        """
+        end = len(self._mm)
+        if (self._doc_pos != _HEADER.size
+                or self._term_pos != self._doc_pos + _DOC.size * self.doc_count
+                or self._pool_pos != self._term_pos + _TERM.size * self.term_count
+                or not self._pool_pos <= self._post_pos <= end):
+            return False
+        postings_end = self._post_pos
+        for str_off, str_len, post_off, df in _TERM.iter_unpack(self._mm[self._term_pos:self._pool_pos]):
+            if (str_off < self._pool_pos or str_off + str_len > self._post_pos
+                    or post_off != postings_end):
+                return False
+            postings_end += 8 * df
+        return postings_end == end
+
+    def close(self) -> None:
+        """Unmap the sidecar."""
+        if self._mm:
+            self._mm.close()
+            self._mm = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _lookup(self, term: str) -> Optional[Tuple[int, int]]:
+        """Binary search the term table; return (postings offset, doc freq)."""
+        key = term.encode('utf-8')
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            str_off, str_len, post_off, df = _TERM.unpack_from(self._mm, self._term_pos + _TERM.size * mid)
+            candidate = self._mm[str_off:str_off + str_len]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return post_off, df
+        return None
+
+    def _postings(self, offset: int, df: int) -> array:
+        """Read the flat (doc id, tf) pairs for one term."""
+        flat = array('I')
+        flat.frombytes(self._mm[offset:offset + 8 * df])
+        if sys.byteorder == 'big':
+            flat.byteswap()
+        return flat
+
+    def _doc(self, doc_id: int) -> Tuple[int, int]:
+        """Return (entry index, doc length) for a document id."""
+        return _DOC.unpack_from(self._mm, self._doc_pos + _DOC.size * doc_id)
+
+    def search(self, query: str, limit: int = 10, snippets: bool = True) -> List[FullTextHit]:
+        """Rank documents for query with BM25 and return the best hits."""
+        if not self._mm:
+            raise ValueError("Index not opened")
+
+        looked_up = []
+        for term in set(tokenize(query)):
+            found = self._lookup(term)
+            if found:
+                looked_up.append((term, found))
+
+        # Terms in more than half the documents score ~0 under BM25 but cost
+        # the most to walk; drop them unless nothing else is left
+        selective = [t for t in looked_up if t[1][1] <= self.doc_count // 2]
+        if selective:
+            looked_up = selective
+
+        scores: Dict[int, float] = defaultdict(float)
+        length_cache: Dict[int, int] = {}
+        for _, (offset, df) in looked_up:
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            flat = self._postings(offset, df)
+            for k in range(0, len(flat), 2):
+                doc_id, tf = flat[k], flat[k + 1]
+                dl = length_cache.get(doc_id)
+                if dl is None:
+                    dl = length_cache[doc_id] = self._doc(doc_id)[1]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * dl / (self.avg_length or 1))
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        terms = [term for term, _ in looked_up]
+        hits = []
+        for doc_id, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            entry_index = self._doc(doc_id)[0]
+            entry = self.reader.directory_entries[entry_index]
+            hit = FullTextHit(index=entry_index, entry=entry, score=score)
+            if snippets:
+                hit.snippet = make_snippet(self.reader.get_article_content(entry), terms)
+            hits.append(hit)
+        return hits
+
+
+def make_snippet(content: bytes, terms: List[str], width: int = 160) -> str:
+    """Return a window of article text around the first matching term."""
+    text = extract_text(content)
+    lowered = text.lower()
+    positions = [pos for pos in (lowered.find(term) for term in terms) if pos != -1]
+    if not positions:
+        return text[:width] + ("…" if len(text) > width else "")
+
+    start = max(0, min(positions) - width // 3)
+    end = min(len(text), start + width)
+    return ("…" if start > 0 else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+def default_fulltext_path(archive_path: str) -> str:
+    """Return the default sidecar path for an archive."""
+    return archive_path + FULLTEXT_INDEX_SUFFIX
+
+
+def open_fulltext_index(reader: ZIMReader) -> Optional[FullTextIndex]:
+    """Map the sidecar index for reader, or return None if there is none."""
+    index = FullTextIndex(reader)
+    return index if index.open() else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for building a full-text index."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a full-text index sidecar for a ZIM file")
+    parser.add_argument('archive', help="Path to the ZIM file")
+    parser.add_argument('-o', '--output', help="Sidecar path (default: <archive>.fulltext.idx)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    with ZIMReader(args.archive) as reader:
+        path = build_fulltext_index(reader, args.output, workers=args.workers)
+    print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,535 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Streaming import of a directory tree or a WARC file into a ZIM archive.
+
+A ZIMImporter packs incoming blobs into size-bounded clusters, one open
+cluster per codec chosen by a CodecPolicy. By default text, scripts and
+SVG are compressed and media that would not shrink is stored. Full
+clusters are encoded on a thread pool (zlib, lzma and zstd release the GIL) and streamed to the writer in order. At most a few
+clusters are in flight at once. The writer sorts the directory by
+spilling sorted runs to disk, so entry metadata does not accumulate in
+memory either.
+
+With a dictionary size, ZSTD clusters are held back until enough early
+content has been seen to train a dictionary on it. The dictionary is
+stored in the archive and primes every ZSTD cluster, so small clusters
+of boilerplate-heavy pages still compress well.
+
+import_directory() reads files on a thread pool. Read-ahead is bounded
+both in file count and in bytes, so memory stays flat whatever the size
+of the site. import_warc() reads records sequentially and turns HTTP 3xx
+responses into redirects.
+
+Command line:
+    python zimimport.py dir site/ site.zim --main-page index.html -M Language=eng
+    python zimimport.py warc crawl.warc.gz crawl.zim
+"""
+
+import datetime
+import gzip
+import html
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from urllib.parse import urljoin, urlsplit
+
+from zimlib import (ZIMWriter, Codec, CodecPolicy, CompressionType, Namespace, ZSTD_DICTIONARY_SIZE,
+                    encode_cluster)
+
+try:
+    import zstandard
+except ImportError:  # Only needed for ZSTD dictionaries
+    zstandard = None
+
+
+CLUSTER_SIZE = 1 << 20
+RUN_SIZE = 1 << 18
+READ_AHEAD_FILES = 256
+READ_AHEAD_BYTES = 64 << 20
+SNIFF_SIZE = 512
+DICTIONARY_SAMPLE_BYTES = 16 << 20
+TITLE_SCAN_SIZE = 64 << 10
+
+_TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title>', re.I | re.S)
+
+Path = Tuple[int, str]
+
+
+@dataclass
+class ImportResult:
+    """Summary of an import run."""
+    articles: int = 0
+    redirects: int = 0
+    clusters: int = 0
+    bytes: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def guess_mime_type(name: str, head: bytes = b'') -> str:
+    """Guess a MIME type from a file name, falling back to sniffing its first bytes."""
+    mime_type, _ = mimetypes.guess_type(name, strict=False)
+    if mime_type:
+        return mime_type
+    start = head.lstrip()[:16].lower()
+    if start.startswith((b'<!doctype html', b'<html')):
+        return 'text/html'
+    for magic, sniffed in ((b'\x89PNG', 'image/png'), (b'\xff\xd8\xff', 'image/jpeg'),
+                           (b'GIF8', 'image/gif'), (b'%PDF', 'application/pdf')):
+        if head.startswith(magic):
+            return sniffed
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError:
+        return 'application/octet-stream'
+    return 'text/plain'
+
+
+def html_title(content: bytes) -> Optional[str]:
+    """Extract the <title> of an HTML page, if any."""
+    match = _TITLE_RE.search(content, 0, TITLE_SCAN_SIZE)
+    if not match:
+        return None
+    title = html.unescape(match.group(1).decode('utf-8', 'replace'))
+    return ' '.join(title.split()) or None
+
+
+class _OpenCluster:
+    """Blobs and pending entries (namespace, url, title, MIME type) of a cluster still being filled."""
+
+    def __init__(self):
+        self.blobs: List[bytes] = []
+        self.entries: List[Tuple[int, str, str, str]] = []
+        self.size = 0
+
+
+class ZIMImporter:
+    """Packs content into clusters and streams them into a new archive."""
+
+    def __init__(self, output_path: str, cluster_size: int = CLUSTER_SIZE,
+                 compression: CompressionType = CompressionType.LZMA, workers: Optional[int] = None,
+                 run_size: int = RUN_SIZE, policy: Optional[CodecPolicy] = None,
+                 dictionary_size: int = 0):
+        """Create the output archive; call finish() to complete it.
+        
+        policy defaults to CodecPolicy(compression). A dictionary_size
+        trains a ZSTD dictionary of that size on the first
+        DICTIONARY_SAMPLE_BYTES of ZSTD-compressed content.
+        """
+        if dictionary_size and zstandard is None:
+            raise NotImplementedError("ZSTD dictionaries require the zstandard package")
+        self.cluster_size = cluster_size
+        self.policy = policy or CodecPolicy(compression)
+        self.workers = workers or os.cpu_count() or 1
+        self.result = ImportResult()
+        self.writer = ZIMWriter(output_path, sort_entries=True, run_size=run_size,
+                                temp_dir=os.path.dirname(os.path.abspath(output_path)))
+        self.writer.create()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._open: Dict[Codec, _OpenCluster] = {}
+        self._encoding: Deque[Future] = deque()
+        self._metadata: Set[str] = set()
+        self.dictionary_size = dictionary_size
+        self._held: Optional[List[Tuple[Codec, _OpenCluster]]] = [] if dictionary_size else None
+        self._held_bytes = 0
+
+    def add(self, namespace: int, url: str, title: str, content: bytes, mime_type: str) -> None:
+        """Add content."""
+        codec = self.policy.codec(namespace, mime_type)
+        cluster = self._open.setdefault(codec, _OpenCluster())
+        cluster.blobs.append(content)
+        cluster.entries.append((namespace, url, title, mime_type))
+        cluster.size += len(content)
+        self.result.articles += 1
+        self.result.bytes += len(content)
+        if namespace == Namespace.METADATA:
+            self._metadata.add(url)
+        if cluster.size >= self.cluster_size:
+            self._flush(codec)
+
+    def add_metadata(self, name: str, value: Union[str, bytes], mime_type: str = 'text/plain') -> None:
+        """Add an M/ entry (Title, Language, Illustration_48x48@1, ...) unless already present."""
+        if name in self._metadata:
+            return
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self.add(Namespace.METADATA, name, name, value, mime_type)
+
+    def add_redirect(self, namespace: int, url: str, title: str, target: Path) -> None:
+        """Add a redirect to (namespace, url); resolved when the import finishes."""
+        self.writer.add_redirect_to_path(namespace, url, title, _path_string(target))
+        self.result.redirects += 1
+
+    def _flush(self, codec: Codec) -> None:
+        """Hand an open cluster to the encoding pool, or hold it for dictionary training."""
+        cluster = self._open.pop(codec)
+        if self._held is not None and codec[0] == CompressionType.ZSTD:
+            self._held.append((codec, cluster))
+            self._held_bytes += cluster.size
+            if self._held_bytes >= DICTIONARY_SAMPLE_BYTES:
+                self._train()
+            return
+        self._submit(codec, cluster)
+
+    def _train(self) -> None:
+        """Train the dictionary on held clusters, then submit them."""
+        held, self._held = self._held, None
+        # The dictionary gets the next cluster number, so write pending ones first
+        while self._encoding:
+            self._write_next()
+        try:
+            self.writer.train_zstd_dictionary([blob for _, cluster in held for blob in cluster.blobs],
+                                              self.dictionary_size)
+        except zstandard.ZstdError:
+            pass  # Too little sample content; compress without a dictionary
+        for codec, cluster in held:
+            self._submit(codec, cluster)
+
+    def _submit(self, codec: Codec, cluster: _OpenCluster) -> None:
+        """Number a cluster, add its entries and queue it for encoding."""
+        # Clusters are written in submission order, so numbers are known now
+        cluster_number = len(self.writer.cluster_offsets) + len(self._encoding)
+        for blob_number, (namespace, url, title, mime_type) in enumerate(cluster.entries):
+            self.writer.add_entry(namespace, url, title, cluster_number, blob_number, mime_type)
+        self._encoding.append(self._executor.submit(encode_cluster, cluster.blobs, *codec,
+                                                    self.writer.zstd_dictionary))
+        while len(self._encoding) > 2 * self.workers:
+            self._write_next()
+
+    def _write_next(self) -> None:
+        """Write the oldest encoded cluster."""
+        self.writer.write_cluster(self._encoding.popleft().result())
+        self.result.clusters += 1
+
+    def finish(self, main_page: Optional[Path] = None) -> ImportResult:
+        """Write remaining clusters, resolve redirects and finalize the archive."""
+        for codec in list(self._open):
+            self._flush(codec)
+        if self._held is not None:
+            self._train()
+        while self._encoding:
+            self._write_next()
+        self._executor.shutdown()
+
+        writer = self.writer
+        if main_page:
+            writer.main_page_path = _path_string(main_page)
+        writer.finalize()
+        writer.close()
+        self.result.errors.extend(f"{path}: redirect target {target} not found"
+                                  for path, target in writer.unresolved_redirects)
+        return self.result
+
+    def abort(self) -> None:
+        """Stop encoding and close the incomplete output."""
+        self._executor.shutdown(cancel_futures=True)
+        self.writer.close()
+
+
+def _walk(root: str) -> Iterator[Tuple[str, int]]:
+    """Yield (relative path, size) of every regular file under root, sorted."""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        with os.scandir(os.path.join(root, relative)) as it:
+            children = sorted(it, key=lambda e: e.name)
+        for child in reversed([c for c in children if c.is_dir(follow_symlinks=False)]):
+            stack.append(posixpath.join(relative, child.name))
+        for child in children:
+            if child.is_file():
+                yield posixpath.join(relative, child.name), child.stat().st_size
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def read_files(root: str, files: Iterable[Tuple[str, int]], workers: int,
+               max_files: int = READ_AHEAD_FILES,
+               max_bytes: int = READ_AHEAD_BYTES) -> Iterator[Tuple[str, bytes]]:
+    """Read files on a thread pool, yielding (relative path, content) in order.
+
+    Reads run ahead of the consumer by at most max_files files and
+    max_bytes bytes (a single larger file is still read).
+    """
+    pending: Deque[Tuple[str, int, Future]] = deque()
+    in_flight = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for relative, size in files:
+                while pending and (len(pending) >= max_files or in_flight + size > max_bytes):
+                    name, done_size, future = pending.popleft()
+                    in_flight -= done_size
+                    yield name, future.result()
+                pending.append((relative, size, executor.submit(_read_file, os.path.join(root, relative))))
+                in_flight += size
+            while pending:
+                name, _, future = pending.popleft()
+                yield name, future.result()
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+
+
+def _is_namespaced(root: str) -> bool:
+    """Whether root looks like zimextract output: only single-letter namespace directories."""
+    names = [e.name for e in os.scandir(root)]
+    known = {chr(ns) for ns in Namespace}
+    return bool(names) and all(name in known and os.path.isdir(os.path.join(root, name)) for name in names)
+
+
+def _path_string(path: Path) -> str:
+    """Format (namespace, url) as an archive path."""
+    return f"{chr(path[0])}/{path[1]}"
+
+
+def _split_path(path: str, namespaced: bool) -> Path:
+    """Map a relative path (or "X/url" in namespaced mode) to (namespace, url)."""
+    if namespaced and len(path) > 2 and path[1] == '/':
+        return ord(path[0]), path[2:]
+    return Namespace.MAIN_ARTICLE, path
+
+
+def read_redirects(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Read a zimwriterfs-style redirects file: source TAB title TAB target per line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\r\n').split('\t')
+            if len(parts) == 3 and parts[0] and parts[2]:
+                yield parts[0], parts[1], parts[2]
+
+
+def _default_metadata(name: str) -> Dict[str, str]:
+    """Metadata every archive should carry."""
+    return {'Title': name, 'Date': datetime.date.today().isoformat()}
+
+
+def import_directory(root: str, output_path: str, main_page: Optional[str] = 'index.html',
+                     metadata: Optional[Dict[str, str]] = None, redirects: Optional[str] = None,
+                     workers: Optional[int] = None, cluster_size: int = CLUSTER_SIZE,
+                     compression: CompressionType = CompressionType.LZMA,
+                     policy: Optional[CodecPolicy] = None, dictionary_size: int = 0) -> ImportResult:
+    """Build a ZIM archive from every file under root.
+
+    Files go into the A/ namespace under their relative path, unless root
+    only holds namespace directories (e.g. zimextract output), in which
+    case those are kept. HTML titles come from <title>.
+    """
+    namespaced = _is_namespaced(root)
+    importer = ZIMImporter(output_path, cluster_size, compression, workers, policy=policy,
+                           dictionary_size=dictionary_size)
+    try:
+        for relative, content in read_files(root, _walk(root), importer.workers):
+            namespace, url = _split_path(relative, namespaced)
+            mime_type = guess_mime_type(url, content[:SNIFF_SIZE])
+            title = (html_title(content) if mime_type == 'text/html' else None) or url
+            importer.add(namespace, url, title, content, mime_type)
+
+        if redirects:
+            for source, title, target in read_redirects(redirects):
+                namespace, url = _split_path(source, namespaced)
+                importer.add_redirect(namespace, url, title or url, _split_path(target, namespaced))
+
+        name = os.path.basename(os.path.abspath(root))
+        for key, value in {**_default_metadata(name), **(metadata or {})}.items():
+            importer.add_metadata(key, value)
+    except BaseException:
+        importer.abort()
+        raise
+    return importer.finish(_split_path(main_page, namespaced) if main_page else None)
+
+
+def iter_warc_records(stream: BinaryIO) -> Iterator[Tuple[Dict[str, str], bytes]]:
+    """Yield (headers, block) for each record of an uncompressed WARC stream.
+
+    Header names are lower-cased.
+    """
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        if not line.strip():
+            continue
+        if not line.startswith(b'WARC/'):
+            raise ValueError(f"Not a WARC record: {line[:40]!r}")
+        headers: Dict[str, str] = {}
+        for line in iter(stream.readline, b''):
+            if not line.strip():
+                break
+            name, _, value = line.decode('utf-8', 'replace').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        block = stream.read(length)
+        if len(block) < length:
+            raise ValueError("Truncated WARC record")
+        yield headers, block
+
+
+def _dechunk(body: bytes) -> bytes:
+    """Decode an HTTP chunked transfer-encoded body."""
+    out, pos = [], 0
+    while pos < len(body):
+        end = body.find(b'\r\n', pos)
+        if end < 0:
+            break
+        size = int(body[pos:end].split(b';')[0] or b'0', 16)
+        if size == 0:
+            break
+        out.append(body[end + 2:end + 2 + size])
+        pos = end + 2 + size + 2
+    return b''.join(out)
+
+
+def parse_http_response(block: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    """Split an HTTP response into (status, lower-cased headers, decoded body)."""
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.decode('iso-8859-1').split('\r\n')
+    parts = lines[0].split(' ', 2)
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        body = _dechunk(body)
+    encoding = headers.get('content-encoding', '').lower()
+    if encoding in ('gzip', 'x-gzip'):
+        body = gzip.decompress(body)
+    elif encoding == 'deflate':
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:
+            body = zlib.decompress(body, -zlib.MAX_WBITS)
+    elif encoding not in ('', 'identity'):
+        raise ValueError(f"Unsupported content encoding {encoding}")
+    return status, headers, body
+
+
+def url_to_path(url: str) -> str:
+    """Map an absolute URL to an archive path: host/path[?query], index.html for directories."""
+    parts = urlsplit(url)
+    path = parts.netloc + (parts.path or '/')
+    if path.endswith('/'):
+        path += 'index.html'
+    return path + ('?' + parts.query if parts.query else '')
+
+
+def import_warc(path: str, output_path: str, main_page: Optional[str] = None,
+                metadata: Optional[Dict[str, str]] = None, workers: Optional[int] = None,
+                cluster_size: int = CLUSTER_SIZE,
+                compression: CompressionType = CompressionType.LZMA,
+                policy: Optional[CodecPolicy] = None, dictionary_size: int = 0) -> ImportResult:
+    """Build a ZIM archive from the responses and resources of a WARC file.
+
+    Every URL lands in A/ as host/path. The first capture of a URL wins.
+    3xx responses with a Location become redirects. main_page is a URL
+    and defaults to the first HTML capture.
+    """
+    importer = ZIMImporter(output_path, cluster_size, compression, workers, policy=policy,
+                           dictionary_size=dictionary_size)
+    seen = set()
+    first_page: Optional[str] = None
+    try:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as stream:
+            for headers, block in iter_warc_records(stream):
+                kind, uri = headers.get('warc-type'), headers.get('warc-target-uri', '').strip('<>')
+                if kind not in ('response', 'resource') or not uri:
+                    continue
+                target = url_to_path(uri)
+                if target in seen:
+                    continue
+                try:
+                    if kind == 'resource':
+                        status, http_headers, body = 200, {'content-type': headers.get('content-type', '')}, block
+                    else:
+                        status, http_headers, body = parse_http_response(block)
+                except (ValueError, OSError, EOFError, zlib.error) as e:
+                    importer.result.errors.append(f"{uri}: {e}")
+                    continue
+
+                if 300 <= status < 400 and http_headers.get('location'):
+                    seen.add(target)
+                    location = url_to_path(urljoin(uri, http_headers['location']))
+                    importer.add_redirect(Namespace.MAIN_ARTICLE, target, target,
+                                          (Namespace.MAIN_ARTICLE, location))
+                    continue
+                if status != 200:
+                    continue
+                seen.add(target)
+                mime_type = http_headers.get('content-type', '').split(';')[0].strip().lower() \
+                    or guess_mime_type(target, body[:SNIFF_SIZE])
+                title = (html_title(body) if mime_type == 'text/html' else None) or target
+                importer.add(Namespace.MAIN_ARTICLE, target, title, body, mime_type)
+                if first_page is None and mime_type == 'text/html':
+                    first_page = target
+
+        name = os.path.basename(path).split('.')[0]
+        for key, value in {**_default_metadata(name), **(metadata or {})}.items():
+            importer.add_metadata(key, value)
+    except BaseException:
+        importer.abort()
+        raise
+    page = url_to_path(main_page) if main_page else first_page
+    return importer.finish((Namespace.MAIN_ARTICLE, page) if page else None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for directory and WARC imports."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a ZIM archive from a directory tree or WARC file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('dir', "Import a directory tree"), ('warc', "Import a WARC (.warc or .warc.gz)")):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument('source')
+        sub.add_argument('output')
+        sub.add_argument('--main-page', help="Main page path (dir) or URL (warc)")
+        sub.add_argument('-M', '--metadata', action='append', default=[], metavar='KEY=VALUE',
+                         help="Metadata entry such as Title=..., Language=eng (repeatable)")
+        sub.add_argument('-j', '--workers', type=int, help="Reader and compression threads")
+        sub.add_argument('--cluster-size', type=int, default=CLUSTER_SIZE, help="Target cluster size in bytes")
+        sub.add_argument('--compression', choices=['lzma', 'zstd', 'zlib', 'none'], default='lzma',
+                         help="Codec for compressible content; media is always stored")
+        sub.add_argument('--level', type=int, help="Compression level or LZMA preset")
+        sub.add_argument('--dictionary', action='store_true',
+                         help="Train a ZSTD dictionary on early content (with --compression zstd)")
+        if name == 'dir':
+            sub.add_argument('--redirects', help="TSV file of source, title, target")
+    args = parser.parse_args(argv)
+
+    metadata = dict(item.split('=', 1) for item in args.metadata if '=' in item)
+    compression = {'lzma': CompressionType.LZMA, 'zstd': CompressionType.ZSTD,
+                   'zlib': CompressionType.ZLIB, 'none': CompressionType.NONE}[args.compression]
+    policy = CodecPolicy(compression, args.level)
+    dictionary_size = ZSTD_DICTIONARY_SIZE if args.dictionary else 0
+    if args.command == 'dir':
+        result = import_directory(args.source, args.output, args.main_page or 'index.html', metadata,
+                                  args.redirects, args.workers, args.cluster_size, compression, policy,
+                                  dictionary_size)
+    else:
+        result = import_warc(args.source, args.output, args.main_page, metadata,
+                             args.workers, args.cluster_size, compression, policy, dictionary_size)
+
+    print(f"Imported {result.articles:,} entries ({result.bytes:,} bytes) in {result.clusters:,} clusters, "
+          f"{result.redirects:,} redirects")
+    for error in result.errors[:20]:
+        print(f"  {error}", file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,10 +12,35 @@ Supports reading and writing ZIM archives for offline content storage.
 import struct
 import zlib
 import lzma
-from typing import Optional, Dict, List, Tuple, Union, BinaryIO
-from dataclasses import dataclass
+import mmap
+import hashlib
+import heapq
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from typing import Optional, Deque, Dict, List, Tuple, Union, BinaryIO, Iterable, Iterator, Set
+from dataclasses import dataclass, field
 from enum import IntEnum
 import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import numpy as np
+except ImportError:  # numpy only speeds up directory parsing
+    np = None
+
+try:
+    import zstandard
+except ImportError:  # ZSTD clusters need the zstandard package
+    zstandard = None
 
 
 class CompressionType(IntEnum):
@@ -28,6 +53,82 @@ class CompressionType(IntEnum):
     ZSTD = 5
 
 
+# Content worth compressing; everything else (JPEG, PNG, WebP, video,
+# audio, fonts, archives) is already compressed and is stored as is
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml',
+                      'application/xhtml+xml', 'application/x-javascript', 'image/svg+xml')
+
+# A cluster codec: compression type and level (None for the codec's default)
+Codec = Tuple[CompressionType, Optional[int]]
+
+STORED: Codec = (CompressionType.NONE, None)
+
+# Metadata entry holding a trained ZSTD dictionary, and its default size
+ZSTD_DICTIONARY_PATH = 'M/ZstdDictionary'
+ZSTD_DICTIONARY_SIZE = 112640
+
+# Errors a damaged or unsupported cluster can raise while being read
+CLUSTER_READ_ERRORS = (OSError, ValueError, NotImplementedError, struct.error, zlib.error, lzma.LZMAError) + \
+    ((zstandard.ZstdError,) if zstandard is not None else ())
+
+_zstd_local = threading.local()
+
+
+def is_compressible(mime_type: str) -> bool:
+    """Whether content of a MIME type is worth compressing."""
+    return mime_type.startswith(COMPRESSIBLE_TYPES)
+
+
+@dataclass
+class CodecPolicy:
+    """Chooses the cluster codec for content by namespace and MIME type.
+    
+    Namespace overrides win, then MIME type prefixes in insertion order.
+    Otherwise compressible types get (compression, level) and everything
+    else is stored uncompressed, so media reads go straight to disk.
+    """
+    compression: CompressionType = CompressionType.LZMA
+    level: Optional[int] = None
+    namespaces: Dict[int, Codec] = field(default_factory=dict)
+    mime_types: Dict[str, Codec] = field(default_factory=dict)
+    
+    def codec(self, namespace: int, mime_type: str) -> Codec:
+        """Codec for content of a MIME type in a namespace."""
+        if namespace in self.namespaces:
+            return self.namespaces[namespace]
+        for prefix, codec in self.mime_types.items():
+            if mime_type.startswith(prefix):
+                return codec
+        if self.compression in (CompressionType.NONE, CompressionType.DEFAULT) \
+                or not is_compressible(mime_type):
+            return STORED
+        return self.compression, self.level
+
+
+class AccessPattern(IntEnum):
+    """Expected access pattern of a reader, passed to posix_fadvise."""
+    NORMAL = 0
+    SEQUENTIAL = 1
+    RANDOM = 2
+
+
+_FADVISE = {
+    AccessPattern.NORMAL: getattr(os, 'POSIX_FADV_NORMAL', None),
+    AccessPattern.SEQUENTIAL: getattr(os, 'POSIX_FADV_SEQUENTIAL', None),
+    AccessPattern.RANDOM: getattr(os, 'POSIX_FADV_RANDOM', None),
+}
+
+
+def _fadvise(fd: int, offset: int, length: int, advice: Optional[int]) -> None:
+    """posix_fadvise where supported; hints never raise."""
+    if advice is None or not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        pass
+
+
 class Namespace(IntEnum):
     """ZIM namespace identifiers."""
     MAIN_ARTICLE = ord('A')
@@ -59,21 +160,22 @@ class ZIMHeader:
     main_page_index: int  # 4 bytes
     layout_page_index: int  # 4 bytes
     checksum_pos: int  # 8 bytes
+    url_ptr_pos: int = 0  # 8 bytes (0: pointer list follows the header)
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'ZIMHeader':
         """Parse header from binary data."""
-        values = struct.unpack('<IHHIIIIIIIIIIIQQQ', data[:80])
+        values = struct.unpack('<IHHIIIIQQQQIIQQ', data[:80])
         return cls(*values)
     
     def to_bytes(self) -> bytes:
         """Serialize header to binary data."""
-        return struct.pack('<IHHIIIIIIIIIIIQQQ', *(
+        return struct.pack('<IHHIIIIQQQQIIQQ', *(
             self.magic_number, self.major_version, self.minor_version,
             self.entry_count, self.article_count, self.cluster_count,
             self.redirect_count, self.mime_type_list_pos, self.title_index_pos,
             self.cluster_ptr_pos, self.cluster_count_pos, self.main_page_index,
-            self.layout_page_index, self.checksum_pos
+            self.layout_page_index, self.checksum_pos, self.url_ptr_pos
         ))
 
 
@@ -161,33 +263,894 @@ class RedirectEntry:
         title = data[pos:title_end].decode('utf-8') if title_end != -1 else data[pos:].decode('utf-8')
         
         return cls(mimetype_index, namespace, revision, redirect_index, url, title)
+    
+    def to_bytes(self) -> bytes:
+        """Serialize redirect entry to binary data."""
+        url_bytes = self.url.encode('utf-8') + b'\x00'
+        title_bytes = self.title.encode('utf-8') + b'\x00'
+        
+        return (struct.pack('<IBII', self.mimetype_index, self.namespace,
+                           self.revision, self.redirect_index) +
+                url_bytes + title_bytes)
+
+
+# Minor version marking a directory sorted by namespace and URL, with a
+# title pointer list at title_index_pos
+SORTED_MINOR_VERSION = 1
+
+
+def archive_stamp(archive_path: str) -> Tuple[int, int]:
+    """Return (size, mtime) used to detect a stale sidecar."""
+    st = os.stat(archive_path)
+    return st.st_size, int(st.st_mtime)
+
+
+def _decode_offsets(raw: bytes) -> array:
+    """Decode a little-endian u64 pointer list."""
+    offsets = array('Q')
+    offsets.frombytes(raw[:len(raw) - len(raw) % 8])
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets
+
+
+class ParsedDirectory(Sequence):
+    """Directory entries decoded in bulk into columns.
+    
+    Behaves like the list of entries, building entry objects on access.
+    Strings stay in the raw directory buffer: URL bytes run from
+    starts[i] to url_ends[i] and the title from there to title_ends[i].
+    Entries fetched by index are kept in a bounded LRU cache; entries
+    built while iterating or slicing are not, so a full pass does not
+    keep every entry alive.
+    """
+    
+    # Most entry objects kept for index access
+    ENTRY_CACHE_SIZE = 1 << 16
+    
+    def __init__(self, data: bytes, mimetypes: Sequence, namespaces: Sequence, revisions: Sequence,
+                 targets: Sequence, blobs: Sequence, starts: Sequence, url_ends: Sequence,
+                 title_ends: Sequence):
+        self.data = data
+        self.mimetypes = mimetypes
+        self.namespaces = namespaces
+        self.revisions = revisions
+        self.targets = targets
+        self.blobs = blobs
+        self.starts = starts
+        self.url_ends = url_ends
+        self.title_ends = title_ends
+        self.count = len(mimetypes)
+        self._entries: 'OrderedDict[int, Union[DirectoryEntry, RedirectEntry]]' = OrderedDict()
+        self._index: Optional[Dict[bytes, int]] = None
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _build(self, index: int) -> Union['DirectoryEntry', 'RedirectEntry']:
+        """Build one entry from the columns."""
+        url_end = self.url_ends[index]
+        url = self.data[self.starts[index]:url_end].decode('utf-8')
+        title = self.data[url_end + 1:self.title_ends[index]].decode('utf-8')
+        mimetype = self.mimetypes[index]
+        if mimetype == 0xFFFF:
+            return RedirectEntry(mimetype, self.namespaces[index], self.revisions[index],
+                                 self.targets[index], url, title)
+        return DirectoryEntry(mimetype, self.namespaces[index], self.revisions[index],
+                              self.targets[index], self.blobs[index], url, title)
+    
+    def _entry(self, index: int) -> Union['DirectoryEntry', 'RedirectEntry']:
+        """Get one entry through the LRU cache."""
+        entries = self._entries
+        entry = entries.get(index)
+        if entry is not None:
+            entries.move_to_end(index)
+            return entry
+        entry = entries[index] = self._build(index)
+        if len(entries) > self.ENTRY_CACHE_SIZE:
+            entries.popitem(last=False)
+        return entry
+    
+    def _peek(self, index: int) -> Union['DirectoryEntry', 'RedirectEntry']:
+        """Get one entry without adding it to the cache."""
+        entry = self._entries.get(index)
+        return entry if entry is not None else self._build(index)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._peek(i) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("directory index out of range")
+        return self._entry(index)
+    
+    def __iter__(self):
+        for index in range(self.count):
+            yield self._peek(index)
+    
+    def find(self, namespace: int, url: str) -> Optional[int]:
+        """Look up an entry by namespace and URL, indexing raw keys on first use."""
+        if self._index is None:
+            data, index = self.data, {}
+            for i, (ns, start, url_end) in enumerate(zip(self.namespaces, self.starts, self.url_ends)):
+                index.setdefault(bytes((ns,)) + data[start:url_end], i)
+            self._index = index
+        return self._index.get(bytes((namespace,)) + url.encode('utf-8'))
+
+
+def parse_directory(data: bytes, pointers: Sequence, base: int = 0) -> ParsedDirectory:
+    """Parse the entries at pointers from a buffer holding the directory.
+    
+    data starts at file offset base. Uses numpy when available and a
+    struct/bytes.find loop otherwise; both give identical results.
+    """
+    # Guarantee a terminator for every string and room for a blob field
+    data = bytes(data) + b'\x00' * 8
+    if np is not None:
+        return _parse_directory_numpy(data, pointers, base)
+    return _parse_directory_python(data, pointers, base)
+
+
+def _parse_directory_python(data: bytes, pointers: Sequence, base: int) -> ParsedDirectory:
+    """Stdlib directory parser."""
+    unpack_fixed = struct.Struct('<IBIII').unpack_from
+    find = data.find
+    columns = [array('I'), array('B'), array('I'), array('I'), array('I'),
+               array('Q'), array('Q'), array('Q')]
+    appends = [column.append for column in columns]
+    add_mimetype, add_namespace, add_revision, add_target, add_blob, add_start, add_url_end, add_title_end = appends
+    for ptr in pointers:
+        pos = ptr - base
+        mimetype, namespace, revision, target, blob = unpack_fixed(data, pos)
+        if mimetype == 0xFFFF:
+            start, blob = pos + 13, 0
+        else:
+            start = pos + 17
+        url_end = find(b'\x00', start)
+        add_mimetype(mimetype)
+        add_namespace(namespace)
+        add_revision(revision)
+        add_target(target)
+        add_blob(blob)
+        add_start(start)
+        add_url_end(url_end)
+        add_title_end(find(b'\x00', url_end + 1))
+    return ParsedDirectory(data, *columns)
+
+
+# Fixed-width head of a directory entry; redirects end after 'target'
+_ENTRY_FIELDS = np.dtype([('mimetype', '<u4'), ('namespace', 'u1'), ('revision', '<u4'),
+                          ('target', '<u4'), ('blob', '<u4')]) if np is not None else None
+
+
+def _parse_directory_numpy(data: bytes, pointers: Sequence, base: int) -> ParsedDirectory:
+    """Vectorized directory parser: fields gathered and terminators found in bulk."""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if isinstance(pointers, array) and pointers.typecode == 'Q':
+        pos = np.frombuffer(pointers, dtype=np.uint64).astype(np.int64)
+    else:
+        pos = np.asarray(pointers, dtype=np.int64)
+    pos -= base
+    
+    # View the buffer as packed fixed-width headers starting at every byte
+    # and gather the rows at the entry offsets
+    headers = np.ndarray(shape=(len(data) - _ENTRY_FIELDS.itemsize + 1,), dtype=_ENTRY_FIELDS,
+                         buffer=data, strides=(1,))[pos]
+    redirect = headers['mimetype'] == 0xFFFF
+    
+    # Each URL ends at the first NUL after its start, the title at the next one
+    zeros = np.flatnonzero(buf == 0)
+    starts = pos + np.where(redirect, 13, 17)
+    url_ends = zeros[np.searchsorted(zeros, starts)]
+    title_ends = zeros[np.searchsorted(zeros, url_ends + 1)]
+    
+    def column(values, typecode: str, dtype) -> array:
+        result = array(typecode)
+        result.frombytes(values.astype(dtype).tobytes())
+        return result
+    
+    return ParsedDirectory(data,
+                           column(headers['mimetype'], 'I', np.uintc),
+                           column(headers['namespace'], 'B', np.uint8),
+                           column(headers['revision'], 'I', np.uintc),
+                           column(headers['target'], 'I', np.uintc),
+                           column(np.where(redirect, 0, headers['blob']), 'I', np.uintc),
+                           column(starts, 'Q', np.ulonglong),
+                           column(url_ends, 'Q', np.ulonglong),
+                           column(title_ends, 'Q', np.ulonglong))
+
+
+SNAPSHOT_MAGIC = b'ZDIR'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.dir.snap'
+# magic, version, size, mtime, header digest, entry count, arena size
+SNAPSHOT_HEADER = struct.Struct('<4sIQQ16sIQ')
+
+
+def _snapshot_digest(header: 'ZIMHeader') -> bytes:
+    """Digest of an archive header, stored in its directory snapshot."""
+    return hashlib.blake2b(header.to_bytes(), digest_size=16).digest()
+
+
+class _UrlKeys:
+    """Sorted (namespace, url) keys of a snapshot, for bisect."""
+    
+    def __init__(self, snapshot: 'DirectorySnapshot'):
+        self.snapshot = snapshot
+    
+    def __len__(self) -> int:
+        return len(self.snapshot)
+    
+    def __getitem__(self, position: int) -> bytes:
+        return self.snapshot._key(self.snapshot.lookup[position])
+
+
+class DirectorySnapshot(Sequence):
+    """Directory entries served from a memory-mapped snapshot file.
+    
+    Behaves like the list of entries a parsed reader holds, decoding each
+    entry on access. Layout after the header, each section 8-byte aligned:
+    mimetype u32[n], namespace u8[n], revision u32[n], cluster number or
+    redirect index u32[n], blob number u32[n], url length u32[n], string
+    offsets u64[n+1] into an arena of "url NUL title" records, then the
+    entry indices sorted by (namespace, url) as u32[n]. Columns are in
+    native byte order: a snapshot is a host-local cache, not an archive.
+    """
+    
+    def __init__(self, path: str):
+        """Map a snapshot file; call close() to release it."""
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, self.size, self.mtime, self.digest,
+             count, arena_size) = SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError("Not a directory snapshot")
+            
+            view = memoryview(self._mmap)
+            self._views = [view]
+            pos = SNAPSHOT_HEADER.size
+            
+            def section(fmt: str, length: int, itemsize: int) -> memoryview:
+                nonlocal pos
+                pos = (pos + 7) & ~7
+                if pos + length * itemsize > len(self._mmap):
+                    raise ValueError("Truncated directory snapshot")
+                part = view[pos:pos + length * itemsize].cast(fmt)
+                self._views.append(part)
+                pos += length * itemsize
+                return part
+            
+            self.count = count
+            self.mimetypes = section('I', count, 4)
+            self.namespaces = section('B', count, 1)
+            self.revisions = section('I', count, 4)
+            self.targets = section('I', count, 4)
+            self.blobs = section('I', count, 4)
+            self.url_lengths = section('I', count, 4)
+            self.offsets = section('Q', count + 1, 8)
+            self.arena = section('B', arena_size, 1)
+            self.lookup = section('I', count, 4)
+            if self.offsets[count] != arena_size:
+                raise ValueError("Corrupt directory snapshot")
+        except Exception:
+            self.close()
+            raise
+    
+    def close(self) -> None:
+        """Release the mapping."""
+        for part in reversed(getattr(self, '_views', [])):
+            part.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _entry(self, index: int) -> Union['DirectoryEntry', 'RedirectEntry']:
+        """Decode one entry from the columns."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        url_end = start + self.url_lengths[index]
+        url = bytes(self.arena[start:url_end]).decode('utf-8')
+        title = bytes(self.arena[url_end + 1:end]).decode('utf-8')
+        mimetype = self.mimetypes[index]
+        if mimetype == 0xFFFF:
+            return RedirectEntry(mimetype, self.namespaces[index], self.revisions[index],
+                                 self.targets[index], url, title)
+        return DirectoryEntry(mimetype, self.namespaces[index], self.revisions[index],
+                              self.targets[index], self.blobs[index], url, title)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(i) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("directory index out of range")
+        return self._entry(index)
+    
+    def __iter__(self):
+        for index in range(self.count):
+            yield self._entry(index)
+    
+    def _key(self, index: int) -> bytes:
+        """Sort key of an entry: namespace byte followed by the URL."""
+        start = self.offsets[index]
+        return bytes((self.namespaces[index],)) + bytes(self.arena[start:start + self.url_lengths[index]])
+    
+    def find(self, namespace: int, url: str) -> Optional[int]:
+        """Binary-search the lookup index for an entry."""
+        key = bytes((namespace,)) + url.encode('utf-8')
+        position = bisect_left(_UrlKeys(self), key)
+        if position < self.count:
+            index = self.lookup[position]
+            if self._key(index) == key:
+                return index
+        return None
+
+
+def write_snapshot(path: str, stamp: Tuple[int, int], digest: bytes,
+                   entries: Sequence) -> None:
+    """Write a directory snapshot for entries to path."""
+    count = len(entries)
+    mimetypes, revisions, targets, blobs, url_lengths = (array('I') for _ in range(5))
+    namespaces = array('B')
+    offsets = array('Q', [0])
+    arena = bytearray()
+    keys = []
+    
+    for entry in entries:
+        url = entry.url.encode('utf-8')
+        mimetypes.append(entry.mimetype_index)
+        namespaces.append(entry.namespace)
+        revisions.append(entry.revision)
+        if isinstance(entry, RedirectEntry):
+            targets.append(entry.redirect_index)
+            blobs.append(0)
+        else:
+            targets.append(entry.cluster_number)
+            blobs.append(entry.blob_number)
+        url_lengths.append(len(url))
+        arena += url + b'\x00' + entry.title.encode('utf-8')
+        offsets.append(len(arena))
+        keys.append(bytes((entry.namespace,)) + url)
+    
+    lookup = array('I', sorted(range(count), key=keys.__getitem__))
+    
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, stamp[0], stamp[1],
+                                     digest, count, len(arena)))
+        for part in (mimetypes, namespaces, revisions, targets, blobs, url_lengths,
+                     offsets, arena, lookup):
+            f.write(b'\x00' * (-f.tell() % 8))
+            f.write(part if isinstance(part, bytearray) else part.tobytes())
+    os.replace(tmp_path, path)
+
+
+def _zstd_compressor(level: Optional[int], dictionary: Optional[bytes]) -> 'zstandard.ZstdCompressor':
+    """Per-thread ZSTD compressor, so a dictionary is digested once per thread."""
+    if zstandard is None:
+        raise NotImplementedError("ZSTD compression requires the zstandard package")
+    cache = _zstd_local.__dict__.setdefault('compressors', {})
+    key = (level, dictionary)
+    if key not in cache:
+        if len(cache) >= 4:
+            cache.clear()
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        cache[key] = zstandard.ZstdCompressor(level=3 if level is None else level, dict_data=dict_data)
+    return cache[key]
+
+
+def encode_cluster(blobs: List[bytes], compression: CompressionType, level: Optional[int] = None,
+                   dictionary: Optional[bytes] = None) -> bytes:
+    """Encode blobs as a cluster: compression byte, offset table, data.
+    
+    level is the zlib level, LZMA preset or ZSTD level; None uses the
+    codec's default. dictionary primes ZSTD compression.
+    """
+    # Calculate blob offsets, relative to the start of the offset table
+    current_offset = 4 * (len(blobs) + 1)
+    offsets = [current_offset]
+    for blob in blobs:
+        current_offset += len(blob)
+        offsets.append(current_offset)
+    
+    # Offset table followed by blob data
+    payload = struct.pack(f'<{len(offsets)}I', *offsets) + b''.join(blobs)
+    
+    # Compression covers the whole payload so blobs share one stream
+    if compression == CompressionType.ZLIB:
+        payload = zlib.compress(payload, -1 if level is None else level)
+    elif compression == CompressionType.LZMA:
+        payload = lzma.compress(payload, preset=level)
+    elif compression == CompressionType.ZSTD:
+        payload = _zstd_compressor(level, dictionary).compress(payload)
+    elif compression not in (CompressionType.DEFAULT, CompressionType.NONE):
+        raise NotImplementedError(f"Compression type {compression} not supported")
+    
+    return bytes([compression]) + payload
+
+
+class _Prefetcher:
+    """Background thread that pulls byte ranges of a file into the page cache.
+    
+    Uses its own file handle, so it never moves the reader's position.
+    Ranges are hinted with WILLNEED and then read into a scratch buffer,
+    which also warms the cache on filesystems that ignore the hint.
+    """
+    
+    CHUNK_SIZE = 1 << 20
+    
+    def __init__(self, path: str):
+        self.file = open(path, 'rb', buffering=0)
+        self.queue: 'queue.Queue[Optional[Tuple[int, int]]]' = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='zim-prefetch', daemon=True)
+        self.thread.start()
+    
+    def submit(self, offset: int, length: int) -> None:
+        """Queue a range for prefetching."""
+        if length > 0:
+            self.queue.put((offset, length))
+    
+    def _run(self) -> None:
+        buffer = memoryview(bytearray(self.CHUNK_SIZE))
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            offset, length = item
+            _fadvise(self.file.fileno(), offset, length, getattr(os, 'POSIX_FADV_WILLNEED', None))
+            self.file.seek(offset)
+            while length > 0:
+                got = self.file.readinto(buffer[:min(length, self.CHUNK_SIZE)])
+                if not got:
+                    break
+                length -= got
+    
+    def close(self) -> None:
+        """Stop the thread, abandoning queued ranges."""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+# Upper bounds, in seconds, of the buckets of timing histograms
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+_CODEC_NAMES = {t.value: t.name.lower() for t in CompressionType}
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds."""
+    
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+    
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        """Record one duration."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+    
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations at or below it) per bucket, ending with +inf."""
+        result = []
+        running = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+class ReaderStats:
+    """Hot-path counters of a ZIMReader, cheap enough to leave on.
+    
+    Counters are plain integers. Timings are sampled: one in sample_every
+    decompressions (per codec) and lookups is timed into a histogram, so
+    histogram counts are sample counts. Updates are not locked: when a
+    reader is shared between threads, as the REST API's single reader
+    is, racing increments can occasionally be lost. The counts are for
+    monitoring, not accounting.
+    """
+    
+    def __init__(self, sample_every: int = 16):
+        self.sample_every = sample_every
+        self.read_calls = 0
+        self.bytes_read = 0
+        self.clusters_decompressed: Dict[str, int] = {}
+        self.decompress_seconds: Dict[str, Histogram] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
+        self.lookups = 0
+        self.lookup_seconds = Histogram()
+
+
+@dataclass
+class MemoryReport:
+    """Approximate heap bytes held by a reader, by structure.
+    
+    directory: entry columns and built entry objects. strings: the raw
+    directory buffer and decoded URLs and titles. caches: decompressed
+    clusters and ZSTD state. indexes: path lookup table, redirect table
+    and cluster pointers. other: MIME types and header. mapped is the
+    size of a snapshot mapping, which is page cache rather than heap.
+    """
+    directory: int = 0
+    strings: int = 0
+    caches: int = 0
+    indexes: int = 0
+    other: int = 0
+    mapped: int = 0
+    entries: int = 0  # Entry objects built so far
+    
+    @property
+    def total(self) -> int:
+        """Heap bytes over all structures, excluding mapped."""
+        return self.directory + self.strings + self.caches + self.indexes + self.other
+
+
+_INSTANCE_SIZES: Dict[type, int] = {}
+
+
+def _instance_size(obj: object) -> int:
+    """Size of an object with its attribute dict, measured once per class.
+    
+    Measured on a copy: reading __dict__ would allocate one on instances
+    that keep their attributes inline.
+    """
+    cls = type(obj)
+    size = _INSTANCE_SIZES.get(cls)
+    if size is None:
+        probe = cls(**vars(obj)) if hasattr(obj, '__dataclass_fields__') else obj
+        size = _INSTANCE_SIZES[cls] = sys.getsizeof(probe) + sys.getsizeof(getattr(probe, '__dict__', None) or {})
+    return size
+
+
+def _container_size(items) -> int:
+    """Size of a list or dict and of its items, not counting what they refer to."""
+    if isinstance(items, dict):
+        return sys.getsizeof(items) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in items.items())
+    return sys.getsizeof(items) + sum(sys.getsizeof(item) for item in items)
+
+
+class PhaseTrace:
+    """Durations of named phases within one request or job.
+    
+    While a trace is active in the current context (see tracing()),
+    readers add the time spent in lookups ('lookup'), file seeks and
+    reads ('read') and decompression ('decompress'); callers add their
+    own phases with trace_phase().
+    """
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+    
+    def elapsed(self) -> float:
+        """Seconds since the trace started."""
+        return time.perf_counter() - self.started
+    
+    def add(self, phase: str, seconds: float) -> None:
+        """Add time spent in a phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+
+
+_trace: ContextVar[Optional[PhaseTrace]] = ContextVar('zim_trace', default=None)
+
+# Traces active in any context; hot paths skip the ContextVar lookup at zero
+_active_traces = 0
+_active_traces_lock = threading.Lock()
+
+
+def current_trace() -> Optional[PhaseTrace]:
+    """The trace active in the current context, if any."""
+    return _trace.get()
+
+
+@contextmanager
+def tracing() -> Iterator[PhaseTrace]:
+    """Record reader phases in a new trace for the duration of the block.
+    
+    The trace follows the context into tasks and threads started from it.
+    """
+    global _active_traces
+    trace = PhaseTrace()
+    token = _trace.set(trace)
+    with _active_traces_lock:
+        _active_traces += 1
+    try:
+        yield trace
+    finally:
+        with _active_traces_lock:
+            _active_traces -= 1
+        _trace.reset(token)
+
+
+@contextmanager
+def trace_phase(phase: str) -> Iterator[None]:
+    """Time the block as a phase of the active trace, if any."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(phase, time.perf_counter() - start)
+
+
+class _CountingFile:
+    """Read-only file wrapper that counts read calls and bytes into a ReaderStats.
+    
+    Seeks and reads are timed only while a trace is active. read_at()
+    reads at an offset without seeking, with pread() where available.
+    """
+    
+    def __init__(self, file: BinaryIO, stats: ReaderStats):
+        self._file = file
+        self._fd = file.fileno()
+        self.stats = stats
+        self.tell = file.tell
+        self.fileno = file.fileno
+        self.close = file.close
+    
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if not _active_traces:
+            return self._file.seek(offset, whence)
+        trace = _trace.get()
+        start = time.perf_counter()
+        position = self._file.seek(offset, whence)
+        if trace is not None:
+            trace.add('read', time.perf_counter() - start)
+        return position
+    
+    def read(self, size: int = -1) -> bytes:
+        if not _active_traces:
+            data = self._file.read(size)
+        else:
+            trace = _trace.get()
+            start = time.perf_counter()
+            data = self._file.read(size)
+            if trace is not None:
+                trace.add('read', time.perf_counter() - start)
+        stats = self.stats
+        stats.read_calls += 1
+        stats.bytes_read += len(data)
+        return data
+    
+    def read_at(self, offset: int, size: int) -> bytes:
+        if not hasattr(os, 'pread'):
+            self.seek(offset)
+            return self.read(size)
+        if not _active_traces:
+            data = os.pread(self._fd, size, offset)
+        else:
+            trace = _trace.get()
+            start = time.perf_counter()
+            data = os.pread(self._fd, size, offset)
+            if trace is not None:
+                trace.add('read', time.perf_counter() - start)
+        stats = self.stats
+        stats.read_calls += 1
+        stats.bytes_read += len(data)
+        return data
+    
+    def readinto(self, buffer) -> int:
+        trace = _trace.get() if _active_traces else None
+        start = time.perf_counter() if trace is not None else 0.0
+        n = self._file.readinto(buffer)
+        if trace is not None:
+            trace.add('read', time.perf_counter() - start)
+        self.stats.read_calls += 1
+        self.stats.bytes_read += n or 0
+        return n
+    
+    def __getattr__(self, name):
+        return getattr(self._file, name)
 
 
 class ZIMReader:
     """Clean-room ZIM file reader."""
     
-    def __init__(self, file_path: str):
-        """Initialize ZIM reader with file path."""
+    # Default bound on decompressed bytes held by iter_contents
+    ITER_BUDGET = 64 << 20
+    # Assumed expansion of compressed clusters that do not record their size
+    ITER_EXPANSION = 10
+    
+    def __init__(self, file_path: str, snapshot_dir: Optional[str] = None, cluster_cache: int = 0,
+                 stats: Optional[ReaderStats] = None):
+        """Initialize ZIM reader with file path.
+        
+        Directory snapshots live next to the archive unless snapshot_dir
+        is given. cluster_cache keeps that many decompressed clusters in
+        an LRU cache. Reads, decompressions and lookups are counted in
+        stats, which may be shared to keep totals across reopens.
+        """
         self.file_path = file_path
+        self.snapshot_dir = snapshot_dir
+        self.stats = stats or ReaderStats()
+        self.cluster_cache_size = cluster_cache
+        self._cluster_cache: 'OrderedDict[int, bytes]' = OrderedDict()
         self.file: Optional[BinaryIO] = None
         self.header: Optional[ZIMHeader] = None
         self.mime_types: List[str] = []
-        self.directory_entries: List[Union[DirectoryEntry, RedirectEntry]] = []
+        self.directory_entries: Union[List[Union[DirectoryEntry, RedirectEntry]], ParsedDirectory, DirectorySnapshot] = []
         self.cluster_offsets: List[int] = []
+        self._clusters_end: int = 0
+        self._resolved: Optional[array] = None
+        self.access_pattern = AccessPattern.NORMAL
+        self._prefetcher: Optional[_Prefetcher] = None
+        self._prefetch_clusters = 0
+        self._drop_behind = False
+        self._disk_order: Optional[List[int]] = None
+        self._prefetched_to = 0
+        self._dropped_to = 0
+        self._zstd: Optional['zstandard.ZstdDecompressor'] = None
+        self._zstd_primed = False
+        self._zstd_dictionary: Optional[bytes] = None
+        
+    def open(self, directory: bool = True, snapshot: bool = True) -> None:
+        """Open and parse ZIM file.
         
-    def open(self) -> None:
-        """Open and parse ZIM file."""
-        self.file = open(self.file_path, 'rb')
+        With directory=False only the header, MIME list and cluster
+        pointers are read; directory_entries stays empty. With snapshot,
+        a matching directory snapshot is mapped instead of parsing.
+        """
+        self.file = _CountingFile(open(self.file_path, 'rb'), self.stats)
         self._read_header()
         self._read_mime_types()
-        self._read_directory()
         self._read_cluster_pointers()
+        if directory and not (snapshot and self._load_snapshot()):
+            self._read_directory()
     
     def close(self) -> None:
         """Close ZIM file."""
+        if self._prefetcher:
+            self._prefetcher.close()
+            self._prefetcher = None
+        self.access_pattern = AccessPattern.NORMAL
+        self._drop_behind = False
+        self._disk_order = None
         if self.file:
             self.file.close()
             self.file = None
+        if isinstance(self.directory_entries, DirectorySnapshot):
+            self.directory_entries.close()
+            self.directory_entries = []
+        self._resolved = None
+        self._zstd = None
+        self._zstd_primed = False
+        self._zstd_dictionary = None
+        self._cluster_cache.clear()
+    
+    def snapshot_path(self) -> str:
+        """Get the directory snapshot path for this archive."""
+        if not self.snapshot_dir:
+            return self.file_path + SNAPSHOT_SUFFIX
+        # Keyed by absolute path so equal file names do not collide
+        tag = hashlib.blake2b(os.path.abspath(self.file_path).encode('utf-8'), digest_size=8).hexdigest()
+        name = f"{os.path.basename(self.file_path)}-{tag}{SNAPSHOT_SUFFIX}"
+        return os.path.join(self.snapshot_dir, name)
+    
+    def save_snapshot(self, path: Optional[str] = None) -> str:
+        """Write a snapshot of the parsed directory and return its path."""
+        if not self.header:
+            raise ValueError("Header not parsed")
+        
+        path = path or self.snapshot_path()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_snapshot(path, archive_stamp(self.file_path), _snapshot_digest(self.header),
+                       self.directory_entries)
+        return path
+    
+    def _load_snapshot(self) -> bool:
+        """Map a matching directory snapshot; return success."""
+        path = self.snapshot_path()
+        if not os.path.exists(path):
+            self.stats.snapshot_misses += 1
+            return False
+        
+        try:
+            snapshot = DirectorySnapshot(path)
+        except (OSError, ValueError, TypeError, struct.error):
+            # Unreadable, truncated or corrupt; parse the directory instead
+            self.stats.snapshot_misses += 1
+            return False
+        
+        if ((snapshot.size, snapshot.mtime) != archive_stamp(self.file_path)
+                or snapshot.digest != _snapshot_digest(self.header)
+                or len(snapshot) != self.header.entry_count):
+            snapshot.close()
+            self.stats.snapshot_misses += 1
+            return False
+        
+        self.directory_entries = snapshot
+        self.stats.snapshot_hits += 1
+        return True
+    
+    def advise(self, pattern: AccessPattern, prefetch_clusters: int = 8,
+               drop_behind: bool = False) -> None:
+        """Declare how clusters will be read.
+        
+        SEQUENTIAL doubles kernel read-ahead and, with prefetch_clusters,
+        reads the next clusters in disk order on a background thread.
+        drop_behind releases pages already swept past, so a bulk pass
+        does not evict other readers' cached pages. RANDOM disables
+        read-ahead, for serving scattered requests.
+        """
+        if not self.file:
+            raise ValueError("File not opened")
+        
+        _fadvise(self.file.fileno(), 0, 0, _FADVISE[pattern])
+        self.access_pattern = pattern
+        self._drop_behind = drop_behind and pattern == AccessPattern.SEQUENTIAL
+        self._prefetch_clusters = prefetch_clusters if pattern == AccessPattern.SEQUENTIAL else 0
+        self._prefetched_to = self._dropped_to = 0
+        if self._prefetch_clusters and not self._prefetcher:
+            self._prefetcher = _Prefetcher(self.file_path)
+        elif not self._prefetch_clusters and self._prefetcher:
+            self._prefetcher.close()
+            self._prefetcher = None
+    
+    def prefetch_clusters(self, cluster_numbers: Iterable[int]) -> None:
+        """Hint that clusters will be needed soon (WILLNEED)."""
+        self._advise_clusters(cluster_numbers, getattr(os, 'POSIX_FADV_WILLNEED', None))
+    
+    def release_clusters(self, cluster_numbers: Iterable[int]) -> None:
+        """Hint that clusters will not be needed again (DONTNEED)."""
+        self._advise_clusters(cluster_numbers, getattr(os, 'POSIX_FADV_DONTNEED', None))
+    
+    def _advise_clusters(self, cluster_numbers: Iterable[int], advice: Optional[int]) -> None:
+        """Apply an fadvise hint to the byte ranges of clusters."""
+        if not self.file:
+            raise ValueError("File not opened")
+        for cluster_number in cluster_numbers:
+            start = self.cluster_offsets[cluster_number]
+            _fadvise(self.file.fileno(), start, self._cluster_end(cluster_number) - start, advice)
+    
+    def _advance(self, cluster_number: int) -> None:
+        """Keep the prefetch window ahead of, and drop pages behind, a sequential read."""
+        if self._disk_order is None:
+            self._disk_order = sorted(self.cluster_offsets)
+        order = self._disk_order
+        start = self.cluster_offsets[cluster_number]
+        position = bisect_right(order, start)
+        
+        if self._prefetcher:
+            window_end = order[position + self._prefetch_clusters] \
+                if position + self._prefetch_clusters < len(order) else self._clusters_end
+            begin = max(self._cluster_end(cluster_number), self._prefetched_to)
+            if window_end > begin:
+                self._prefetcher.submit(begin, window_end - begin)
+                self._prefetched_to = window_end
+        
+        if self._drop_behind:
+            # Lag a few clusters so that re-reads of recent ones stay cached
+            lag = order[position - 1 - self._prefetch_clusters] if position > self._prefetch_clusters else 0
+            if lag > self._dropped_to:
+                _fadvise(self.file.fileno(), self._dropped_to, lag - self._dropped_to,
+                         getattr(os, 'POSIX_FADV_DONTNEED', None))
+                self._dropped_to = lag
     
     def __enter__(self):
         self.open()
@@ -225,41 +1188,72 @@ class ZIMReader:
             if b'\x00\x00' in mime_types_data:
                 break
         
-        # Split by null terminator and remove empty strings
+        # Drop whatever follows the list terminator, then split
+        end = mime_types_data.find(b'\x00\x00')
+        if end != -1:
+            mime_types_data = mime_types_data[:end]
         self.mime_types = [mt.decode('utf-8') for mt in mime_types_data.split(b'\x00') if mt]
     
     def _read_directory(self) -> None:
         """Read directory entries."""
+        directory = self._parse_directory()
+        if directory:
+            self.directory_entries = directory
+    
+    def _parse_directory(self) -> Union[ParsedDirectory, List]:
+        """Parse the directory without installing it."""
         if not self.header or not self.file:
             raise ValueError("Header not parsed or file not opened")
         
-        # Read index pointer list
-        self.file.seek(0)  # Start after header
-        self.file.seek(80)  # Skip header
+        pointers = self.read_entry_pointers()
+        if not pointers:
+            return []
         
-        index_pointers = []
-        for _ in range(self.header.entry_count):
-            ptr = struct.unpack('<Q', self.file.read(8))[0]
-            index_pointers.append(ptr)
+        # Entries are stored together: read the whole region at once
+        if np is not None:
+            offsets = np.frombuffer(pointers, dtype=np.uint64)
+            start, last = int(offsets.min()), int(offsets.max())
+        else:
+            start, last = min(pointers), max(pointers)
+        end = self._directory_end(last)
+        self.file.seek(start)
+        return parse_directory(self.file.read(end - start), pointers, start)
+    
+    def _directory_end(self, last_entry: int) -> int:
+        """End of the directory region, given the offset of its last entry."""
+        following = [pos for pos in (self.header.mime_type_list_pos, self.header.cluster_ptr_pos,
+                                     self.header.url_ptr_pos, self.header.title_index_pos,
+                                     self.header.checksum_pos)
+                     if pos > last_entry]
+        following += [offset for offset in self.cluster_offsets if offset > last_entry]
+        return min(following) if following else os.fstat(self.file.fileno()).st_size
+    
+    def read_entry_pointers(self) -> array:
+        """Read the directory pointer list as an array of file offsets."""
+        if not self.header or not self.file:
+            raise ValueError("Header not parsed or file not opened")
         
-        # Read directory entries
-        for ptr in index_pointers:
-            self.file.seek(ptr)
-            
-            # Read entry type (first byte determines if it's redirect or article)
-            first_bytes = self.file.read(5)
-            mimetype = struct.unpack('<I', first_bytes[:4])[0]
-            
-            if mimetype == 0xFFFF:  # Redirect entry
-                remaining = self.file.read(1000)  # Read enough for full entry
-                entry_data = first_bytes + remaining
-                entry = RedirectEntry.from_bytes(entry_data)
-            else:  # Article entry
-                remaining = self.file.read(1000)  # Read enough for full entry
-                entry_data = first_bytes + remaining
-                entry = DirectoryEntry.from_bytes(entry_data)
-            
-            self.directory_entries.append(entry)
+        # Right after the header unless relocated
+        self.file.seek(self.header.url_ptr_pos or 80)
+        return _decode_offsets(self.file.read(8 * self.header.entry_count))
+    
+    @property
+    def is_sorted(self) -> bool:
+        """Whether the directory is sorted by namespace and URL, with a title pointer list."""
+        return bool(self.header and self.header.minor_version >= SORTED_MINOR_VERSION
+                    and self.header.title_index_pos)
+    
+    def read_title_pointers(self) -> array:
+        """Read the title pointer list: directory indices sorted by namespace and title."""
+        if not self.is_sorted:
+            raise ValueError("Archive has no title pointer list")
+        
+        self.file.seek(self.header.title_index_pos)
+        pointers = array('I')
+        pointers.frombytes(self.file.read(4 * self.header.entry_count))
+        if sys.byteorder == 'big':
+            pointers.byteswap()
+        return pointers
     
     def _read_cluster_pointers(self) -> None:
         """Read cluster pointer list."""
@@ -267,63 +1261,435 @@ class ZIMReader:
             raise ValueError("Header not parsed or file not opened")
         
         self.file.seek(self.header.cluster_ptr_pos)
+        self.cluster_offsets = _decode_offsets(self.file.read(8 * self.header.cluster_count)).tolist()
         
-        for _ in range(self.header.cluster_count):
-            ptr = struct.unpack('<Q', self.file.read(8))[0]
-            self.cluster_offsets.append(ptr)
+        # The last cluster runs up to whichever structure follows it
+        if self.cluster_offsets:
+            last = max(self.cluster_offsets)
+            following = [pos for pos in (self.header.mime_type_list_pos, self.header.cluster_ptr_pos,
+                                         self.header.url_ptr_pos, self.header.title_index_pos,
+                                         self.header.checksum_pos)
+                         if pos > last]
+            self._clusters_end = min(following) if following else self.header.checksum_pos
     
-    def get_entry_by_path(self, path: str) -> Optional[Union[DirectoryEntry, RedirectEntry]]:
-        """Get directory entry by URL path."""
-        namespace, url = path[0], path[2:] if len(path) > 2 else ""
+    def get_entry_index_by_path(self, path: str) -> Optional[int]:
+        """Get directory index of the entry with the given URL path."""
+        stats = self.stats
+        stats.lookups += 1
+        sampled = not stats.lookups % stats.sample_every
+        trace = _trace.get() if _active_traces else None
+        if not sampled and trace is None:
+            return self._find_index(path)
+        start = time.perf_counter()
+        index = self._find_index(path)
+        elapsed = time.perf_counter() - start
+        if sampled:
+            stats.lookup_seconds.observe(elapsed)
+        if trace is not None:
+            trace.add('lookup', elapsed)
+        return index
+    
+    def _find_index(self, path: str) -> Optional[int]:
+        """Look up the directory index of a path."""
+        namespace, url = ord(path[0]), path[2:] if len(path) > 2 else ""
         
-        for entry in self.directory_entries:
+        if isinstance(self.directory_entries, (DirectorySnapshot, ParsedDirectory)):
+            return self.directory_entries.find(namespace, url)
+        
+        for i, entry in enumerate(self.directory_entries):
             if entry.namespace == namespace and entry.url == url:
-                return entry
+                return i
         
         return None
     
+    def get_entry_by_path(self, path: str) -> Optional[Union[DirectoryEntry, RedirectEntry]]:
+        """Get directory entry by URL path."""
+        index = self.get_entry_index_by_path(path)
+        if index is None:
+            return None
+        return self.directory_entries[index]
+    
+    def _build_redirect_table(self) -> array:
+        """Map every entry index to its final article index, or -1.
+        
+        Chains are flattened; redirects that loop or point outside the
+        directory resolve to -1. Each entry is visited once.
+        """
+        entries = self.directory_entries
+        count = len(entries)
+        if isinstance(entries, (ParsedDirectory, DirectorySnapshot)):
+            # Read the columns rather than building an object per entry
+            articles = [mimetype != 0xFFFF for mimetype in entries.mimetypes]
+            targets = entries.targets
+        else:
+            articles = [isinstance(entry, DirectoryEntry) for entry in entries]
+            targets = [0 if article else entry.redirect_index for article, entry in zip(articles, entries)]
+        pending, visiting = -2, -3
+        table = array('q', [pending]) * count
+        for i, article in enumerate(articles):
+            if article:
+                table[i] = i
+        
+        for start in range(count):
+            if table[start] != pending:
+                continue
+            chain = []
+            current = start
+            while True:
+                if current < 0 or current >= count or table[current] == visiting:
+                    target = -1  # Dangling or cyclic
+                    break
+                if table[current] != pending:
+                    target = table[current]
+                    break
+                table[current] = visiting
+                chain.append(current)
+                current = targets[current]
+            for index in chain:
+                table[index] = target
+        return table
+    
+    def resolve_index(self, index: int) -> Optional[int]:
+        """Get the index of the article an entry finally points to."""
+        if self._resolved is None:
+            self._resolved = self._build_redirect_table()
+        if index < 0 or index >= len(self._resolved):
+            return None
+        target = self._resolved[index]
+        return target if target >= 0 else None
+    
+    def resolve(self, entry: Union[DirectoryEntry, RedirectEntry]) -> Optional[DirectoryEntry]:
+        """Follow redirects to the final article; None if dangling or cyclic."""
+        if isinstance(entry, DirectoryEntry):
+            return entry
+        target = self.resolve_index(entry.redirect_index)
+        if target is None:
+            return None
+        return self.directory_entries[target]
+    
+    def _cluster_end(self, cluster_number: int) -> int:
+        """Get the file position where a cluster ends."""
+        if cluster_number + 1 < len(self.cluster_offsets):
+            return self.cluster_offsets[cluster_number + 1]
+        return self._clusters_end
+    
+    def cluster_compression(self, cluster_number: int) -> int:
+        """Get the compression type byte of a cluster."""
+        if not self.file:
+            raise ValueError("File not opened")
+        
+        self.file.seek(self.cluster_offsets[cluster_number])
+        return self.file.read(1)[0]
+    
+    def _decompress(self, compression_byte: int, data: bytes) -> bytes:
+        """Decompress a cluster payload, counting and sampling the time per codec."""
+        if compression_byte == CompressionType.DEFAULT or compression_byte == CompressionType.NONE:
+            return data
+        stats = self.stats
+        codec = _CODEC_NAMES.get(compression_byte, str(compression_byte))
+        count = stats.clusters_decompressed[codec] = stats.clusters_decompressed.get(codec, 0) + 1
+        sampled = not count % stats.sample_every
+        trace = _trace.get() if _active_traces else None
+        if not sampled and trace is None:
+            return self._decode(compression_byte, data)
+        start = time.perf_counter()
+        payload = self._decode(compression_byte, data)
+        elapsed = time.perf_counter() - start
+        if sampled:
+            histogram = stats.decompress_seconds.get(codec) or stats.decompress_seconds.setdefault(codec, Histogram())
+            histogram.observe(elapsed)
+        if trace is not None:
+            trace.add('decompress', elapsed)
+        return payload
+    
+    def _decode(self, compression_byte: int, data: bytes) -> bytes:
+        """Decode a compressed cluster payload."""
+        if compression_byte == CompressionType.ZLIB:
+            return zlib.decompress(data)
+        elif compression_byte == CompressionType.LZMA:
+            return lzma.decompress(data)
+        elif compression_byte == CompressionType.ZSTD and zstandard is not None:
+            if not self._zstd_primed:
+                dict_id = zstandard.get_frame_parameters(data).dict_id
+                if self._zstd is None or dict_id:
+                    self._zstd = self._zstd_decompressor(dict_id)
+            # decompressobj also handles frames without a content size
+            return self._zstd.decompressobj().decompress(data)
+        else:
+            raise NotImplementedError(f"Compression type {compression_byte} not supported")
+    
+    def _zstd_decompressor(self, dict_id: int) -> 'zstandard.ZstdDecompressor':
+        """Create the reader's ZSTD context, primed with the archive dictionary if frames use one."""
+        if not dict_id:
+            return zstandard.ZstdDecompressor()
+        dictionary = self.read_zstd_dictionary()
+        if dictionary is None:
+            raise ValueError(f"Cluster needs ZSTD dictionary {dict_id}, which the archive lacks")
+        self._zstd_primed = True
+        return zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dictionary))
+    
+    def read_zstd_dictionary(self) -> Optional[bytes]:
+        """Content of the archive's ZSTD dictionary entry, if any.
+        
+        Readers opened without a directory parse it once for the lookup.
+        """
+        if self._zstd_dictionary is not None:
+            return self._zstd_dictionary
+        directory = self.directory_entries or self._parse_directory()
+        namespace, url = ord(ZSTD_DICTIONARY_PATH[0]), ZSTD_DICTIONARY_PATH[2:]
+        if isinstance(directory, (DirectorySnapshot, ParsedDirectory)):
+            index = directory.find(namespace, url)
+        else:
+            index = next((i for i, e in enumerate(directory) if e.namespace == namespace and e.url == url), None)
+        if index is None or isinstance(directory[index], RedirectEntry):
+            return None
+        self._zstd_dictionary = self.get_article_content(directory[index])
+        return self._zstd_dictionary
+    
+    def read_cluster(self, cluster_number: int) -> List[bytes]:
+        """Read and decompress a whole cluster, returning all of its blobs."""
+        if not self.file or not self.header:
+            raise ValueError("File not opened or header not parsed")
+        
+        payload = self._cluster_payload(cluster_number)
+        
+        # Offsets are relative to the start of the offset table; the first
+        # one points just past the table and so gives the blob count
+        first = struct.unpack_from('<I', payload, 0)[0]
+        offsets = struct.unpack_from(f'<{first // 4}I', payload, 0)
+        return [payload[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    
+    def _cluster_payload(self, cluster_number: int) -> bytes:
+        """Decompressed payload of a cluster, from the cache if present."""
+        payload = self._cluster_cache.get(cluster_number)
+        if payload is not None:
+            self._cluster_cache.move_to_end(cluster_number)
+            self.stats.cache_hits += 1
+            return payload
+        return self._read_payload(cluster_number)
+    
+    def _read_payload(self, cluster_number: int) -> bytes:
+        """Read and decompress a cluster, caching compressed ones."""
+        if self.access_pattern == AccessPattern.SEQUENTIAL:
+            self._advance(cluster_number)
+        cluster_offset = self.cluster_offsets[cluster_number]
+        self.file.seek(cluster_offset)
+        data = self.file.read(self._cluster_end(cluster_number) - cluster_offset)
+        payload = self._decompress(data[0], data[1:])
+        if self.cluster_cache_size and data[0] not in (CompressionType.DEFAULT, CompressionType.NONE):
+            self.stats.cache_misses += 1
+            self._cluster_cache[cluster_number] = payload
+            if len(self._cluster_cache) > self.cluster_cache_size:
+                self._cluster_cache.popitem(last=False)
+        return payload
+    
     def get_article_content(self, entry: DirectoryEntry) -> bytes:
         """Get content of an article entry."""
         if not self.file or not self.header:
             raise ValueError("File not opened or header not parsed")
         
+        if self.access_pattern == AccessPattern.SEQUENTIAL:
+            self._advance(entry.cluster_number)
+        
         # Get cluster offset
         cluster_offset = self.cluster_offsets[entry.cluster_number]
-        self.file.seek(cluster_offset)
         
-        # Read cluster header (compression type)
-        compression_byte = self.file.read(1)[0]
+        # Read cluster header (compression type), unless the cluster is
+        # cached: only compressed clusters are, already decoded
+        cached = entry.cluster_number in self._cluster_cache
+        if not cached:
+            head = self.file.read_at(cluster_offset, 5)
+            compression_byte = head[0]
         
-        # Read blob offsets
-        blob_offsets = []
-        while True:
-            offset = struct.unpack('<I', self.file.read(4))[0]
-            blob_offsets.append(offset)
-            if offset == 0:  # Last offset
-                break
+        if cached or compression_byte not in (CompressionType.DEFAULT, CompressionType.NONE):
+            # Compressed clusters must be decoded as a whole, but only
+            # the one blob is sliced out of the payload
+            payload = self._cluster_payload(entry.cluster_number)
+            if entry.blob_number >= struct.unpack_from('<I', payload, 0)[0] // 4 - 1:
+                raise ValueError("Invalid blob number")
+            blob_start, blob_end = struct.unpack_from('<II', payload, 4 * entry.blob_number)
+            return payload[blob_start:blob_end]
         
-        # Calculate blob size and position
-        if entry.blob_number >= len(blob_offsets) - 1:
+        # Read blob offsets; the first offset gives the table length
+        first = struct.unpack_from('<I', head, 1)[0]
+        blob_count = first // 4 - 1
+        if entry.blob_number >= blob_count:
             raise ValueError("Invalid blob number")
         
-        blob_start = blob_offsets[entry.blob_number]
-        blob_end = blob_offsets[entry.blob_number + 1]
-        blob_size = blob_end - blob_start
+        blob_start, blob_end = struct.unpack('<II', self.file.read_at(cluster_offset + 1 + 4 * entry.blob_number, 8))
         
         # Read blob data
-        current_pos = self.file.tell()
-        self.file.seek(current_pos + blob_start)
+        return self.file.read_at(cluster_offset + 1 + blob_start, blob_end - blob_start)
+    
+    def _read_blobs(self, cluster_number: int, blob_numbers: Set[int]) -> Dict[int, bytes]:
+        """Read selected blobs of one cluster with a single read."""
+        if self.access_pattern == AccessPattern.SEQUENTIAL:
+            self._advance(cluster_number)
+        cluster_offset = self.cluster_offsets[cluster_number]
+        cached = cluster_number in self._cluster_cache
+        if not cached:
+            self.file.seek(cluster_offset)
+            compression_byte = self.file.read(1)[0]
         
-        if compression_byte == CompressionType.DEFAULT or compression_byte == CompressionType.NONE:
-            return self.file.read(blob_size)
-        elif compression_byte == CompressionType.ZLIB:
-            compressed_data = self.file.read(blob_size)
-            return zlib.decompress(compressed_data)
-        elif compression_byte == CompressionType.LZMA:
-            compressed_data = self.file.read(blob_size)
-            return lzma.decompress(compressed_data)
-        else:
-            raise NotImplementedError(f"Compression type {compression_byte} not supported")
+        if cached or compression_byte not in (CompressionType.DEFAULT, CompressionType.NONE):
+            blobs = self.read_cluster(cluster_number)
+            if max(blob_numbers) >= len(blobs):
+                raise ValueError("Invalid blob number")
+            return {b: blobs[b] for b in blob_numbers}
+        
+        # Uncompressed: read the offset table, then only the span covering
+        # the requested blobs (media clusters can be large)
+        first = struct.unpack('<I', self.file.read(4))[0]
+        blob_count = first // 4 - 1
+        if max(blob_numbers) >= blob_count:
+            raise ValueError("Invalid blob number")
+        offsets = (first,) + struct.unpack(f'<{blob_count}I', self.file.read(4 * blob_count))
+        
+        start = min(offsets[b] for b in blob_numbers)
+        end = max(offsets[b + 1] for b in blob_numbers)
+        self.file.seek(cluster_offset + 1 + start)
+        data = self.file.read(end - start)
+        return {b: data[offsets[b] - start:offsets[b + 1] - start] for b in blob_numbers}
+    
+    def get_many(self, entries: Iterable[DirectoryEntry]) -> Iterator[Tuple[DirectoryEntry, bytes]]:
+        """Get content of many article entries, reading each cluster once.
+        
+        Yields (entry, content) pairs in cluster file-offset order, i.e. a
+        single forward sweep over the archive, not in the order given.
+        """
+        if not self.file or not self.header:
+            raise ValueError("File not opened or header not parsed")
+        
+        by_cluster: Dict[int, List[DirectoryEntry]] = {}
+        for entry in entries:
+            by_cluster.setdefault(entry.cluster_number, []).append(entry)
+        
+        for cluster_number in sorted(by_cluster, key=lambda c: self.cluster_offsets[c]):
+            wanted = by_cluster[cluster_number]
+            blobs = self._read_blobs(cluster_number, {entry.blob_number for entry in wanted})
+            for entry in wanted:
+                yield entry, blobs[entry.blob_number]
+    
+    def iter_contents(self, entries: Optional[Iterable[DirectoryEntry]] = None, workers: int = 1,
+                      ordered: bool = True, max_bytes: int = ITER_BUDGET
+                      ) -> Iterator[Tuple[DirectoryEntry, bytes]]:
+        """Get content of many article entries, decompressing in worker processes.
+        
+        Yields (entry, content) pairs in the order given (directory order
+        by default) when ordered, else in cluster file-offset order like
+        get_many. Entries are cut into windows whose clusters decompress
+        to at most half of max_bytes and two windows are in flight at
+        once, so memory stays bounded; a cluster needed again in a later
+        window is read again.
+        
+        Decompressed sizes are exact for uncompressed clusters and ZSTD
+        frames that record their content size. Other compressed clusters
+        are estimated: until the first window returns, windows take one
+        such cluster each; after that they are assumed to expand by the
+        largest ratio seen so far, and at least ITER_EXPANSION times.
+        """
+        if not self.file or not self.header:
+            raise ValueError("File not opened or header not parsed")
+        
+        entries = list(self.list_articles() if entries is None else entries)
+        if not ordered:
+            entries.sort(key=lambda e: self.cluster_offsets[e.cluster_number])
+        
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_open_pool_reader,
+                                       initargs=(self.file_path,)) if workers > 1 else None
+        expansion = _Expansion(float(self.ITER_EXPANSION))
+        
+        def submit(window: List[DirectoryEntry], unsized: Dict[int, int]):
+            by_cluster: Dict[int, Set[int]] = {}
+            for entry in window:
+                by_cluster.setdefault(entry.cluster_number, set()).add(entry.blob_number)
+            clusters = sorted(by_cluster.items(), key=lambda item: self.cluster_offsets[item[0]])
+            if executor is None:
+                return window, unsized, [_read_cluster_batch(clusters, self)]
+            # One batch per worker, contiguous on disk
+            size = -(-len(clusters) // workers)
+            return window, unsized, [executor.submit(_read_cluster_batch, clusters[i:i + size])
+                                     for i in range(0, len(clusters), size)]
+        
+        def finish(window: List[DirectoryEntry], unsized: Dict[int, int], batches: list):
+            contents = _gather_batches(batches)
+            if unsized:
+                # Learn from clusters whose size was a guess
+                held = sum(len(content) for (cluster_number, _), content in contents.items()
+                           if cluster_number in unsized)
+                expansion.factor = max(expansion.factor, held / max(1, sum(unsized.values())))
+                expansion.observed = True
+            for entry in window:
+                yield entry, contents[entry.cluster_number, entry.blob_number]
+        
+        try:
+            pending: Deque = deque()
+            for window, unsized in self._content_windows(entries, max(1, max_bytes // 2), expansion):
+                pending.append(submit(window, unsized))
+                if len(pending) < 2:
+                    continue
+                yield from finish(*pending.popleft())
+            while pending:
+                yield from finish(*pending.popleft())
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+    
+    def _content_windows(self, entries: List[DirectoryEntry], limit: int,
+                         expansion: Optional['_Expansion'] = None
+                         ) -> Iterator[Tuple[List[DirectoryEntry], Dict[int, int]]]:
+        """Split entries, in order, into runs whose distinct clusters decompress to at most limit bytes.
+        
+        Yields each run with the on-disk sizes of its clusters whose
+        decompressed size was estimated from expansion. The estimate is
+        read per cluster, so callers may update it as they go.
+        """
+        expansion = expansion or _Expansion(float(self.ITER_EXPANSION), observed=True)
+        window: List[DirectoryEntry] = []
+        unsized: Dict[int, int] = {}
+        clusters: Set[int] = set()
+        size = 0
+        # Set when the window holds a cluster estimated before any ratio was seen
+        probe = False
+        for entry in entries:
+            cluster_number = entry.cluster_number
+            if cluster_number not in clusters:
+                cluster_size = self._payload_size(cluster_number)
+                disk_size = 0
+                if cluster_size is None:
+                    disk_size = self._cluster_end(cluster_number) - self.cluster_offsets[cluster_number]
+                    cluster_size = int(disk_size * expansion.factor)
+                guess = bool(disk_size) and not expansion.observed
+                if window and (size + cluster_size > limit or probe or guess):
+                    yield window, unsized
+                    window, unsized, clusters, size, probe = [], {}, set(), 0, False
+                clusters.add(cluster_number)
+                if disk_size:
+                    unsized[cluster_number] = disk_size
+                probe = probe or guess
+                size += cluster_size
+            window.append(entry)
+        if window:
+            yield window, unsized
+    
+    def _payload_size(self, cluster_number: int) -> Optional[int]:
+        """Decompressed size of a cluster if known without decompressing it."""
+        cluster_offset = self.cluster_offsets[cluster_number]
+        disk_size = self._cluster_end(cluster_number) - cluster_offset
+        if cluster_number in self._cluster_cache:
+            return len(self._cluster_cache[cluster_number])
+        # Compression byte and, for ZSTD, the frame header
+        head = self.file.read_at(cluster_offset, min(disk_size, 19))
+        if not head or head[0] in (CompressionType.DEFAULT, CompressionType.NONE):
+            return max(0, disk_size - 1)
+        if head[0] == CompressionType.ZSTD and zstandard is not None:
+            try:
+                content_size = zstandard.get_frame_parameters(head[1:]).content_size
+            except zstandard.ZstdError:
+                return None
+            if content_size != zstandard.CONTENTSIZE_UNKNOWN:
+                return content_size
+        return None
     
     def get_main_page(self) -> Optional[Union[DirectoryEntry, RedirectEntry]]:
         """Get main page entry."""
@@ -339,19 +1705,171 @@ class ZIMReader:
         """List all article entries (excluding redirects)."""
         return [entry for entry in self.directory_entries 
                 if isinstance(entry, DirectoryEntry)]
+    
+    def memory_report(self) -> MemoryReport:
+        """Estimate the memory this reader holds, by structure.
+        
+        Sizes come from sys.getsizeof and are approximate. Takes time
+        proportional to the number of entry objects built so far.
+        """
+        report = MemoryReport()
+        directory = self.directory_entries
+        built: Iterable = ()
+        if isinstance(directory, ParsedDirectory):
+            report.directory += sum(sys.getsizeof(column) for column in (
+                directory.mimetypes, directory.namespaces, directory.revisions, directory.targets,
+                directory.blobs, directory.starts, directory.url_ends, directory.title_ends))
+            report.directory += sys.getsizeof(directory._entries)
+            report.strings += sys.getsizeof(directory.data)
+            if directory._index is not None:
+                report.indexes += _container_size(directory._index)
+            built = directory._entries.values()
+        elif isinstance(directory, DirectorySnapshot):
+            report.mapped += len(directory._mmap) if directory._mmap is not None else 0
+        else:
+            report.directory += sys.getsizeof(directory)
+            built = directory
+        for entry in built:
+            if entry is not None:
+                report.entries += 1
+                report.directory += _instance_size(entry)
+                report.strings += sys.getsizeof(entry.url) + sys.getsizeof(entry.title)
+        
+        if self._resolved is not None:
+            report.indexes += sys.getsizeof(self._resolved)
+        report.indexes += _container_size(self.cluster_offsets)
+        if self._disk_order is not None:
+            report.indexes += _container_size(self._disk_order)
+        
+        report.caches += sys.getsizeof(self._cluster_cache)
+        report.caches += sum(sys.getsizeof(payload) for payload in self._cluster_cache.values())
+        if self._zstd_dictionary is not None:
+            report.caches += sys.getsizeof(self._zstd_dictionary)
+        if self._zstd is not None:
+            report.caches += self._zstd.memory_size()
+        
+        report.other += _container_size(self.mime_types)
+        if self.header is not None:
+            report.other += _instance_size(self.header)
+        return report
+
+
+@dataclass
+class _Expansion:
+    """Expansion assumed by iter_contents for compressed clusters of unknown size."""
+    factor: float
+    observed: bool = False
+
+
+# Per-process reader for iter_contents pool workers
+_pool_reader: Optional[ZIMReader] = None
+
+
+def _open_pool_reader(file_path: str) -> None:
+    """Open the archive once per worker process."""
+    global _pool_reader
+    _pool_reader = ZIMReader(file_path)
+    _pool_reader.open(directory=False)
+
+
+def _read_cluster_batch(clusters: List[Tuple[int, Set[int]]],
+                        reader: Optional[ZIMReader] = None) -> Dict[Tuple[int, int], bytes]:
+    """Read the wanted blobs of a batch of clusters, keyed by (cluster, blob)."""
+    reader = reader or _pool_reader
+    contents: Dict[Tuple[int, int], bytes] = {}
+    for cluster_number, blob_numbers in clusters:
+        for blob_number, content in reader._read_blobs(cluster_number, blob_numbers).items():
+            contents[cluster_number, blob_number] = content
+    return contents
+
+
+def _gather_batches(batches: list) -> Dict[Tuple[int, int], bytes]:
+    """Wait for a window's batches and merge their blobs."""
+    contents: Dict[Tuple[int, int], bytes] = {}
+    for batch in batches:
+        contents.update(batch if isinstance(batch, dict) else batch.result())
+    return contents
+
+
+# Spilled key record: namespace, entry index, key length, payload length,
+# then the key and the payload (the serialized entry, in URL runs)
+_RUN_RECORD = struct.Struct('<BIII')
+
+
+def _write_run(records: List[Tuple[int, bytes, int, bytes]], temp_dir: Optional[str]) -> BinaryIO:
+    """Sort (namespace, key, index, payload) records into a temporary run file."""
+    run = tempfile.TemporaryFile(dir=temp_dir)
+    records.sort()
+    for namespace, key, index, payload in records:
+        run.write(_RUN_RECORD.pack(namespace, index, len(key), len(payload)))
+        run.write(key)
+        run.write(payload)
+    return run
+
+
+def _read_run(run: BinaryIO) -> Iterator[Tuple[int, bytes, int, bytes]]:
+    """Stream the records of a run file back in order."""
+    run.seek(0)
+    read = run.read
+    while True:
+        head = read(_RUN_RECORD.size)
+        if not head:
+            return
+        namespace, index, key_length, payload_length = _RUN_RECORD.unpack(head)
+        yield namespace, read(key_length), index, read(payload_length)
 
 
 class ZIMWriter:
-    """Clean-room ZIM file writer."""
+    """Clean-room ZIM file writer.
+    
+    Clusters are streamed to disk as they are added; the MIME list,
+    directory and pointer lists follow them and are written by finalize().
     
-    def __init__(self, file_path: str):
-        """Initialize ZIM writer with file path."""
+    By default entries are written in insertion order. With sort_entries
+    they are written sorted by namespace and URL, a title pointer list is
+    added and redirect targets and the main page are remapped from
+    insertion to sorted indices. Setting run_size additionally spills
+    entries to disk every run_size entries, as sorted (namespace, url,
+    index, serialized entry) and (namespace, title, index) runs, plus a
+    (namespace, target url, index) run for add_redirect_to_path(), that
+    finalize() k-way merges, reading every run sequentially. The
+    directory then never has to fit in memory; finalize() keeps about
+    16 bytes per entry in memory, 20 with path redirects.
+    """
+    
+    COPY_CHUNK_SIZE = 1 << 20
+    
+    def __init__(self, file_path: str, sort_entries: bool = False, run_size: Optional[int] = None,
+                 temp_dir: Optional[str] = None, codec_policy: Optional[CodecPolicy] = None):
+        """Initialize ZIM writer with file path.
+        
+        codec_policy chooses how add_article() compresses content;
+        without one articles are stored uncompressed.
+        """
+        if run_size is not None and not sort_entries:
+            raise ValueError("run_size requires sort_entries")
         self.file_path = file_path
         self.file: Optional[BinaryIO] = None
         self.mime_types: List[str] = []
         self.directory_entries: List[Union[DirectoryEntry, RedirectEntry]] = []
-        self.clusters: List[bytes] = []
+        self.cluster_offsets: List[int] = []
         self.main_page_index: int = 0
+        self.main_page_path: Optional[str] = None
+        self.sort_entries = sort_entries
+        self.run_size = run_size
+        self.temp_dir = temp_dir
+        self.codec_policy = codec_policy
+        self.zstd_dictionary: Optional[bytes] = None
+        self._runs: List[Tuple[BinaryIO, BinaryIO]] = []
+        self._spilled = 0
+        self._path_targets: List[Tuple[int, bytes, int, bytes]] = []
+        self._target_runs: List[BinaryIO] = []
+        self.unresolved_redirects: List[Tuple[str, str]] = []
+    
+    @property
+    def entry_count(self) -> int:
+        """Number of entries added so far, spilled or not."""
+        return self._spilled + len(self.directory_entries)
     
     def create(self) -> None:
         """Create new ZIM file."""
@@ -381,26 +1899,116 @@ class ZIMWriter:
             self.mime_types.append(mime_type)
         return self.mime_types.index(mime_type)
     
-    def add_article(self, namespace: int, url: str, title: str, content: bytes, 
-                   mime_type: str = "text/html") -> None:
-        """Add article to ZIM file."""
-        mimetype_index = self.add_mime_type(mime_type)
+    def add_cluster(self, blobs: List[bytes],
+                    compression: CompressionType = CompressionType.DEFAULT, level: Optional[int] = None) -> int:
+        """Encode blobs into a cluster, write it and return its number."""
+        return self.write_cluster(self._create_cluster(blobs, compression, level))
+    
+    def write_cluster(self, data: bytes) -> int:
+        """Write an already encoded cluster and return its number."""
+        if not self.file:
+            raise ValueError("File not created")
         
-        # Create cluster with content (for simplicity, one blob per cluster)
-        cluster_data = self._create_cluster([content], CompressionType.DEFAULT)
-        cluster_number = len(self.clusters)
-        self.clusters.append(cluster_data)
+        cluster_number = len(self.cluster_offsets)
+        self.cluster_offsets.append(self.file.tell())
+        self.file.write(data)
+        return cluster_number
+    
+    def copy_clusters(self, reader: 'ZIMReader', cluster_numbers: Iterable[int]) -> Dict[int, int]:
+        """Copy clusters from another archive byte for byte.
+        
+        Runs of clusters that are contiguous in the source are copied with
+        a single copy_file_range() call where the platform supports it.
+        Returns a mapping of source to new cluster numbers.
+        """
+        if not self.file:
+            raise ValueError("File not created")
+        
+        # Group source clusters into contiguous byte runs
+        runs: List[list] = []
+        for cluster_number in sorted(set(cluster_numbers), key=lambda c: reader.cluster_offsets[c]):
+            start, end = reader.cluster_offsets[cluster_number], reader._cluster_end(cluster_number)
+            if runs and runs[-1][1] == start:
+                runs[-1][1] = end
+                runs[-1][2].append(cluster_number)
+            else:
+                runs.append([start, end, [cluster_number]])
+        
+        mapping: Dict[int, int] = {}
+        for begin, end, members in runs:
+            base = self.file.tell()
+            for cluster_number in members:
+                mapping[cluster_number] = len(self.cluster_offsets)
+                self.cluster_offsets.append(base + reader.cluster_offsets[cluster_number] - begin)
+            self._copy_range(reader.file, begin, end - begin)
+        return mapping
+    
+    def copy_raw_cluster(self, source: BinaryIO, offset: int, length: int) -> int:
+        """Copy one encoded cluster from an open file and return its number."""
+        if not self.file:
+            raise ValueError("File not created")
+        
+        cluster_number = len(self.cluster_offsets)
+        self.cluster_offsets.append(self.file.tell())
+        self._copy_range(source, offset, length)
+        return cluster_number
+    
+    def _copy_range(self, source: BinaryIO, offset: int, length: int) -> None:
+        """Append length bytes of source, starting at offset, to the output."""
+        self.file.flush()
+        position = self.file.tell()
         
+        if hasattr(os, 'copy_file_range'):
+            try:
+                copied = 0
+                while copied < length:
+                    n = os.copy_file_range(source.fileno(), self.file.fileno(), length - copied,
+                                           offset + copied, position + copied)
+                    if n == 0:
+                        break
+                    copied += n
+                if copied == length:
+                    self.file.seek(position + length)
+                    return
+                offset, length, position = offset + copied, length - copied, position + copied
+                self.file.seek(position)
+            except OSError:
+                # Unsupported across these filesystems; fall back to copying
+                pass
+        
+        source.seek(offset)
+        while length > 0:
+            chunk = source.read(min(length, self.COPY_CHUNK_SIZE))
+            if not chunk:
+                raise ValueError("Unexpected end of source archive")
+            self.file.write(chunk)
+            length -= len(chunk)
+    
+    def add_entry(self, namespace: int, url: str, title: str, cluster_number: int,
+                  blob_number: int, mime_type: str = "text/html") -> None:
+        """Add a directory entry for a blob of an already written cluster."""
         entry = DirectoryEntry(
-            mimetype_index=mimetype_index,
+            mimetype_index=self.add_mime_type(mime_type),
             namespace=namespace,
             revision=0,
             cluster_number=cluster_number,
-            blob_number=0,
+            blob_number=blob_number,
             url=url,
             title=title
         )
         self.directory_entries.append(entry)
+        self._maybe_spill()
+    
+    def add_article(self, namespace: int, url: str, title: str, content: bytes, 
+                   mime_type: str = "text/html") -> None:
+        """Add article to ZIM file, compressed as the codec policy says."""
+        # Create cluster with content (for simplicity, one blob per cluster)
+        if self.codec_policy:
+            compression, level = self.codec_policy.codec(namespace, mime_type)
+        else:
+            compression, level = CompressionType.DEFAULT, None
+        cluster_number = self.add_cluster([content], compression, level)
+        self.add_entry(namespace, url, title, cluster_number, 0, mime_type)
     
     def add_redirect(self, namespace: int, url: str, title: str, redirect_index: int) -> None:
         """Add redirect entry to ZIM file."""
@@ -413,108 +2021,270 @@ class ZIMWriter:
             title=title
         )
         self.directory_entries.append(entry)
+        self._maybe_spill()
     
-    def _create_cluster(self, blobs: List[bytes], compression: CompressionType) -> bytes:
+    def add_redirect_to_path(self, namespace: int, url: str, title: str, target_path: str) -> None:
+        """Add a redirect to the entry at target_path ("A/url"), resolved by finalize().
+        
+        Unresolved targets become self-redirects, which readers treat as
+        dangling, and are listed in unresolved_redirects as (path, target).
+        """
+        self._path_targets.append((ord(target_path[0]), target_path[2:].encode('utf-8'), self.entry_count, b''))
+        self.add_redirect(namespace, url, title, 0)
+    
+    def _maybe_spill(self) -> None:
+        """Spill buffered entries once a run is full."""
+        if self.run_size and len(self.directory_entries) >= self.run_size:
+            self._spill()
+    
+    def _spill(self) -> None:
+        """Move buffered entries into sorted runs on disk."""
+        if not self.directory_entries:
+            return
+        urls, titles = self._key_records(self.directory_entries, self._spilled, serialize=True)
+        self._runs.append((_write_run(urls, self.temp_dir), _write_run(titles, self.temp_dir)))
+        if self._path_targets:
+            self._target_runs.append(_write_run(self._path_targets, self.temp_dir))
+            self._path_targets = []
+        self._spilled += len(self.directory_entries)
+        self.directory_entries.clear()
+    
+    @staticmethod
+    def _key_records(entries: List[Union[DirectoryEntry, RedirectEntry]], base: int, serialize: bool = False
+                     ) -> Tuple[List[Tuple[int, bytes, int, bytes]], List[Tuple[int, bytes, int, bytes]]]:
+        """URL and title sort records of buffered entries; titles default to URLs.
+        
+        With serialize, URL records carry the serialized entry.
+        """
+        urls = []
+        titles = []
+        for i, entry in enumerate(entries, base):
+            url = entry.url.encode('utf-8')
+            urls.append((entry.namespace, url, i, entry.to_bytes() if serialize else b''))
+            titles.append((entry.namespace, entry.title.encode('utf-8') if entry.title else url, i, b''))
+        return urls, titles
+    
+    def _run_entry(self, index: int, payload: bytes) -> Union[DirectoryEntry, RedirectEntry]:
+        """Get an entry by insertion index, from the buffer or its run record."""
+        if index >= self._spilled:
+            return self.directory_entries[index - self._spilled]
+        if struct.unpack_from('<I', payload, 0)[0] == 0xFFFF:
+            return RedirectEntry.from_bytes(payload)
+        return DirectoryEntry.from_bytes(payload)
+    
+    def _create_cluster(self, blobs: List[bytes], compression: CompressionType,
+                        level: Optional[int] = None) -> bytes:
         """Create cluster from list of blobs."""
-        # Calculate blob offsets
-        offsets = [0]
-        current_offset = 0
-        for blob in blobs:
-            current_offset += len(blob)
-            offsets.append(current_offset)
-        
-        # Create cluster data
-        cluster_data = bytes([compression])
-        
-        # Add offsets
-        for offset in offsets:
-            cluster_data += struct.pack('<I', offset)
-        
-        # Add blob data
-        for blob in blobs:
-            if compression == CompressionType.ZLIB:
-                blob = zlib.compress(blob)
-            elif compression == CompressionType.LZMA:
-                blob = lzma.compress(blob)
-            cluster_data += blob
-        
-        return cluster_data
+        return encode_cluster(blobs, compression, level, self.zstd_dictionary)
+    
+    def train_zstd_dictionary(self, samples: List[bytes], size: int = ZSTD_DICTIONARY_SIZE) -> bytes:
+        """Train a ZSTD dictionary on sample blobs and store it in the archive.
+        
+        The dictionary is written uncompressed as ZSTD_DICTIONARY_PATH and
+        primes every ZSTD cluster added afterwards; readers load it once.
+        Small articles with shared boilerplate compress far better with
+        it, so clusters can stay small. Raises zstandard.ZstdError when
+        the samples are too few or too uniform to train on.
+        """
+        if zstandard is None:
+            raise NotImplementedError("ZSTD dictionaries require the zstandard package")
+        if self.zstd_dictionary is not None:
+            raise ValueError("ZSTD dictionary already set")
+        dictionary = zstandard.train_dictionary(size, samples).as_bytes()
+        cluster_number = self.add_cluster([dictionary], CompressionType.NONE)
+        self.add_entry(ord(ZSTD_DICTIONARY_PATH[0]), ZSTD_DICTIONARY_PATH[2:], '', cluster_number, 0,
+                       'application/octet-stream')
+        self.zstd_dictionary = dictionary
+        return dictionary
     
     def finalize(self) -> None:
         """Finalize ZIM file by writing all data and updating header."""
         if not self.file:
             raise ValueError("File not created")
         
-        # Calculate positions
-        current_pos = 80  # After header
-        
-        # Write MIME type list
-        mime_type_pos = current_pos
-        mime_type_data = b'\x00'.join(mt.encode('utf-8') for mt in self.mime_types) + b'\x00\x00'
-        self.file.write(mime_type_data)
-        current_pos += len(mime_type_data)
-        
-        # Write directory entries
-        directory_pos = current_pos
-        index_pointers = []
+        # Layout after the clusters: MIME list | directory entries |
+        # URL pointer list | cluster pointer list | checksum
+        self.file.seek(0, os.SEEK_END)
+        mime_type_pos = self.file.tell()
+        self.file.write(b'\x00'.join(mt.encode('utf-8') for mt in self.mime_types) + b'\x00\x00')
         
-        for entry in self.directory_entries:
-            index_pointers.append(current_pos)
-            entry_data = entry.to_bytes()
-            self.file.write(entry_data)
-            current_pos += len(entry_data)
-        
-        # Write index pointer list
-        index_ptr_pos = current_pos
-        for ptr in index_pointers:
-            self.file.write(struct.pack('<Q', ptr))
-            current_pos += 8
+        if self.sort_entries:
+            url_ptr_pos, title_ptr_pos, counts, main_page_index = self._write_sorted_directory()
+        else:
+            url_ptr_pos, counts, main_page_index = self._write_directory()
+            title_ptr_pos = 0
         
-        # Write cluster pointer list
-        cluster_ptr_pos = current_pos
-        cluster_offsets = []
+        cluster_ptr_pos = self.file.tell()
+        self.file.write(struct.pack(f'<{len(self.cluster_offsets)}Q', *self.cluster_offsets))
         
-        for cluster in self.clusters:
-            cluster_offsets.append(current_pos)
-            self.file.write(cluster)
-            current_pos += len(cluster)
+        checksum_pos = self.file.tell()
+        self.file.write(b'\x00' * 16)  # 16-byte checksum placeholder
         
         # Update header with real values
-        article_count = sum(1 for entry in self.directory_entries 
-                          if isinstance(entry, DirectoryEntry))
-        redirect_count = sum(1 for entry in self.directory_entries 
-                           if isinstance(entry, RedirectEntry))
+        article_count, redirect_count = counts
         
         header = ZIMHeader(
             magic_number=0x4D495A5A,
             major_version=4,
-            minor_version=0,
-            entry_count=len(self.directory_entries),
+            minor_version=SORTED_MINOR_VERSION if self.sort_entries else 0,
+            entry_count=article_count + redirect_count,
             article_count=article_count,
-            cluster_count=len(self.clusters),
+            cluster_count=len(self.cluster_offsets),
             redirect_count=redirect_count,
             mime_type_list_pos=mime_type_pos,
-            title_index_pos=0,  # Not implemented
+            title_index_pos=title_ptr_pos,
             cluster_ptr_pos=cluster_ptr_pos,
             cluster_count_pos=0,  # Not implemented
-            main_page_index=self.main_page_index,
+            main_page_index=main_page_index,
             layout_page_index=0,  # Not implemented
-            checksum_pos=current_pos  # Checksum at end
+            checksum_pos=checksum_pos,
+            url_ptr_pos=url_ptr_pos
         )
         
         # Write updated header
         self.file.seek(0)
         self.file.write(header.to_bytes())
+    
+    def _write_directory(self) -> Tuple[int, Tuple[int, int], int]:
+        """Write entries in insertion order and their pointer list.
         
-        # Write placeholder checksum
-        self.file.seek(current_pos)
-        self.file.write(b'\x00' * 16)  # 16-byte checksum placeholder
+        Returns the pointer list position, (article, redirect) counts and
+        the main page index.
+        """
+        path_redirects = {index: (namespace, key) for namespace, key, index, _ in self._path_targets}
+        wanted = set(path_redirects.values())
+        if self.main_page_path:
+            wanted.add((ord(self.main_page_path[0]), self.main_page_path[2:].encode('utf-8')))
+        found: Dict[Tuple[int, bytes], int] = {}
+        if wanted:
+            for i, entry in enumerate(self.directory_entries):
+                key = (entry.namespace, entry.url.encode('utf-8'))
+                if key in wanted and key not in found:
+                    found[key] = i
+        
+        index_pointers = []
+        counts = [0, 0]
+        for i, entry in enumerate(self.directory_entries):
+            if i in path_redirects:
+                entry.redirect_index = found.get(path_redirects[i], i)
+                if entry.redirect_index == i:
+                    self._note_unresolved(entry, path_redirects[i])
+            index_pointers.append(self.file.tell())
+            self.file.write(entry.to_bytes())
+            counts[isinstance(entry, RedirectEntry)] += 1
+        
+        url_ptr_pos = self.file.tell()
+        self.file.write(struct.pack(f'<{len(index_pointers)}Q', *index_pointers))
+        
+        main_page_index = self.main_page_index
+        if self.main_page_path:
+            main_page_index = found.get((ord(self.main_page_path[0]),
+                                         self.main_page_path[2:].encode('utf-8')), 0)
+        return url_ptr_pos, (counts[0], counts[1]), main_page_index
+    
+    def _note_unresolved(self, entry: RedirectEntry, target: Tuple[int, bytes]) -> None:
+        """Record a path redirect whose target does not exist."""
+        self.unresolved_redirects.append((f"{chr(entry.namespace)}/{entry.url}",
+                                          f"{chr(target[0])}/{target[1].decode('utf-8')}"))
+    
+    def _write_sorted_directory(self) -> Tuple[int, int, Tuple[int, int], int]:
+        """Merge the runs and write entries, URL pointers and title pointers in sorted order.
+        
+        Returns the URL and title pointer list positions, (article,
+        redirect) counts and the remapped main page index.
+        """
+        count = self.entry_count
+        urls, titles = self._key_records(self.directory_entries, self._spilled)
+        urls.sort()
+        titles.sort()
+        
+        self._path_targets.sort()
+        
+        def merged_urls():
+            return heapq.merge(*(_read_run(url_run) for url_run, _ in self._runs), urls)
+        
+        # Path redirect targets stream in target URL order and are joined
+        # against the merged URL stream; path_targets[index] is then the
+        # target position, NOT_PATH or UNRESOLVED
+        NOT_PATH, UNRESOLVED = 0xFFFFFFFF, 0xFFFFFFFE
+        targets = heapq.merge(*(_read_run(run) for run in self._target_runs), self._path_targets)
+        pending = next(targets, None)
+        path_targets = array('I', [NOT_PATH]) * count if pending else None
+        unresolved: Dict[int, Tuple[int, bytes]] = {}
+        main_key = None
+        if self.main_page_path:
+            main_key = (ord(self.main_page_path[0]), self.main_page_path[2:].encode('utf-8'))
+        main_page_index = None
+        
+        # Pass 1: sorted position of every entry
+        new_index = array('I', bytes(4 * count))
+        for position, (namespace, url, index, _) in enumerate(merged_urls()):
+            new_index[index] = position
+            key = (namespace, url)
+            while pending and pending[:2] < key:
+                path_targets[pending[2]] = UNRESOLVED
+                unresolved[pending[2]] = pending[:2]
+                pending = next(targets, None)
+            while pending and pending[:2] == key:
+                path_targets[pending[2]] = position
+                pending = next(targets, None)
+            if key == main_key and main_page_index is None:
+                main_page_index = position
+        while pending:
+            path_targets[pending[2]] = UNRESOLVED
+            unresolved[pending[2]] = pending[:2]
+            pending = next(targets, None)
+        
+        # Pass 2: merge again, now writing entries with remapped redirects
+        index_pointers = array('Q')
+        counts = [0, 0]
+        for position, (_, _, index, payload) in enumerate(merged_urls()):
+            entry = self._run_entry(index, payload)
+            if isinstance(entry, RedirectEntry):
+                target = path_targets[index] if path_targets else NOT_PATH
+                if target == UNRESOLVED:
+                    target = position
+                    self._note_unresolved(entry, unresolved[index])
+                elif target == NOT_PATH:
+                    target = entry.redirect_index
+                    if target < count:
+                        target = new_index[target]
+                entry = RedirectEntry(entry.mimetype_index, entry.namespace, entry.revision,
+                                      target, entry.url, entry.title)
+            index_pointers.append(self.file.tell())
+            self.file.write(entry.to_bytes())
+            counts[isinstance(entry, RedirectEntry)] += 1
+        
+        if sys.byteorder == 'big':
+            index_pointers.byteswap()
+        url_ptr_pos = self.file.tell()
+        self.file.write(index_pointers.tobytes())
+        
+        title_pointers = array('I', (new_index[index] for _, _, index, _ in heapq.merge(
+            *(_read_run(title_run) for _, title_run in self._runs), titles)))
+        if sys.byteorder == 'big':
+            title_pointers.byteswap()
+        title_ptr_pos = self.file.tell()
+        self.file.write(title_pointers.tobytes())
+        
+        if self.main_page_path:
+            main_page_index = 0 if main_page_index is None else main_page_index
+        else:
+            main_page_index = new_index[self.main_page_index] if self.main_page_index < count else 0
+        return url_ptr_pos, title_ptr_pos, (counts[0], counts[1]), main_page_index
     
     def close(self) -> None:
         """Close ZIM file."""
         if self.file:
             self.file.close()
             self.file = None
+        for url_run, title_run in self._runs:
+            url_run.close()
+            title_run.close()
+        for run in self._target_runs:
+            run.close()
+        self._runs = []
+        self._target_runs = []
     
     def __enter__(self):
         self.create()
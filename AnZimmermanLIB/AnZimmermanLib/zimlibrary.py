@@ -0,0 +1,266 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Catalog of many ZIM archives for library listings.
+
+Cataloguing an archive reads its header, MIME list and cluster pointers
+and then the M/ metadata entries (Title, Language, Description, ...). It
+never materializes the full directory. Entries are cached persistently
+in a JSON file keyed by path, size and mtime. A rescan of an unchanged
+library therefore stats each file and touches nothing else. Cache misses
+are read in parallel.
+
+Example:
+    library = ZIMLibrary()
+    for item in library.scan(['/srv/zim']):
+        print(item.title, item.language, item.article_count)
+"""
+
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from zimlib import ZIMReader, DirectoryEntry, Namespace
+
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'zimlib', 'catalog.json')
+SCAN_CHUNK_SIZE = 4 << 20
+MAX_ENTRY_SIZE = 4096
+MAX_METADATA_SIZE = 4096
+
+
+@dataclass
+class CatalogEntry:
+    """Summary of one archive for library listings."""
+    path: str
+    size: int
+    mtime: float
+    entry_count: int = 0
+    article_count: int = 0
+    redirect_count: int = 0
+    cluster_count: int = 0
+    main_page_index: int = 0
+    mime_types: List[str] = field(default_factory=list)
+    metadata: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def title(self) -> str:
+        """Archive title, falling back to the file name."""
+        return self.metadata.get('Title') or os.path.splitext(os.path.basename(self.path))[0]
+
+    @property
+    def language(self) -> Optional[str]:
+        """Archive language code(s), if declared."""
+        return self.metadata.get('Language')
+
+    @property
+    def description(self) -> Optional[str]:
+        """Archive description, if declared."""
+        return self.metadata.get('Description')
+
+
+def metadata_entries(reader: ZIMReader) -> List[DirectoryEntry]:
+    """Find the M/ entries of an archive without parsing the whole directory.
+
+    In a sorted archive the M/ entries are one contiguous run of the
+    pointer list, found by binary search. Otherwise walks the pointer list
+    in file order over large sequential reads and only decodes entries
+    whose namespace byte is 'M'.
+    """
+    pointers = reader.read_entry_pointers()
+    if reader.is_sorted:
+        pointers = pointers[_namespace_start(reader, pointers, Namespace.METADATA):
+                            _namespace_start(reader, pointers, Namespace.METADATA + 1)]
+    else:
+        pointers = sorted(pointers)
+    found: List[DirectoryEntry] = []
+    base, data = 0, b''
+
+    for ptr in pointers:
+        if ptr + 5 > base + len(data):
+            reader.file.seek(ptr)
+            base, data = ptr, reader.file.read(SCAN_CHUNK_SIZE)
+            if len(data) < 5:
+                break
+        if data[ptr - base + 4] != Namespace.METADATA:
+            continue
+        if ptr + MAX_ENTRY_SIZE > base + len(data):
+            reader.file.seek(ptr)
+            base, data = ptr, reader.file.read(SCAN_CHUNK_SIZE)
+        raw = data[ptr - base:ptr - base + MAX_ENTRY_SIZE]
+        if int.from_bytes(raw[:4], 'little') == 0xFFFF:
+            continue  # Redirect
+        found.append(DirectoryEntry.from_bytes(raw))
+    return found
+
+
+def _namespace_start(reader: ZIMReader, pointers, namespace: int) -> int:
+    """First position in a sorted pointer list whose entry namespace is >= namespace."""
+    lo, hi = 0, len(pointers)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        reader.file.seek(pointers[mid] + 4)
+        if reader.file.read(1)[0] < namespace:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def read_catalog_entry(path: str) -> CatalogEntry:
+    """Catalog a single archive."""
+    stat = os.stat(path)
+    item = CatalogEntry(path=path, size=stat.st_size, mtime=stat.st_mtime)
+    try:
+        reader = ZIMReader(path)
+        reader.open(directory=False)
+        try:
+            header = reader.header
+            item.entry_count = header.entry_count
+            item.article_count = header.article_count
+            item.redirect_count = header.redirect_count
+            item.cluster_count = header.cluster_count
+            item.main_page_index = header.main_page_index
+            item.mime_types = list(reader.mime_types)
+
+            for entry, content in reader.get_many(metadata_entries(reader)):
+                if len(content) > MAX_METADATA_SIZE:
+                    continue  # Illustrations and other binary blobs
+                try:
+                    item.metadata[entry.url] = content.decode('utf-8')
+                except UnicodeDecodeError:
+                    continue
+        finally:
+            reader.close()
+    except (OSError, ValueError, NotImplementedError, struct.error) as e:
+        item.error = str(e)
+    return item
+
+
+class ZIMLibrary:
+    """Persistent catalog of ZIM archives."""
+
+    def __init__(self, cache_path: Optional[str] = DEFAULT_CACHE_PATH, workers: int = 8):
+        """Initialize the library; cache_path=None keeps the cache in memory."""
+        self.cache_path = cache_path
+        self.workers = workers
+        self.entries: Dict[str, CatalogEntry] = {}
+        self._dirty = False
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        """Load cached entries, ignoring a missing or incompatible cache."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != CACHE_VERSION:
+                return
+            self.entries = {item['path']: CatalogEntry(**item) for item in data['entries']}
+        except (OSError, ValueError, TypeError, KeyError):
+            self.entries = {}
+
+    def save(self) -> None:
+        """Write the cache if anything changed."""
+        if not self.cache_path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION,
+                       'entries': [asdict(item) for item in self.entries.values()]},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+    def _is_fresh(self, path: str) -> bool:
+        """Whether the cached entry for path matches the file on disk."""
+        item = self.entries.get(path)
+        if item is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return item.size == stat.st_size and item.mtime == stat.st_mtime
+
+    def refresh(self, paths: Iterable[str]) -> List[CatalogEntry]:
+        """Catalog archives, reading only those not fresh in the cache."""
+        paths = [os.path.abspath(p) for p in paths]
+        stale = [p for p in dict.fromkeys(paths) if not self._is_fresh(p)]
+
+        if stale:
+            if self.workers > 1 and len(stale) > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    items = list(pool.map(read_catalog_entry, stale))
+            else:
+                items = [read_catalog_entry(p) for p in stale]
+            for item in items:
+                self.entries[item.path] = item
+            self._dirty = True
+            self.save()
+
+        return [self.entries[p] for p in paths]
+
+    def scan(self, roots: Iterable[str], recursive: bool = True) -> List[CatalogEntry]:
+        """Catalog every .zim file under the given files or directories."""
+        paths: List[str] = []
+        for root in roots:
+            if os.path.isfile(root):
+                paths.append(root)
+                continue
+            for dirpath, dirnames, filenames in os.walk(root):
+                paths.extend(os.path.join(dirpath, name) for name in sorted(filenames)
+                             if name.lower().endswith('.zim'))
+                if not recursive:
+                    break
+                dirnames.sort()
+
+        # Forget cached archives that disappeared from the scanned roots
+        found = {os.path.abspath(p) for p in paths}
+        prefixes = tuple(os.path.join(os.path.abspath(r), '') for r in roots if not os.path.isfile(r))
+        for path in [p for p in self.entries if p.startswith(prefixes) and p not in found]:
+            del self.entries[path]
+            self._dirty = True
+
+        result = self.refresh(paths)
+        self.save()
+        return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point listing a library."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List ZIM archives with their metadata")
+    parser.add_argument('roots', nargs='+', help="ZIM files or directories")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="Catalog cache file")
+    parser.add_argument('--no-cache', action='store_true', help="Do not read or write the cache")
+    parser.add_argument('-j', '--workers', type=int, default=8, help="Parallel readers")
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    library = ZIMLibrary(None if args.no_cache else args.cache, workers=args.workers)
+    items = library.scan(args.roots)
+
+    if args.json:
+        json.dump([asdict(item) for item in items], sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    for item in items:
+        status = f"error: {item.error}" if item.error else f"{item.article_count:,} articles"
+        print(f"{item.title:<40} {item.language or '-':<8} {status:<20} {item.size:>14,}  {item.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
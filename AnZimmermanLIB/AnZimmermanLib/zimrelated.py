@@ -0,0 +1,406 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Offline "related articles" vector index for ZIM archives.
+
+Every HTML article in Namespace.MAIN_ARTICLE is embedded on the CPU with
+hashed TF-IDF followed by a sparse random projection. The unit-length
+vectors are stored as a float16 matrix in a sidecar next to the archive,
+grouped by an IVF (inverted file) partition so that a neighbour query only
+scans a few partitions with vectorized dot products.
+
+Requires numpy. Build from the command line:
+    python zimrelated.py wikipedia.zim --workers 8
+"""
+
+import math
+import mmap
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional for the rest of the library
+    np = None
+
+from zimlib import ZIMReader, DirectoryEntry
+from zimfulltext import article_batches, batch_reader, extract_text, tokenize
+from zimsearch import archive_stamp
+
+
+RELATED_INDEX_MAGIC = b'ZREL'
+RELATED_INDEX_VERSION = 1
+RELATED_INDEX_SUFFIX = '.related.idx'
+
+HASH_BUCKETS = 1 << 18          # hashed vocabulary size
+PROJECTION_NONZEROS = 4         # output dimensions touched per bucket
+DEFAULT_DIM = 128
+DEFAULT_SEED = 0x5A494D
+IDF_SAMPLE_SIZE = 20000         # documents used to estimate IDF
+IVF_MIN_ROWS = 4096             # below this a single partition is scanned
+KMEANS_SAMPLE_SIZE = 50000
+KMEANS_ITERATIONS = 8
+
+# magic, version, archive size, archive mtime, rows, dim, partitions,
+# centroids pos, list offsets pos, row ids pos, lookup pos, matrix pos
+_HEADER = struct.Struct('<4sIQQIIIQQQQQ')
+
+_projection_cache: Dict[Tuple[int, int], Tuple] = {}
+
+
+def _require_numpy() -> None:
+    """Raise a helpful error when numpy is not installed."""
+    if np is None:
+        raise ImportError("numpy is required for related-article indexes (pip install numpy)")
+
+
+def _projection(dim: int, seed: int):
+    """Return the (indices, signs) sparse random projection for dim/seed."""
+    key = (dim, seed)
+    if key not in _projection_cache:
+        rng = np.random.default_rng(seed)
+        indices = rng.integers(0, dim, size=(HASH_BUCKETS, PROJECTION_NONZEROS), dtype=np.int64)
+        signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=(HASH_BUCKETS, PROJECTION_NONZEROS))
+        _projection_cache[key] = (indices, signs)
+    return _projection_cache[key]
+
+
+def _hashed_terms(content: bytes):
+    """Return (buckets, counts) of the hashed tokens of an HTML document."""
+    tokens = tokenize(extract_text(content))
+    buckets = np.fromiter((zlib.crc32(t.encode('utf-8')) & (HASH_BUCKETS - 1) for t in tokens),
+                          dtype=np.int64, count=len(tokens))
+    return np.unique(buckets, return_counts=True)
+
+
+def _document_frequencies(source: Union[str, ZIMReader], work: List[Tuple[int, List[Tuple[int, int]]]]):
+    """Count, per hash bucket, how many documents of a batch contain it."""
+    df = np.zeros(HASH_BUCKETS, dtype=np.int64)
+    docs = 0
+    with batch_reader(source) as reader:
+        for cluster_number, items in work:
+            blobs = reader.read_cluster(cluster_number)
+            for _, blob_number in items:
+                buckets, _ = _hashed_terms(blobs[blob_number])
+                df[buckets] += 1
+                docs += 1
+    return docs, df
+
+
+def _embed_clusters(source: Union[str, ZIMReader], work: List[Tuple[int, List[Tuple[int, int]]]],
+                    idf, dim: int, seed: int):
+    """Embed every document in a batch of clusters; return (entry ids, float16 rows)."""
+    indices, signs = _projection(dim, seed)
+    entry_ids = []
+    rows = []
+    with batch_reader(source) as reader:
+        for cluster_number, items in work:
+            blobs = reader.read_cluster(cluster_number)
+            for entry_index, blob_number in items:
+                buckets, counts = _hashed_terms(blobs[blob_number])
+                weights = (1.0 + np.log(counts)) * idf[buckets]
+                vector = np.bincount(indices[buckets].ravel(),
+                                     weights=(signs[buckets] * weights[:, None]).ravel(),
+                                     minlength=dim)
+                norm = np.linalg.norm(vector)
+                if norm > 0:
+                    vector /= norm
+                entry_ids.append(entry_index)
+                rows.append(vector.astype(np.float16))
+    matrix = np.vstack(rows) if rows else np.zeros((0, dim), dtype=np.float16)
+    return np.array(entry_ids, dtype=np.uint32), matrix
+
+
+def _kmeans(matrix, partitions: int, seed: int):
+    """Spherical k-means on a sample of rows; returns float32 centroids."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), KMEANS_SAMPLE_SIZE)
+    sample = matrix[rng.choice(len(matrix), size=sample_size, replace=False)].astype(np.float32)
+    centroids = sample[rng.choice(sample_size, size=partitions, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for p in range(partitions):
+            members = sample[assignment == p]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                if norm > 0:
+                    centroids[p] = centroid / norm
+    return centroids
+
+
+def _assign(matrix, centroids, chunk: int = 65536):
+    """Assign every row to its nearest centroid, in chunks to bound memory."""
+    assignment = np.empty(len(matrix), dtype=np.int64)
+    for start in range(0, len(matrix), chunk):
+        block = matrix[start:start + chunk].astype(np.float32)
+        assignment[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def build_related_index(reader: ZIMReader, path: Optional[str] = None, workers: int = 1,
+                        dim: int = DEFAULT_DIM, seed: int = DEFAULT_SEED) -> str:
+    """Embed every HTML article of an opened reader and write the sidecar.
+
+    IDF is estimated from a sample of documents, then a single pass over
+    the clusters embeds every article using `workers` processes. Returns
+    the sidecar path.
+    """
+    _require_numpy()
+    path = path or default_related_path(reader.file_path)
+    batches = article_batches(reader, max(1, workers * 4))
+
+    # Sample whole clusters spread across the archive for the IDF estimate
+    clusters = [item for batch in batches for item in batch]
+    doc_total = sum(len(items) for _, items in clusters)
+    step = max(1, math.ceil(doc_total / IDF_SAMPLE_SIZE))
+    sample = clusters[::step]
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(batches) > 1 else None
+    try:
+        sample_batches = [sample[i::max(1, workers)] for i in range(max(1, workers))]
+        sample_batches = [b for b in sample_batches if b]
+        mapper = pool.map if pool else map
+        # Worker processes open their own readers; serial passes reuse this one
+        source = reader.file_path if pool else reader
+        sampled_docs = 0
+        df = np.zeros(HASH_BUCKETS, dtype=np.int64)
+        for docs, batch_df in mapper(_document_frequencies, [source] * len(sample_batches), sample_batches):
+            sampled_docs += docs
+            df += batch_df
+        idf = (np.log((1 + sampled_docs) / (1 + df)) + 1.0).astype(np.float32)
+
+        entry_parts = []
+        matrix_parts = []
+        n = len(batches)
+        for ids, rows in mapper(_embed_clusters, [source] * n, batches,
+                                [idf] * n, [dim] * n, [seed] * n):
+            entry_parts.append(ids)
+            matrix_parts.append(rows)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    entry_ids = np.concatenate(entry_parts) if entry_parts else np.zeros(0, dtype=np.uint32)
+    matrix = np.vstack(matrix_parts) if matrix_parts else np.zeros((0, dim), dtype=np.float16)
+
+    # Partition rows with IVF so queries only scan nearby lists
+    partitions = int(math.sqrt(len(matrix))) if len(matrix) >= IVF_MIN_ROWS else 1
+    if partitions > 1:
+        centroids = _kmeans(matrix, partitions, seed)
+        assignment = _assign(matrix, centroids)
+    else:
+        centroids = np.zeros((1, dim), dtype=np.float32)
+        assignment = np.zeros(len(matrix), dtype=np.int64)
+
+    order = np.lexsort((entry_ids, assignment))
+    entry_ids = entry_ids[order]
+    matrix = matrix[order]
+    list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=partitions)))).astype('<u8')
+    lookup_order = np.argsort(entry_ids, kind='stable')
+    lookup = np.stack([entry_ids[lookup_order], lookup_order.astype(np.uint32)], axis=1).astype('<u4')
+
+    _write_index(path, reader.file_path, dim, centroids.astype('<f4'), list_offsets,
+                 entry_ids.astype('<u4'), lookup, matrix.astype('<f2'))
+    return path
+
+
+def _write_index(path: str, archive_path: str, dim: int, centroids, list_offsets,
+                 row_ids, lookup, matrix) -> None:
+    """Serialize the sections of the vector index, 16-byte aligned."""
+    def align(pos: int) -> int:
+        return (pos + 15) & ~15
+
+    centroids_pos = align(_HEADER.size)
+    offsets_pos = align(centroids_pos + centroids.nbytes)
+    ids_pos = align(offsets_pos + list_offsets.nbytes)
+    lookup_pos = align(ids_pos + row_ids.nbytes)
+    matrix_pos = align(lookup_pos + lookup.nbytes)
+    size, mtime = archive_stamp(archive_path)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(RELATED_INDEX_MAGIC, RELATED_INDEX_VERSION, size, mtime,
+                             len(row_ids), dim, len(centroids),
+                             centroids_pos, offsets_pos, ids_pos, lookup_pos, matrix_pos))
+        for pos, section in ((centroids_pos, centroids), (offsets_pos, list_offsets),
+                             (ids_pos, row_ids), (lookup_pos, lookup), (matrix_pos, matrix)):
+            f.write(b'\x00' * (pos - f.tell()))
+            f.write(section.tobytes())
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class RelatedHit:
+    """A neighbouring article and its cosine similarity."""
+    index: int
+    entry: DirectoryEntry
+    score: float
+
+
+class RelatedIndex:
+    """Memory-mapped IVF vector index for a ZIMReader."""
+
+    def __init__(self, reader: ZIMReader, path: Optional[str] = None):
+        """Initialize index for an opened reader and sidecar path."""
+        self.reader = reader
+        self.path = path or default_related_path(reader.file_path)
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self.rows = 0
+        self.dim = 0
+
+    def open(self) -> bool:
+        """Map the sidecar if it exists and matches the archive; return success."""
+        _require_numpy()
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < _HEADER.size:
+            return False
+
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, size, mtime, self.rows, self.dim, partitions,
+         centroids_pos, offsets_pos, ids_pos, lookup_pos, matrix_pos) = _HEADER.unpack_from(self._mm, 0)
+
+        if (magic != RELATED_INDEX_MAGIC or version != RELATED_INDEX_VERSION
+                or (size, mtime) != archive_stamp(self.reader.file_path)):
+            self.close()
+            return False
+
+        # A truncated or damaged sidecar is a miss, so the index is rebuilt
+        sections = ((centroids_pos, partitions * self.dim * 4), (offsets_pos, (partitions + 1) * 8),
+                    (ids_pos, self.rows * 4), (lookup_pos, self.rows * 8), (matrix_pos, self.rows * self.dim * 2))
+        if partitions < 1 or any(pos < _HEADER.size or pos + length > len(self._mm) for pos, length in sections):
+            self.close()
+            return False
+
+        buf = self._mm
+        self.centroids = np.frombuffer(buf, dtype='<f4', count=partitions * self.dim,
+                                       offset=centroids_pos).reshape(partitions, self.dim)
+        self.list_offsets = np.frombuffer(buf, dtype='<u8', count=partitions + 1, offset=offsets_pos)
+        self.row_ids = np.frombuffer(buf, dtype='<u4', count=self.rows, offset=ids_pos)
+        self.lookup = np.frombuffer(buf, dtype='<u4', count=2 * self.rows,
+                                    offset=lookup_pos).reshape(self.rows, 2)
+        self.matrix = np.frombuffer(buf, dtype='<f2', count=self.rows * self.dim,
+                                    offset=matrix_pos).reshape(self.rows, self.dim)
+        if (self.list_offsets[0] != 0 or self.list_offsets[-1] != self.rows
+                or np.any(np.diff(self.list_offsets.astype(np.int64)) < 0)):
+            self.close()
+            return False
+        return True
+
+    def close(self) -> None:
+        """Unmap the sidecar."""
+        # Drop numpy views before closing the mmap they point into
+        for name in ('centroids', 'list_offsets', 'row_ids', 'lookup', 'matrix'):
+            self.__dict__.pop(name, None)
+        if self._mm:
+            self._mm.close()
+            self._mm = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def vector(self, entry_index: int):
+        """Return the stored embedding of an entry, or None if not indexed."""
+        keys = self.lookup[:, 0]
+        pos = int(np.searchsorted(keys, entry_index))
+        if pos >= self.rows or keys[pos] != entry_index:
+            return None
+        return self.matrix[self.lookup[pos, 1]].astype(np.float32)
+
+    def related(self, entry_index: int, limit: int = 10, nprobe: int = 8) -> List[RelatedHit]:
+        """Return the `limit` nearest articles to an indexed entry.
+
+        Only the `nprobe` partitions closest to the query vector are scanned.
+        """
+        if self._mm is None:
+            raise ValueError("Index not opened")
+
+        query = self.vector(entry_index)
+        if query is None:
+            return []
+
+        partitions = len(self.centroids)
+        probe = min(nprobe, partitions)
+        if probe < partitions:
+            nearest = np.argpartition(-(self.centroids @ query), probe - 1)[:probe]
+        else:
+            nearest = np.arange(partitions)
+
+        candidate_rows = []
+        candidate_scores = []
+        for p in nearest:
+            start, end = int(self.list_offsets[p]), int(self.list_offsets[p + 1])
+            if start == end:
+                continue
+            candidate_rows.append(np.arange(start, end))
+            candidate_scores.append(self.matrix[start:end].astype(np.float32) @ query)
+        if not candidate_rows:
+            return []
+
+        rows = np.concatenate(candidate_rows)
+        scores = np.concatenate(candidate_scores)
+        keep = self.row_ids[rows] != entry_index
+        rows, scores = rows[keep], scores[keep]
+
+        k = min(limit, len(rows))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        entries = self.reader.directory_entries
+        return [RelatedHit(index=int(self.row_ids[rows[t]]),
+                           entry=entries[int(self.row_ids[rows[t]])],
+                           score=float(scores[t]))
+                for t in top]
+
+
+def default_related_path(archive_path: str) -> str:
+    """Return the default sidecar path for an archive."""
+    return archive_path + RELATED_INDEX_SUFFIX
+
+
+def open_related_index(reader: ZIMReader) -> Optional[RelatedIndex]:
+    """Map the sidecar index for reader, or return None if unavailable."""
+    if np is None:
+        return None
+    index = RelatedIndex(reader)
+    return index if index.open() else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for building a related-articles index."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a related-articles vector index for a ZIM file")
+    parser.add_argument('archive', help="Path to the ZIM file")
+    parser.add_argument('-o', '--output', help="Sidecar path (default: <archive>.related.idx)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes")
+    parser.add_argument('--dim', type=int, default=DEFAULT_DIM, help="Embedding dimensions")
+    args = parser.parse_args(argv)
+
+    with ZIMReader(args.archive) as reader:
+        path = build_related_index(reader, args.output, workers=args.workers, dim=args.dim)
+    print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
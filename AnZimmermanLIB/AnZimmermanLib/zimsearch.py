@@ -0,0 +1,248 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Trigram substring index over ZIM article titles and URLs.
+
+Replaces the per-query scan of the whole directory with an inverted index
+mapping every lowercase 3-character sequence to a compact posting list of
+directory indices. Queries intersect the postings of their trigrams and only
+verify the (few) surviving candidates.
+"""
+
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Optional, Dict, List, Tuple, Union
+
+from zimlib import ZIMReader, DirectoryEntry, RedirectEntry, archive_stamp
+
+
+TRIGRAM_INDEX_MAGIC = b'ZTRI'
+TRIGRAM_INDEX_VERSION = 1
+TRIGRAM_INDEX_SUFFIX = '.trigram.idx'
+
+
+def _trigrams(text: str) -> set:
+    """Return the set of 3-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """In-memory trigram inverted index for a ZIMReader."""
+
+    def __init__(self, reader: ZIMReader):
+        """Initialize index for an opened reader (not built yet)."""
+        self.reader = reader
+        self.postings: Dict[str, array] = {}
+        self.ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def build(self) -> None:
+        """Build the index from the reader's directory entries."""
+        postings: Dict[str, array] = {}
+        for i, entry in enumerate(self.reader.directory_entries):
+            if not isinstance(entry, DirectoryEntry):
+                continue
+            grams = _trigrams(entry.url.lower()) | _trigrams(entry.title.lower())
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('I')
+                posting.append(i)
+
+        self.postings = postings
+        self.ready.set()
+
+    def build_async(self) -> threading.Thread:
+        """Build the index in a background daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.build, name="zim-trigram-index", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def candidates(self, term: str) -> Optional[array]:
+        """Return sorted entry indices that contain every trigram of term.
+
+        Returns None when the term is too short to be answered by the index.
+        """
+        grams = _trigrams(term)
+        if not grams:
+            return None
+
+        lists = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                return array('I')
+            lists.append(posting)
+
+        # Intersect smallest posting lists first
+        lists.sort(key=len)
+        result = set(lists[0])
+        for posting in lists[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return array('I', sorted(result))
+
+    def search(self, query: str, namespace: Optional[int] = None,
+               limit: int = 20) -> List[Tuple[int, DirectoryEntry]]:
+        """Find articles whose title or URL contains every query term.
+
+        Terms are whitespace-separated and matched case-insensitively as
+        substrings. Results are returned in directory order as
+        (index, entry) pairs.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return []
+
+        if not self.ready.is_set():
+            return _scan(self.reader, terms, namespace, limit)
+
+        candidate_lists = [self.candidates(term) for term in terms]
+        indexed = [c for c in candidate_lists if c is not None]
+        if not indexed:
+            # Only 1-2 character terms; these match too broadly to index
+            return _scan(self.reader, terms, namespace, limit)
+
+        indexed.sort(key=len)
+        candidates = indexed[0]
+        for other in indexed[1:]:
+            keep = set(other)
+            candidates = [i for i in candidates if i in keep]
+
+        entries = self.reader.directory_entries
+        results = []
+        for i in candidates:
+            entry = entries[i]
+            if namespace is not None and entry.namespace != namespace:
+                continue
+            if _matches(entry, terms):
+                results.append((i, entry))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def save(self, path: Optional[str] = None) -> str:
+        """Persist the index to a sidecar file and return its path."""
+        if not self.ready.is_set():
+            raise ValueError("Index not built")
+
+        path = path or default_index_path(self.reader.file_path)
+        size, mtime = archive_stamp(self.reader.file_path)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(TRIGRAM_INDEX_MAGIC)
+            f.write(struct.pack('<IQQII', TRIGRAM_INDEX_VERSION, size, mtime,
+                                len(self.reader.directory_entries), len(self.postings)))
+            for gram, posting in self.postings.items():
+                gram_bytes = gram.encode('utf-8')
+                f.write(struct.pack('<HI', len(gram_bytes), len(posting)))
+                f.write(gram_bytes)
+                f.write(_to_le(posting).tobytes())
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """Load a sidecar index if it matches the archive; return success."""
+        path = path or default_index_path(self.reader.file_path)
+        if not os.path.exists(path):
+            return False
+
+        size, mtime = archive_stamp(self.reader.file_path)
+        try:
+            with open(path, 'rb') as f:
+                if f.read(4) != TRIGRAM_INDEX_MAGIC:
+                    return False
+                version, idx_size, idx_mtime, entry_count, gram_count = struct.unpack('<IQQII', _read_exact(f, 28))
+                if (version != TRIGRAM_INDEX_VERSION or idx_size != size or idx_mtime != mtime
+                        or entry_count != len(self.reader.directory_entries)):
+                    return False
+
+                postings: Dict[str, array] = {}
+                for _ in range(gram_count):
+                    gram_len, posting_len = struct.unpack('<HI', _read_exact(f, 6))
+                    gram = _read_exact(f, gram_len).decode('utf-8')
+                    posting = array('I')
+                    posting.frombytes(_read_exact(f, 4 * posting_len))
+                    postings[gram] = _to_le(posting)
+        except (struct.error, UnicodeDecodeError, ValueError):
+            return False  # Truncated or corrupt sidecar; rebuild
+
+        self.postings = postings
+        self.ready.set()
+        return True
+
+
+def _matches(entry: Union[DirectoryEntry, RedirectEntry], terms: List[str]) -> bool:
+    """Check that every term occurs in the entry's URL or title."""
+    url = entry.url.lower()
+    title = entry.title.lower()
+    return all(term in url or term in title for term in terms)
+
+
+def _scan(reader: ZIMReader, terms: List[str], namespace: Optional[int],
+          limit: int) -> List[Tuple[int, DirectoryEntry]]:
+    """Linear fallback used before the index is ready."""
+    results = []
+    for i, entry in enumerate(reader.directory_entries):
+        if not isinstance(entry, DirectoryEntry):
+            continue
+        if namespace is not None and entry.namespace != namespace:
+            continue
+        if _matches(entry, terms):
+            results.append((i, entry))
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _read_exact(f, size: int) -> bytes:
+    """Read exactly size bytes or raise ValueError."""
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated trigram index")
+    return data
+
+
+def _to_le(posting: array) -> array:
+    """Byte-swap a posting list on big-endian hosts (sidecars are little-endian)."""
+    if sys.byteorder == 'big':
+        posting = array('I', posting)
+        posting.byteswap()
+    return posting
+
+
+def default_index_path(archive_path: str) -> str:
+    """Return the default sidecar path for an archive."""
+    return archive_path + TRIGRAM_INDEX_SUFFIX
+
+
+def open_trigram_index(reader: ZIMReader, background: bool = True) -> TrigramIndex:
+    """Load the sidecar index for reader, or start building one.
+
+    When built in the background, the sidecar is written once the build
+    finishes so the next open is instant.
+    """
+    index = TrigramIndex(reader)
+    if index.load():
+        return index
+
+    def build_and_save():
+        index.build()
+        try:
+            index.save()
+        except OSError:
+            pass  # Read-only archive directory; keep the in-memory index
+
+    if background:
+        index._thread = threading.Thread(target=build_and_save, name="zim-trigram-index", daemon=True)
+        index._thread.start()
+    else:
+        build_and_save()
+    return index
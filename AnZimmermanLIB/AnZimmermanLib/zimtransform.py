@@ -0,0 +1,264 @@
+# Copyright (C) 2025–2026 Robin L. M. Cheung, MBA
+# All rights reserved.
+# Unauthorized use without prior written consent is strictly prohibited.
+
+"""
+Single-pass content transformation for ZIM archives.
+
+A TransformPipeline holds per-MIME callables and regex substitutions.
+run() sweeps the source archive once in disk order. Clusters that hold no
+matching blob are copied verbatim. The others are decoded, transformed and
+re-encoded in worker processes, and the results are written in order
+straight into the output writer. At most a few batches are in flight,
+so memory stays bounded however large the archive is.
+
+Callables must be picklable (module-level functions) when workers > 1.
+
+Example:
+    pipeline = TransformPipeline()
+    pipeline.add_regex(r'<script\\b.*?</script>', '', flags=re.S)
+    pipeline.add_regex(r'https?://en\\.wikipedia\\.org/wiki/', '../A/')
+    pipeline.run('wiki.zim', 'wiki-offline.zim', workers=8)
+"""
+
+import fnmatch
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from zimlib import ZIMReader, ZIMWriter, DirectoryEntry, AccessPattern, CompressionType, encode_cluster
+
+
+BATCH_BYTES = 8 << 20
+
+Transform = Callable[[bytes], bytes]
+
+
+@dataclass
+class TransformResult:
+    """Summary of a pipeline run."""
+    clusters_copied: int = 0
+    clusters_rewritten: int = 0
+    blobs_changed: int = 0
+
+
+class _RegexTransform:
+    """Picklable bytes regex substitution."""
+
+    def __init__(self, pattern: Union[str, bytes], replacement: Union[str, bytes], flags: int = 0):
+        if isinstance(pattern, str):
+            pattern = pattern.encode('utf-8')
+        if isinstance(replacement, str):
+            replacement = replacement.encode('utf-8')
+        self.regex = re.compile(pattern, flags)
+        self.replacement = replacement
+
+    def __call__(self, content: bytes) -> bytes:
+        return self.regex.sub(self.replacement, content)
+
+
+class TransformPipeline:
+    """Ordered set of content transforms, each bound to MIME type patterns."""
+
+    def __init__(self):
+        """Initialize an empty pipeline."""
+        self.transforms: List[Tuple[Tuple[str, ...], Transform]] = []
+        self._plans: Dict[str, Tuple[Transform, ...]] = {}
+
+    def add(self, transform: Transform,
+            mime_types: Union[str, Sequence[str]] = 'text/html') -> 'TransformPipeline':
+        """Register a bytes -> bytes callable for MIME types (glob patterns)."""
+        if isinstance(mime_types, str):
+            mime_types = (mime_types,)
+        self.transforms.append((tuple(mime_types), transform))
+        self._plans.clear()
+        return self
+
+    def add_regex(self, pattern: Union[str, bytes], replacement: Union[str, bytes],
+                  mime_types: Union[str, Sequence[str]] = 'text/html',
+                  flags: int = 0) -> 'TransformPipeline':
+        """Register a regex substitution, applied to the raw UTF-8 bytes."""
+        return self.add(_RegexTransform(pattern, replacement, flags), mime_types)
+
+    def transforms_for(self, mime_type: str) -> Tuple[Transform, ...]:
+        """Get the transforms that apply to a MIME type, in order."""
+        plan = self._plans.get(mime_type)
+        if plan is None:
+            plan = tuple(transform for patterns, transform in self.transforms
+                         if any(fnmatch.fnmatchcase(mime_type, p) for p in patterns))
+            self._plans[mime_type] = plan
+        return plan
+
+    def apply(self, mime_type: str, content: bytes) -> bytes:
+        """Run content through every transform registered for its MIME type."""
+        for transform in self.transforms_for(mime_type):
+            content = transform(content)
+        return content
+
+    def run(self, source_path: str, output_path: str, workers: int = 1,
+            batch_bytes: int = BATCH_BYTES) -> TransformResult:
+        """Write a transformed copy of source_path to output_path."""
+        result = TransformResult()
+
+        with ZIMReader(source_path) as reader, ZIMWriter(output_path) as writer:
+            # Kernel read-ahead for the raw copies; workers prefetch their own batches
+            reader.advise(AccessPattern.SEQUENTIAL, prefetch_clusters=0)
+            # Which blobs of which clusters need transforming
+            wanted: Dict[int, Dict[int, str]] = {}
+            for entry in reader.list_articles():
+                mime_type = reader.mime_types[entry.mimetype_index] \
+                    if entry.mimetype_index < len(reader.mime_types) else ''
+                if self.transforms_for(mime_type):
+                    wanted.setdefault(entry.cluster_number, {})[entry.blob_number] = mime_type
+
+            mapping: Dict[int, int] = {}
+            pending: Deque[Tuple[str, object]] = deque()
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(source_path, self)) if workers > 1 else None
+            window = 2 * workers
+
+            def emit(kind, item):
+                if kind == 'copy':
+                    mapping.update(writer.copy_clusters(reader, item))
+                    result.clusters_copied += len(item)
+                    return
+                outputs = item.result() if executor else item
+                for cluster_number, data, changed in outputs:
+                    if data is None:
+                        mapping.update(writer.copy_clusters(reader, [cluster_number]))
+                        result.clusters_copied += 1
+                    else:
+                        mapping[cluster_number] = writer.write_cluster(data)
+                        result.clusters_rewritten += 1
+                        result.blobs_changed += changed
+
+            def push(kind, item):
+                if kind == 'batch':
+                    item = executor.submit(_transform_batch, item) if executor \
+                        else _transform_clusters(reader, self, item)
+                pending.append((kind, item))
+                while sum(1 for k, _ in pending if k == 'batch') > window or \
+                        (executor is None and pending):
+                    emit(*pending.popleft())
+
+            try:
+                copy_run: List[int] = []
+                batch: List[Tuple[int, Dict[int, str]]] = []
+                batch_size = 0
+                for cluster_number in sorted(range(len(reader.cluster_offsets)),
+                                             key=lambda c: reader.cluster_offsets[c]):
+                    if cluster_number not in wanted:
+                        if batch:
+                            push('batch', batch)
+                            batch, batch_size = [], 0
+                        copy_run.append(cluster_number)
+                        continue
+                    if copy_run:
+                        push('copy', copy_run)
+                        copy_run = []
+                    batch.append((cluster_number, wanted[cluster_number]))
+                    batch_size += reader._cluster_end(cluster_number) - reader.cluster_offsets[cluster_number]
+                    if batch_size >= batch_bytes:
+                        push('batch', batch)
+                        batch, batch_size = [], 0
+                if copy_run:
+                    push('copy', copy_run)
+                if batch:
+                    push('batch', batch)
+                while pending:
+                    emit(*pending.popleft())
+            finally:
+                if executor:
+                    executor.shutdown(cancel_futures=True)
+
+            # The directory is unchanged apart from cluster numbers
+            writer.mime_types = list(reader.mime_types)
+            for entry in reader.directory_entries:
+                if isinstance(entry, DirectoryEntry):
+                    entry = DirectoryEntry(entry.mimetype_index, entry.namespace, entry.revision,
+                                           mapping[entry.cluster_number], entry.blob_number,
+                                           entry.url, entry.title)
+                writer.directory_entries.append(entry)
+            writer.main_page_index = reader.header.main_page_index
+
+        return result
+
+
+def _transform_clusters(reader: ZIMReader, pipeline: TransformPipeline,
+                        batch: List[Tuple[int, Dict[int, str]]]) -> List[Tuple[int, Optional[bytes], int]]:
+    """Transform the matching blobs of each cluster in a batch.
+
+    Returns (cluster number, encoded cluster or None if unchanged, blobs changed).
+    """
+    outputs = []
+    for cluster_number, blob_mimes in batch:
+        blobs = reader.read_cluster(cluster_number)
+        changed = 0
+        for blob_number, mime_type in blob_mimes.items():
+            if blob_number >= len(blobs):
+                continue
+            content = pipeline.apply(mime_type, blobs[blob_number])
+            if content != blobs[blob_number]:
+                blobs[blob_number] = content
+                changed += 1
+        if changed:
+            compression = reader.cluster_compression(cluster_number)
+            # Re-encode ZSTD with the source dictionary, which is copied along
+            dictionary = reader.read_zstd_dictionary() if compression == CompressionType.ZSTD else None
+            data = encode_cluster(blobs, compression, dictionary=dictionary)
+            outputs.append((cluster_number, data, changed))
+        else:
+            outputs.append((cluster_number, None, 0))
+    return outputs
+
+
+# Per-process state for pool workers: each keeps its own open reader
+_worker: Optional[Tuple[ZIMReader, TransformPipeline]] = None
+
+
+def _init_worker(source_path: str, pipeline: TransformPipeline) -> None:
+    """Open the source archive once per worker process.
+
+    Workers only decode clusters, so the directory is not parsed.
+    """
+    global _worker
+    reader = ZIMReader(source_path)
+    reader.open(directory=False)
+    reader.advise(AccessPattern.SEQUENTIAL)
+    _worker = (reader, pipeline)
+
+
+def _transform_batch(batch: List[Tuple[int, Dict[int, str]]]) -> List[Tuple[int, Optional[bytes], int]]:
+    """Pool entry point for _transform_clusters."""
+    return _transform_clusters(_worker[0], _worker[1], batch)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for regex rewrites."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply regex rewrites to every matching blob of a ZIM file")
+    parser.add_argument('source', help="Source ZIM file")
+    parser.add_argument('output', help="Output ZIM file")
+    parser.add_argument('-e', '--rewrite', nargs=2, action='append', metavar=('PATTERN', 'REPLACEMENT'),
+                        required=True, help="Regex substitution (repeatable)")
+    parser.add_argument('-m', '--mime', action='append',
+                        help="MIME type pattern to transform (default: text/html)")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    pipeline = TransformPipeline()
+    for pattern, replacement in args.rewrite:
+        pipeline.add_regex(pattern, replacement, args.mime or 'text/html')
+
+    result = pipeline.run(args.source, args.output, workers=args.workers)
+    print(f"Rewrote {result.clusters_rewritten:,} clusters ({result.blobs_changed:,} blobs), "
+          f"copied {result.clusters_copied:,} unchanged")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())